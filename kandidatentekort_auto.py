@@ -17,15 +17,24 @@ import os
 import io
 import json
 import logging
-import smtplib
 import requests
+import tempfile
 import threading
-import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from flask import Flask, request, jsonify
 
+from v2.services.pipedrive import PipedriveService
+from v2.services.person_resolver import PersonResolver, primary_email, first_name
+from v2.nurture.due_index import NurtureDueIndex, DueScheduler, due_at
+from v2.utils.leader_lease import LeaderLease
+from v2.utils.idempotency import IdempotencyStore, idempotent, typeform_delivery_key, meta_delivery_key
+from v2.services.smtp_pool import SMTPPool
+from v2.nurture.pipeline import SendRateLimiter
+from v2.utils.http_client import HTTPClient
+
 # PDF and DOCX extraction
 try:
     from PyPDF2 import PdfReader
@@ -54,6 +63,22 @@ PIPEDRIVE_BASE = "https://api.pipedrive.com/v1"
 PIPELINE_ID = 4
 STAGE_ID = 21
 
+# Outgoing email reuses logged-in Gmail connections (see v2/services/smtp_pool.py)
+smtp_pool = SMTPPool(
+    'smtp.gmail.com', 465, GMAIL_USER, GMAIL_APP_PASSWORD,
+    use_ssl=True,
+    size=int(os.getenv('SMTP_POOL_SIZE', '2')),
+    idle_timeout=int(os.getenv('SMTP_IDLE_TIMEOUT', '60')),
+    max_messages=int(os.getenv('SMTP_MAX_MESSAGES', '100'))
+)
+
+# Person lookups for nurture emails: embedded deal data, TTL cache, bulk fetch
+person_resolver = PersonResolver(
+    PipedriveService(PIPEDRIVE_API_TOKEN),
+    ttl=int(os.getenv('PERSON_CACHE_TTL', '900')),
+    max_entries=int(os.getenv('PERSON_CACHE_MAX_ENTRIES', '5000'))
+)
+
 # Email Nurture Custom Field Keys (from Pipedrive)
 FIELD_RAPPORT_VERZONDEN = "337f9ccca15334e6e4f937ca5ef0055f13ed0c63"
 FIELD_EMAIL_SEQUENCE_STATUS = "22d33c7f119119e178f391a272739c571cf2e29b"
@@ -74,6 +99,36 @@ EMAIL_SCHEDULE = {
 # Stage filter: Only send nurture emails to deals in stage 21 (Gekwalificeerd)
 # Deals in stage 22+ have active contact, so no automated emails needed
 NURTURE_ACTIVE_STAGE = 21  # Gekwalificeerd
+NURTURE_SEND_INTERVAL = 2.0  # Minimum seconds between nurture emails
+NURTURE_SEND_WORKERS = int(os.getenv('NURTURE_SEND_WORKERS', '2'))  # Parallel senders, one SMTP connection each
+NURTURE_UPDATE_WORKERS = int(os.getenv('NURTURE_UPDATE_WORKERS', '4'))  # Parallel Pipedrive updates
+
+# Keep-alive connections for the Pipedrive updates of a nurture run
+pipedrive_http = HTTPClient(pool_hosts=1, pool_size=NURTURE_UPDATE_WORKERS)
+
+# Due-date index: the scheduler sleeps until the next email is due instead of scanning hourly
+DATA_DIR = os.getenv('KT_DATA_DIR', os.path.join(tempfile.gettempdir(), 'kandidatentekort'))
+NURTURE_DUE_INDEX_PATH = os.getenv('NURTURE_DUE_INDEX_PATH', os.path.join(DATA_DIR, 'nurture_due.sqlite3'))
+NURTURE_SEND_WINDOW = (
+    int(os.getenv('NURTURE_SEND_START_HOUR', '9')),
+    int(os.getenv('NURTURE_SEND_END_HOUR', '17'))
+)
+NURTURE_REINDEX_HOURS = int(os.getenv('NURTURE_REINDEX_HOURS', '6'))  # Full pipeline scan for Pipedrive-side changes
+
+# Every gunicorn worker starts the scheduler; only the holder of the lease sends
+LEADER_LEASE_PATH = os.getenv('LEADER_LEASE_PATH', os.path.join(DATA_DIR, 'leases.sqlite3'))
+LEADER_LEASE_TTL = int(os.getenv('LEADER_LEASE_TTL', '30'))  # seconds before a dead leader is replaced
+NURTURE_SCHEDULER_ENABLED = os.getenv('NURTURE_SCHEDULER_ENABLED', 'true').lower() == 'true'
+
+# Redelivered Typeform / Meta webhooks are answered from the stored response (see v2/utils/idempotency.py)
+IDEMPOTENCY_PATH = os.getenv('IDEMPOTENCY_PATH', os.path.join(DATA_DIR, 'idempotency.sqlite3'))
+IDEMPOTENCY_TTL_HOURS = int(os.getenv('IDEMPOTENCY_TTL_HOURS', '48'))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv('IDEMPOTENCY_MAX_ENTRIES', '20000'))
+idempotency = IdempotencyStore(
+    IDEMPOTENCY_PATH,
+    ttl_seconds=IDEMPOTENCY_TTL_HOURS * 3600,
+    max_entries=IDEMPOTENCY_MAX_ENTRIES
+)
 
 
 def extract_text_from_file(file_url):
@@ -242,11 +297,7 @@ def send_email(to_email, subject, html_body):
         msg['From'] = f"Kandidatentekort.nl <{GMAIL_USER}>"
         msg['To'] = to_email
         msg.attach(MIMEText(html_body, 'html', 'utf-8'))
-        server = smtplib.SMTP('smtp.gmail.com', 587, timeout=30)
-        server.starttls()
-        server.login(GMAIL_USER, GMAIL_APP_PASSWORD.replace(" ", ""))
-        server.send_message(msg)
-        server.quit()
+        smtp_pool.send(msg)
         logger.info(f"✅ Email sent to {to_email}")
         return True
     except Exception as e:
@@ -944,6 +995,7 @@ def home():
 
 
 @app.route("/webhook/typeform", methods=["POST"])
+@idempotent(typeform_delivery_key, idempotency)
 def typeform_webhook():
     logger.info("🎯 WEBHOOK RECEIVED")
 
@@ -1132,6 +1184,7 @@ def parse_meta_lead_data(data):
 
 
 @app.route("/webhook/meta-lead", methods=["POST", "GET"])
+@idempotent(meta_delivery_key, idempotency)
 def meta_lead_webhook():
     """
     Webhook voor Meta (Facebook) Lead Ads.
@@ -1438,9 +1491,7 @@ def send_pdf_email():
         msg.attach(MIMEText(f"Hoi {voornaam}, je PDF documenten zijn klaar. Download ze via: {vacature_url} en {rapport_url}", 'plain'))
         msg.attach(MIMEText(html_content, 'html'))
 
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as smtp:
-            smtp.login(GMAIL_USER, GMAIL_APP_PASSWORD)
-            smtp.send_message(msg)
+        smtp_pool.send(msg)
 
         # 6. Mark activity as done (if exists)
         activities_resp = requests.get(
@@ -1749,39 +1800,48 @@ def get_nurture_email_subject(email_num):
     return subjects.get(email_num, "Follow-up van kandidatentekort.nl")
 
 
-def send_nurture_email(to_email, email_num, voornaam, functie_titel):
-    """Send a nurture sequence email"""
-    if not GMAIL_APP_PASSWORD:
-        logger.warning("No Gmail password configured")
-        return False
+def build_nurture_email(to_email, email_num, voornaam, functie_titel):
+    """Render a nurture sequence email, or None when there is no template"""
+    html_content = get_nurture_email_html(email_num, voornaam, functie_titel)
+    if not html_content:
+        logger.error(f"No template for email {email_num}")
+        return None
 
-    try:
-        subject = get_nurture_email_subject(email_num)
-        html_content = get_nurture_email_html(email_num, voornaam, functie_titel)
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = get_nurture_email_subject(email_num)
+    msg['From'] = f"Wouter van kandidatentekort.nl <{GMAIL_USER}>"
+    msg['To'] = to_email
+    msg['Reply-To'] = "warts@recruitin.nl"
 
-        if not html_content:
-            logger.error(f"No template for email {email_num}")
-            return False
+    msg.attach(MIMEText(html_content, 'html'))
+    return msg
 
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = subject
-        msg['From'] = f"Wouter van kandidatentekort.nl <{GMAIL_USER}>"
-        msg['To'] = to_email
-        msg['Reply-To'] = "warts@recruitin.nl"
 
-        msg.attach(MIMEText(html_content, 'html'))
+def deliver_nurture_email(msg, email_num):
+    """Send a rendered nurture email through the SMTP pool"""
+    try:
+        smtp_pool.send(msg)
+        logger.info(f"✅ Sent nurture email {email_num} to {msg['To']}")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Failed to send nurture email: {e}")
+        return False
 
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-            server.login(GMAIL_USER, GMAIL_APP_PASSWORD)
-            server.send_message(msg)
 
-        logger.info(f"✅ Sent nurture email {email_num} to {to_email}")
-        return True
+def send_nurture_email(to_email, email_num, voornaam, functie_titel):
+    """Send a nurture sequence email"""
+    if not GMAIL_APP_PASSWORD:
+        logger.warning("No Gmail password configured")
+        return False
 
+    try:
+        msg = build_nurture_email(to_email, email_num, voornaam, functie_titel)
     except Exception as e:
-        logger.error(f"❌ Failed to send nurture email: {e}")
+        logger.error(f"❌ Failed to render nurture email: {e}")
         return False
 
+    return msg is not None and deliver_nurture_email(msg, email_num)
+
 
 def update_deal_nurture_status(deal_id, email_num):
     """Update deal fields after sending nurture email"""
@@ -1803,7 +1863,7 @@ def update_deal_nurture_status(deal_id, email_num):
         if email_num == 8:
             update_data[FIELD_EMAIL_SEQUENCE_STATUS] = "Completed"
 
-        response = requests.put(
+        response = pipedrive_http.put(
             f"{PIPEDRIVE_BASE}/deals/{deal_id}",
             params={"api_token": PIPEDRIVE_API_TOKEN},
             json=update_data,
@@ -1822,85 +1882,99 @@ def update_deal_nurture_status(deal_id, email_num):
         return False
 
 
-def get_deals_for_nurture():
-    """Get all deals that need nurture emails today"""
-    if not PIPEDRIVE_API_TOKEN:
-        return []
-
-    try:
-        # Get all deals from pipeline
+def iter_pipedrive_deals(**filters):
+    """Yield all deals matching filters, one page (500 deals) at a time."""
+    start = 0
+    while True:
         response = requests.get(
             f"{PIPEDRIVE_BASE}/deals",
-            params={
-                "api_token": PIPEDRIVE_API_TOKEN,
-                "pipeline_id": PIPELINE_ID,
-                "status": "open",
-                "limit": 500
-            },
+            params={"api_token": PIPEDRIVE_API_TOKEN, "start": start, "limit": 500, **filters},
             timeout=30
         )
-
         if response.status_code != 200:
-            logger.error(f"Failed to get deals: {response.status_code}")
-            return []
+            raise RuntimeError(f"Failed to get deals: {response.status_code}")
 
-        deals = response.json().get('data', []) or []
-        deals_to_email = []
-        today = datetime.now().date()
+        body = response.json()
+        deals = body.get('data') or []
+        yield from deals
 
-        for deal in deals:
-            # Only process deals in Gekwalificeerd stage (21)
-            stage_id = deal.get('stage_id')
-            if stage_id != NURTURE_ACTIVE_STAGE:
-                continue
+        pagination = (body.get('additional_data') or {}).get('pagination') or {}
+        if not pagination.get('more_items_in_collection') or not deals:
+            return
+        start = pagination.get('next_start') or start + len(deals)
 
-            # Get custom field values
-            rapport_date_str = deal.get(FIELD_RAPPORT_VERZONDEN)
-            sequence_status = deal.get(FIELD_EMAIL_SEQUENCE_STATUS, '')
-            laatste_email = deal.get(FIELD_LAATSTE_EMAIL, '')
 
-            # Skip if no rapport date or sequence not active
-            if not rapport_date_str:
-                continue
+def nurture_plan(deal, today=None):
+    """Next nurture email for a deal in the sequence (due or not), or None when nothing is left to send"""
+    # Only deals in Gekwalificeerd stage (21)
+    if deal.get('stage_id') != NURTURE_ACTIVE_STAGE or deal.get('status', 'open') != 'open':
+        return None
 
-            # Skip if sequence is completed, paused, or responded
-            if sequence_status in ['Completed', 'Gepauzeerd', 'Voltooid', 'Responded', 'Unsubscribed']:
-                continue
+    # Get custom field values
+    rapport_date_str = deal.get(FIELD_RAPPORT_VERZONDEN)
+    sequence_status = deal.get(FIELD_EMAIL_SEQUENCE_STATUS, '')
+    laatste_email = deal.get(FIELD_LAATSTE_EMAIL, '')
 
-            # Parse rapport date
-            try:
-                rapport_date = datetime.strptime(rapport_date_str, '%Y-%m-%d').date()
-            except:
-                continue
+    # Skip if no rapport date or sequence not active
+    if not rapport_date_str:
+        return None
+
+    # Skip if sequence is completed, paused, or responded
+    if sequence_status in ['Completed', 'Gepauzeerd', 'Voltooid', 'Responded', 'Unsubscribed']:
+        return None
+
+    # Parse rapport date
+    try:
+        rapport_date = datetime.strptime(rapport_date_str, '%Y-%m-%d').date()
+    except:
+        return None
+
+    # Determine which email to send
+    current_email = 0
+    if laatste_email:
+        try:
+            current_email = int(laatste_email.replace('Email ', ''))
+        except:
+            pass
+
+    next_email = current_email + 1
+    if next_email > 8:
+        return None
+
+    # Person info for email (embedded in the listing, resolved in bulk)
+    person = deal.get('person_id')
+    person_id = person.get('value') if isinstance(person, dict) else person
+
+    return {
+        'deal_id': deal.get('id'),
+        'deal_title': deal.get('title', ''),
+        'person_id': person_id,
+        'person': person,
+        'next_email': next_email,
+        'rapport_date': rapport_date_str,
+        'scheduled_day': EMAIL_SCHEDULE.get(next_email, {}).get('day', 999),
+        'days_since': ((today or datetime.now().date()) - rapport_date).days
+    }
+
+
+def get_deals_for_nurture(deals=None):
+    """Get the deals (default: all open deals in the nurture stage) that need nurture emails today"""
+    if not PIPEDRIVE_API_TOKEN:
+        return []
 
-            days_since_rapport = (today - rapport_date).days
+    try:
+        deals_to_email = []
+        today = datetime.now().date()
 
-            # Determine which email to send
-            current_email = 0
-            if laatste_email:
-                try:
-                    current_email = int(laatste_email.replace('Email ', ''))
-                except:
-                    pass
+        if deals is None:
+            deals = iter_pipedrive_deals(status="open", stage_id=NURTURE_ACTIVE_STAGE)
 
-            next_email = current_email + 1
+        for deal in deals:
+            plan = nurture_plan(deal, today)
 
             # Check if it's time to send the next email
-            if next_email <= 8:
-                scheduled_day = EMAIL_SCHEDULE.get(next_email, {}).get('day', 999)
-                if days_since_rapport >= scheduled_day:
-                    # Get person info for email
-                    person_id = deal.get('person_id', {})
-                    if isinstance(person_id, dict):
-                        person_id = person_id.get('value')
-
-                    deals_to_email.append({
-                        'deal_id': deal.get('id'),
-                        'deal_title': deal.get('title', ''),
-                        'person_id': person_id,
-                        'next_email': next_email,
-                        'days_since': days_since_rapport
-                    })
+            if plan and plan['days_since'] >= plan['scheduled_day']:
+                deals_to_email.append(plan)
 
         logger.info(f"📧 Found {len(deals_to_email)} deals in stage {NURTURE_ACTIVE_STAGE} (Gekwalificeerd) ready for nurture emails")
         return deals_to_email
@@ -1910,67 +1984,97 @@ def get_deals_for_nurture():
         return []
 
 
-def get_person_email(person_id):
-    """Get person's email and name from Pipedrive"""
-    if not PIPEDRIVE_API_TOKEN or not person_id:
-        return None, None
-
-    try:
-        response = requests.get(
-            f"{PIPEDRIVE_BASE}/persons/{person_id}",
-            params={"api_token": PIPEDRIVE_API_TOKEN},
-            timeout=30
-        )
-
-        if response.status_code == 200:
-            person = response.json().get('data', {})
-            emails = person.get('email', [])
-            email = emails[0].get('value') if emails else None
-            name = person.get('first_name', 'daar')
-            return email, name
-    except Exception as e:
-        logger.error(f"Error getting person: {e}")
+def process_nurture_emails(deals=None, may_send=None):
+    """Process all pending nurture emails (or those of the given deals).
 
-    return None, None
+    Every due email is rendered first, then sent by NURTURE_SEND_WORKERS threads
+    through the SMTP pool, together at most one email per NURTURE_SEND_INTERVAL.
+    The Pipedrive update of each sent email runs on NURTURE_UPDATE_WORKERS threads
+    while the next emails go out. may_send() is checked before each email;
+    sending stops once it returns False."""
+    logger.info("🔄 Starting nurture email processing...")
 
+    deals = get_deals_for_nurture(deals)
 
-def process_nurture_emails():
-    """Process all pending nurture emails"""
-    logger.info("🔄 Starting nurture email processing...")
+    # One bulk lookup for persons not embedded in the listing, instead of a GET per deal
+    try:
+        persons = person_resolver.resolve(deal['person'] for deal in deals)
+    except Exception as e:
+        logger.error(f"Error resolving persons: {e}")
+        persons = {}
 
-    deals = get_deals_for_nurture()
-    sent_count = 0
+    def record(deal_id, email_num):
+        if update_deal_nurture_status(deal_id, email_num):
+            nurture_due_index.clear_sent(deal_id)
 
+    # Render everything up front, so the senders only talk to SMTP
+    unrecorded, outgoing = [], []
     for deal in deals:
         try:
-            email, voornaam = get_person_email(deal['person_id'])
+            # Sent before but the Pipedrive update failed: retry the update, don't send it again
+            sent_num = nurture_due_index.sent_email(deal['deal_id'])
+            if sent_num is not None and sent_num >= deal['next_email']:
+                logger.info(f"Email {sent_num} already sent to deal {deal['deal_id']}, retrying the Pipedrive update")
+                unrecorded.append((deal['deal_id'], sent_num))
+                continue
+
+            person = persons.get(deal['person_id'])
+            email, voornaam = primary_email(person), first_name(person, None)
 
             if not email:
+                # Can never send: drop it from the due index until the next reindex
                 logger.warning(f"No email for deal {deal['deal_id']}")
+                nurture_due_index.remove(deal['deal_id'])
                 continue
 
             # Extract functie from deal title
             functie_titel = deal['deal_title'].replace('Vacature Analyse - ', '').split(' - ')[0]
 
-            # Send the email
-            success = send_nurture_email(
-                email,
-                deal['next_email'],
-                voornaam or 'daar',
-                functie_titel
-            )
-
-            if success:
-                # Update Pipedrive
-                update_deal_nurture_status(deal['deal_id'], deal['next_email'])
-                sent_count += 1
-
-            # Small delay between emails
-            time.sleep(2)
+            msg = build_nurture_email(email, deal['next_email'], voornaam or 'daar', functie_titel)
+            if msg is not None:
+                outgoing.append((deal, msg))
 
         except Exception as e:
             logger.error(f"Error processing deal {deal.get('deal_id')}: {e}")
 
+    if outgoing and not GMAIL_APP_PASSWORD:
+        logger.warning("No Gmail password configured")
+        outgoing = []
+
+    rate = SendRateLimiter(60.0 / NURTURE_SEND_INTERVAL if NURTURE_SEND_INTERVAL > 0 else 0)
+    lease_lost = threading.Event()
+
+    with ThreadPoolExecutor(max_workers=max(1, NURTURE_UPDATE_WORKERS), thread_name_prefix="nurture-update") as updates:
+        for deal_id, email_num in unrecorded:
+            updates.submit(record, deal_id, email_num)
+
+        def send(item):
+            deal, msg = item
+            try:
+                rate.acquire()
+
+                # Lease lost (another worker took over) while we were busy: leave the rest to the new leader
+                if lease_lost.is_set():
+                    return False
+                if may_send and not may_send():
+                    lease_lost.set()
+                    logger.warning(f"Nurture lease lost, stopping before deal {deal['deal_id']}")
+                    return False
+
+                if not deliver_nurture_email(msg, deal['next_email']):
+                    return False
+
+                nurture_due_index.mark_sent(deal['deal_id'], deal['next_email'])
+                updates.submit(record, deal['deal_id'], deal['next_email'])
+                return True
+
+            except Exception as e:
+                logger.error(f"Error processing deal {deal.get('deal_id')}: {e}")
+                return False
+
+        with ThreadPoolExecutor(max_workers=max(1, NURTURE_SEND_WORKERS), thread_name_prefix="nurture-send") as senders:
+            sent_count = sum(senders.map(send, outgoing))
+
     logger.info(f"✅ Nurture processing complete: {sent_count}/{len(deals)} emails sent")
     return sent_count
 
@@ -2006,20 +2110,90 @@ def start_nurture_deal(deal_id):
 
 
 # Background scheduler for nurture emails
-def nurture_scheduler():
-    """Background thread that checks for nurture emails every hour"""
-    while True:
+def get_pipedrive_deal(deal_id):
+    """Single deal (with embedded person), or None when it no longer exists"""
+    response = requests.get(
+        f"{PIPEDRIVE_BASE}/deals/{deal_id}",
+        params={"api_token": PIPEDRIVE_API_TOKEN},
+        timeout=30
+    )
+    if response.status_code in (404, 410):
+        return None
+    if response.status_code != 200:
+        raise RuntimeError(f"Failed to get deal {deal_id}: {response.status_code}")
+    return response.json().get('data')
+
+
+def nurture_due_entry(plan):
+    """(deal_id, due timestamp, email_num) for the due-date index"""
+    due = due_at(plan['rapport_date'], plan['scheduled_day'], NURTURE_SEND_WINDOW[0])
+    return plan['deal_id'], due, plan['next_email']
+
+
+def index_nurture_deal(deal):
+    """Index the next email of a deal, or drop the deal when nothing is left to send"""
+    plan = nurture_plan(deal)
+    if plan:
+        nurture_due_index.set(*nurture_due_entry(plan))
+    else:
+        nurture_due_index.remove(deal.get('id'))
+
+
+def reindex_nurture():
+    """Full scan of the nurture stage: rebuild the due-date index"""
+    if not PIPEDRIVE_API_TOKEN:
+        return 0
+    today = datetime.now().date()
+    plans = (nurture_plan(deal, today) for deal in iter_pipedrive_deals(status="open", stage_id=NURTURE_ACTIVE_STAGE))
+    count = nurture_due_index.replace_all(nurture_due_entry(plan) for plan in plans if plan)
+    logger.info(f"📇 Nurture due index rebuilt: {count} deals in sequence")
+    return count
+
+
+def process_due_nurture(deal_ids):
+    """Send the emails of due deals only, then index each deal's next email"""
+    logger.info(f"⏰ {len(deal_ids)} nurture deals due")
+    deals = []
+    for deal_id in deal_ids:
+        deal = get_pipedrive_deal(deal_id)  # Current state: paused or moved since indexing?
+        if deal:
+            deals.append(deal)
+        else:
+            nurture_due_index.remove(deal_id)
+
+    process_nurture_emails(deals, may_send=nurture_scheduler.is_leader)
+
+    for deal in deals:
+        if deal['id'] not in nurture_due_index:
+            continue  # Dropped while sending (no email address)
         try:
-            # Run at specific times (9 AM, 2 PM Dutch time)
-            now = datetime.now()
-            if now.hour in [9, 14]:
-                logger.info("⏰ Scheduled nurture check running...")
-                process_nurture_emails()
+            index_nurture_deal(get_pipedrive_deal(deal['id']) or {'id': deal['id']})
         except Exception as e:
-            logger.error(f"Scheduler error: {e}")
+            logger.error(f"Error re-indexing deal {deal['id']}: {e}")  # Retried by the scheduler
+
+
+nurture_due_index = NurtureDueIndex(NURTURE_DUE_INDEX_PATH)
+nurture_scheduler = DueScheduler(
+    nurture_due_index,
+    run_due=process_due_nurture,
+    reindex=reindex_nurture,
+    reindex_interval=NURTURE_REINDEX_HOURS * 3600,
+    window=NURTURE_SEND_WINDOW,
+    lease=LeaderLease(LEADER_LEASE_PATH, "nurture", ttl=LEADER_LEASE_TTL)
+)
 
-        # Sleep for 1 hour
-        time.sleep(3600)
+
+def start_nurture_scheduler():
+    """Start the nurture scheduler in this process (no-op when disabled or already running)"""
+    if NURTURE_SCHEDULER_ENABLED and PIPEDRIVE_API_TOKEN and nurture_scheduler.start():
+        logger.info("🚀 Nurture scheduler started")
+
+
+# Not started on import: under gunicorn each worker starts it on its first request,
+# after the fork (one thread per worker, one leader); python kandidatentekort_auto.py in __main__
+@app.before_request
+def ensure_nurture_scheduler():
+    start_nurture_scheduler()
 
 
 @app.route("/health", methods=["GET"])
@@ -2030,7 +2204,9 @@ def health_check():
         "features": ["typeform", "analysis", "nurture"],
         "email": bool(GMAIL_APP_PASSWORD),
         "pipedrive": bool(PIPEDRIVE_API_TOKEN),
-        "claude": bool(ANTHROPIC_API_KEY)
+        "claude": bool(ANTHROPIC_API_KEY),
+        "smtp": smtp_pool.stats(),
+        "idempotency": idempotency.stats()
     }), 200
 
 
@@ -2048,6 +2224,12 @@ def trigger_nurture_processing():
 def start_nurture_for_deal(deal_id):
     """Start nurture sequence for a specific deal"""
     success = start_nurture_deal(deal_id)
+    if success:
+        try:
+            index_nurture_deal(get_pipedrive_deal(deal_id) or {'id': deal_id})
+            nurture_scheduler.wake()
+        except Exception as e:
+            logger.error(f"Error indexing deal {deal_id}: {e}")  # Picked up by the next reindex
     return jsonify({"success": success, "deal_id": deal_id}), 200 if success else 500
 
 
@@ -2057,6 +2239,8 @@ def nurture_status():
     deals = get_deals_for_nurture()
     return jsonify({
         "pending_emails": len(deals),
+        "due_index": nurture_due_index.stats(),
+        "lease": nurture_scheduler.lease.stats(),
         "deals": deals[:20]  # Limit response
     }), 200
 
@@ -2077,9 +2261,5 @@ def test_nurture_email(email_num):
 
 
 if __name__ == "__main__":
-    # Start background scheduler for nurture emails
-    scheduler_thread = threading.Thread(target=nurture_scheduler, daemon=True)
-    scheduler_thread.start()
-    logger.info("🚀 Nurture scheduler started")
-
+    start_nurture_scheduler()
     app.run(host="0.0.0.0", port=int(os.getenv("PORT", 8080)))
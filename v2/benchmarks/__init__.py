@@ -0,0 +1 @@
+"""V2 Benchmarks - run as python -m v2.benchmarks.<name>"""
@@ -0,0 +1,316 @@
+"""
+Micro-benchmark: webhook_v6.parse_analysis_sections vs. the previous parser.
+
+Checks that the find-based parser returns exactly the same sections as the
+old split-per-section implementation (on the recorded analyses in fixtures/,
+streaming prefixes of them and randomly mutated variants), then times both
+and reports the lowest speedup against the 10x target of the rewrite. The
+target is not met: the parser is not single-pass, and the str.find scans for
+the section markers that exact compatibility needs already cost most of the
+10x budget on the short fixtures. A per-line state machine or one regex
+alternation scan is slower than those finds in CPython.
+
+Only fixtures the parser actually extracts sections from are timed, and the
+run fails if one of them comes back without scores or improved text. The
+DEEL 1-7 output (analysis_v8_deel) has none of the section markers, so both
+parsers return empty sections for it; it is part of the compatibility check
+only. It is also run through webhook_v6.is_complete_analysis, the analysis
+cache gate: the full output must pass, truncated copies of it must not. And
+it is streamed through webhook_v6.StreamingSectionParser in small chunks:
+the score and DEEL 1-6 must be emitted before the stream ends, DEEL 7 at the
+end.
+
+Usage:
+    python -m v2.benchmarks.analysis_parser
+    python -m v2.benchmarks.analysis_parser --iterations 500 --fuzz 5000
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+from typing import List
+
+from ..utils import get_logger
+
+logger = get_logger("benchmark")
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+MUTATION_TOKENS = [
+    "━━━", "EXECUTIVE SUMMARY", "SCORES PER CRITERIUM", "QUICK WINS", "VERBETERDE",
+    "VERBETERDE VACATURETEKST", "CIALDINI", "POWER-UP", "BONUS", "/10", "7/10",
+    "Openingszin 4/10", "CTA: 10/10", "\n", "\n\n", "1. ", "- ", "• ", '"', " ",
+]
+
+
+def legacy_parse_analysis_sections(analysis_result):
+    """Pre-rewrite webhook_v6.parse_analysis_sections, kept verbatim as the baseline."""
+    sections = {
+        'executive_summary': '',
+        'scores': {},
+        'quick_wins': [],
+        'improved_text': '',
+        'cialdini_tips': []
+    }
+
+    if not analysis_result:
+        return sections
+
+    # Extract Executive Summary
+    if 'EXECUTIVE SUMMARY' in analysis_result:
+        try:
+            summary_part = analysis_result.split('EXECUTIVE SUMMARY')[1]
+            summary_end = summary_part.find('━━━')
+            if summary_end == -1:
+                summary_end = summary_part.find('SCORES PER CRITERIUM')
+            sections['executive_summary'] = summary_part[:summary_end].strip().strip('━').strip()
+        except:
+            pass
+
+    # Extract individual scores
+    score_names = [
+        ('Openingszin', 'openingszin'),
+        ('Bedrijf Aantrekkingskracht', 'bedrijf'),
+        ('Rolklarheid', 'rolklarheid'),
+        ('Vereisten Realisme', 'vereisten'),
+        ('Groei-narratief', 'groei'),
+        ('Inclusie', 'inclusie'),
+        ('Cialdini', 'cialdini'),
+        ('Salarisbenchmark', 'salaris'),
+        ('CTA', 'cta'),
+        ('Competitieve Delta', 'competitief'),
+        ('Confidence', 'confidence'),
+        ('Implementatie', 'implementatie')
+    ]
+
+    for search_term, key in score_names:
+        try:
+            for line in analysis_result.split('\n'):
+                if search_term in line and '/10' in line:
+                    score_part = line.split('/10')[0]
+                    digits = ''.join(filter(str.isdigit, score_part[-3:]))
+                    if digits:
+                        sections['scores'][key] = int(digits)
+                    break
+        except:
+            continue
+
+    # Extract Quick Wins
+    if 'QUICK WINS' in analysis_result:
+        try:
+            qw_part = analysis_result.split('QUICK WINS')[1]
+            qw_end = qw_part.find('━━━')
+            if qw_end == -1:
+                qw_end = qw_part.find('VERBETERDE')
+            qw_text = qw_part[:qw_end] if qw_end > 0 else qw_part[:500]
+            for line in qw_text.split('\n'):
+                line = line.strip()
+                if line and (line[0].isdigit() or line.startswith('-') or line.startswith('•')):
+                    clean_line = line.lstrip('0123456789.-•) ').strip()
+                    if clean_line and len(clean_line) > 10:
+                        sections['quick_wins'].append(clean_line)
+                        if len(sections['quick_wins']) >= 3:
+                            break
+        except:
+            pass
+
+    # Extract Improved Text
+    if 'VERBETERDE VACATURETEKST' in analysis_result:
+        try:
+            imp_part = analysis_result.split('VERBETERDE VACATURETEKST')[1]
+            # Skip the first separator line (━━━) after header
+            lines = imp_part.split('\n')
+            content_lines = []
+            found_content = False
+            for line in lines:
+                # Skip separator lines
+                if '━━━' in line or line.strip() == '':
+                    if found_content:
+                        # If we already found content and hit a separator, we're done
+                        if '━━━' in line:
+                            break
+                    continue
+                # Skip if this is a new section header
+                if 'BONUS' in line or 'CIALDINI' in line or 'POWER-UP' in line:
+                    break
+                found_content = True
+                content_lines.append(line)
+            sections['improved_text'] = '\n'.join(content_lines).strip()
+        except Exception as e:
+            logger.warning(f"Failed to extract improved text: {e}")
+
+    # Extract Cialdini Tips
+    if 'CIALDINI' in analysis_result and 'POWER-UP' in analysis_result:
+        try:
+            ci_part = analysis_result.split('CIALDINI')[1]
+            if 'POWER-UP' in ci_part:
+                ci_part = ci_part.split('POWER-UP')[1]
+            for line in ci_part.split('\n'):
+                line = line.strip()
+                if line and (line[0].isdigit() or line.startswith('-') or line.startswith('•') or line.startswith('"')):
+                    clean_line = line.lstrip('0123456789.-•) ').strip().strip('"')
+                    if clean_line and len(clean_line) > 15:
+                        sections['cialdini_tips'].append(clean_line)
+                        if len(sections['cialdini_tips']) >= 3:
+                            break
+        except:
+            pass
+
+    return sections
+
+
+
+FIXTURE_NAMES = ("analysis_markdown", "analysis_v8", "analysis_v8_deel")
+TIMED_FIXTURES = ("analysis_markdown", "analysis_v8")  # Formats with the section markers the parser reads
+SPEEDUP_TARGET = 10.0  # Asked of the rewrite; reported, not enforced
+
+
+def load_fixtures() -> List[str]:
+    """Recorded analyses from fixtures/."""
+    texts = []
+    for name in FIXTURE_NAMES:
+        with open(os.path.join(FIXTURES_DIR, f"{name}.txt"), encoding="utf-8") as f:
+            texts.append(f.read())
+    return texts
+
+
+def build_corpus(fixtures: List[str]) -> List[str]:
+    """Fixtures plus long, CRLF and streaming-prefix variants."""
+    corpus = list(fixtures)
+    for text in fixtures:
+        corpus.append(text.replace("\n", "\r\n"))
+        corpus.append(full_length(text))
+        corpus.extend(text[:cut] for cut in range(0, len(text), max(1, len(text) // 25)))
+    return corpus
+
+
+def full_length(text: str, target_chars: int = 25000) -> str:
+    """
+    Pad a recorded analysis to the size of a complete V8 output.
+
+    With max_tokens=8000 the V8 report also contains the full original and
+    improved vacancy text (DEEL 4: VOOR EN NA), typically 20-30k characters.
+    The padding is an ORIGINEEL block placed after the summary, like in DEEL 4.
+    """
+    body_lines = [line for line in text.splitlines() if len(line) > 40 and "/10" not in line]
+    block = ["", "ORIGINEEL (Score: 27/45)", ""]
+    while sum(len(line) + 1 for line in block) < target_chars - len(text):
+        block.extend(body_lines)
+    lines = text.splitlines()
+    return "\n".join(lines[:5] + block + lines[5:])
+
+
+def mutate(text: str, rng: random.Random) -> str:
+    """Randomly insert, delete or duplicate fragments around section markers."""
+    for _ in range(rng.randint(1, 8)):
+        pos = rng.randrange(len(text) + 1)
+        action = rng.random()
+        if action < 0.5:
+            text = text[:pos] + rng.choice(MUTATION_TOKENS) + text[pos:]
+        elif action < 0.8:
+            text = text[:pos] + text[pos + rng.randint(1, 40):]
+        else:
+            text = text[:pos] + text[pos:pos + rng.randint(1, 200)] + text[pos:]
+    return text
+
+
+def check_compatibility(parse, corpus: List[str], fuzz: int, seed: int = 8) -> int:
+    """Compare both parsers; returns the number of mismatches (logged)."""
+    rng = random.Random(seed)
+    cases = corpus + [mutate(rng.choice(corpus), rng) for _ in range(fuzz)]
+
+    mismatches = 0
+    for text in cases:
+        if parse(text) != legacy_parse_analysis_sections(text):
+            mismatches += 1
+            if mismatches <= 3:
+                logger.error(f"Mismatch for input starting with: {text[:80]!r}")
+
+    logger.info(f"Compatibility: {len(cases) - mismatches}/{len(cases)} inputs identical")
+    return mismatches
+
+
+def check_extraction(parse, fixtures: List[str]) -> int:
+    """Timed fixtures must yield scores and improved text; returns the number that don't (logged)."""
+    failures = 0
+    for name, text in zip(FIXTURE_NAMES, fixtures):
+        if name not in TIMED_FIXTURES:
+            continue
+        sections = parse(text)
+        if not sections['scores'] or not sections['improved_text']:
+            failures += 1
+            logger.error(f"Fixture {name} parses to empty sections - timing it would measure nothing")
+    return failures
+
+
+def check_cache_gate(is_complete, fixtures: List[str]) -> int:
+    """The DEEL 1-7 fixture must be cacheable, truncations of it not; returns the number of wrong verdicts (logged)."""
+    text = fixtures[FIXTURE_NAMES.index("analysis_v8_deel")]
+    cases = [(text, True), (text[:text.index("DEEL 7")], False), (text[:len(text) // 2], False)]
+    failures = 0
+    for case, expected in cases:
+        if is_complete(case) != expected:
+            failures += 1
+            logger.error(f"Cache gate says {not expected} for analysis_v8_deel cut at {len(case)} chars")
+    return failures
+
+
+def check_streaming(parser_class, section_names: List[str], fixtures: List[str], chunk: int = 40) -> int:
+    """Stream the DEEL 1-7 fixture; returns 1 when the sections are not emitted early and in order (logged)."""
+    text = fixtures[FIXTURE_NAMES.index("analysis_v8_deel")]
+    emitted = []
+    parser = parser_class(lambda name, value: emitted.append(name))
+    for start in range(0, len(text), chunk):
+        parser.feed(text[start:start + chunk])
+    before_end = list(emitted)
+    parser.finish()
+
+    expected = ["score"] + section_names
+    if emitted != expected or before_end != expected[:-1]:
+        logger.error(f"Streamed sections {before_end} + {emitted[len(before_end):]} at finish, expected {expected}")
+        return 1
+    return 0
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark parse_analysis_sections")
+    parser.add_argument("--iterations", type=int, default=200, help="Timed parses per input")
+    parser.add_argument("--fuzz", type=int, default=2000, help="Random mutated inputs for the compatibility check")
+    args = parser.parse_args(argv)
+
+    from webhook_v6 import (
+        parse_analysis_sections, is_complete_analysis, StreamingSectionParser, ANALYSIS_DEEL_SECTIONS
+    )
+
+    fixtures = load_fixtures()
+    if check_compatibility(parse_analysis_sections, build_corpus(fixtures), args.fuzz):
+        return 1
+    if check_extraction(parse_analysis_sections, fixtures):
+        return 1
+    if check_cache_gate(is_complete_analysis, fixtures):
+        return 1
+    if check_streaming(StreamingSectionParser, [name for _, name in ANALYSIS_DEEL_SECTIONS], fixtures):
+        return 1
+
+    print(f"{'input':<34}{'chars':>8}{'old (us)':>12}{'new (us)':>12}{'speedup':>10}")
+    timed = [(name, text) for name, text in zip(FIXTURE_NAMES, fixtures) if name in TIMED_FIXTURES]
+    inputs = timed + [(f"{name} (full length)", full_length(text)) for name, text in timed]
+
+    speedups = []
+    for name, text in inputs:
+        old = timeit.timeit(lambda: legacy_parse_analysis_sections(text), number=args.iterations)
+        new = timeit.timeit(lambda: parse_analysis_sections(text), number=args.iterations)
+        speedups.append(old / new)
+        print(
+            f"{name:<34}{len(text):>8}{old / args.iterations * 1e6:>12.1f}"
+            f"{new / args.iterations * 1e6:>12.1f}{old / new:>9.1f}x"
+        )
+    verdict = "met" if min(speedups) >= SPEEDUP_TARGET else "NOT met"
+    print(f"Target {SPEEDUP_TARGET:.0f}x on every timed input: {verdict} (lowest {min(speedups):.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+    sys.exit(main())
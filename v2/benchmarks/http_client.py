@@ -0,0 +1,181 @@
+"""
+Benchmark: bare requests calls vs. the pooled HTTPClient.
+
+Starts a local stub API (HTTPS with a throwaway self-signed certificate when
+openssl is available, plain HTTP otherwise) that answers like Pipedrive and
+counts the connections it accepts. Each simulated lead makes the four
+sequential calls of PipedriveService.create_full_lead (organization, person,
+deal, note), first with bare requests.post, then through HTTPClient.
+
+Localhost has no network round-trip, so --rtt adds a simulated round-trip
+time: once per request, and per new connection once for the TCP handshake
+plus twice for the TLS handshake.
+
+Usage:
+    python -m v2.benchmarks.http_client
+    python -m v2.benchmarks.http_client --leads 50 --threads 4 --rtt 20
+    python -m v2.benchmarks.http_client --plain
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List, Optional
+
+import requests
+
+from ..utils import get_logger
+from ..utils.http_client import HTTPClient
+
+logger = get_logger("benchmark")
+
+LEAD_CALLS = ("organizations", "persons", "deals", "notes")  # create_full_lead
+
+
+class StubServer(ThreadingHTTPServer):
+    """Pipedrive-like stub that counts accepted connections."""
+
+    daemon_threads = True
+
+    def __init__(self, rtt: float, cert_file: Optional[str]):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.rtt = rtt
+        self.tls = cert_file is not None
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        if cert_file:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(cert_file)
+            self.socket = context.wrap_socket(self.socket, server_side=True, do_handshake_on_connect=False)
+
+    @property
+    def url(self) -> str:
+        return f"{'https' if self.tls else 'http'}://127.0.0.1:{self.server_address[1]}/v1"
+
+    def reset(self) -> None:
+        with self._lock:
+            self.connections = 0
+            self.requests = 0
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive
+
+    def setup(self) -> None:
+        with self.server._lock:
+            self.server.connections += 1
+        # Headers and body are written separately; don't let Nagle hold back the body
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # TCP handshake, plus two round-trips for TLS
+        time.sleep(self.server.rtt * (3 if self.server.tls else 1))
+        if self.server.tls:
+            self.request.do_handshake()
+        super().setup()
+
+    def _respond(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        with self.server._lock:
+            self.server.requests += 1
+        time.sleep(self.server.rtt)
+
+        body = json.dumps({"success": True, "data": {"id": self.server.requests}}).encode()
+        self.send_response(201 if self.command == "POST" else 200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = _respond
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+def self_signed_cert(directory: str) -> Optional[str]:
+    """Create a throwaway certificate for 127.0.0.1; None if openssl is missing."""
+    if not shutil.which("openssl"):
+        return None
+    path = os.path.join(directory, "stub.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+         "-keyout", path, "-out", path],
+        check=True, capture_output=True
+    )
+    return path
+
+
+def run(post: Callable[..., requests.Response], base_url: str, leads: int, threads: int) -> List[float]:
+    """Create leads; returns the duration of every lead."""
+    def lead(index: int) -> float:
+        started = time.perf_counter()
+        for endpoint in LEAD_CALLS:
+            response = post(f"{base_url}/{endpoint}?api_token=stub", json={"name": f"Lead {index}"})
+            response.raise_for_status()
+            response.json()
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return list(executor.map(lead, range(leads)))
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark pooled vs. bare HTTP calls")
+    parser.add_argument("--leads", type=int, default=25, help="Leads to create (4 calls each)")
+    parser.add_argument("--threads", type=int, default=1, help="Leads created concurrently")
+    parser.add_argument("--rtt", type=float, default=10.0, help="Simulated round-trip time in ms")
+    parser.add_argument("--plain", action="store_true", help="Plain HTTP instead of TLS")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cert_file = None if args.plain else self_signed_cert(tmp)
+        server = StubServer(args.rtt / 1000.0, cert_file)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        verify = cert_file or True
+
+        client = HTTPClient(pool_size=max(args.threads, 1))
+        modes = [
+            ("bare requests.post", lambda url, **kw: requests.post(url, timeout=30, verify=verify, **kw)),
+            ("HTTPClient (pooled)", lambda url, **kw: client.post(url, timeout=30, verify=verify, **kw)),
+        ]
+
+        print(f"Stub: {server.url} ({'TLS' if server.tls else 'plain HTTP'}), rtt {args.rtt:.0f} ms, "
+              f"{args.leads} leads x {len(LEAD_CALLS)} calls, {args.threads} threads")
+        print(f"{'mode':<22}{'requests':>10}{'connections':>13}{'total (s)':>11}{'ms/lead':>10}{'p95 ms/lead':>13}")
+
+        results = {}
+        for name, post in modes:
+            server.reset()
+            started = time.perf_counter()
+            durations = sorted(run(post, server.url, args.leads, args.threads))
+            total = time.perf_counter() - started
+            results[name] = total
+            p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+            print(
+                f"{name:<22}{server.requests:>10}{server.connections:>13}{total:>11.2f}"
+                f"{sum(durations) / len(durations) * 1000:>10.1f}{p95 * 1000:>13.1f}"
+            )
+
+        bare, pooled = results.values()
+        print(f"Speedup: {bare / pooled:.1f}x")
+        client.close()
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""
+Benchmark: per-deal get_next_email_for_deal vs. the vectorized batch evaluation.
+
+Builds a synthetic nurture stage (rapport dates over the last 45 days, every
+sequence position, a few deals in other stages and some missing, malformed
+or impossible dates), checks that nurture.batch.evaluate returns the same
+email number for every deal as get_next_email_for_deal, then times:
+
+- per-deal: get_next_email_for_deal over all deals (its per-deal log lines are
+  silenced, so only the computation is timed)
+- snapshot: DealSnapshot.from_deals, building the columns from deal dicts
+- evaluate: the NumPy pass over the snapshot
+- mirror rows: DealSnapshot.from_rows on (id, stage, date, sequence) tuples,
+  the shape PipedriveMirror.nurture_columns returns
+
+Usage:
+    python -m v2.benchmarks.nurture_batch
+    python -m v2.benchmarks.nurture_batch --deals 10000 100000 --repeat 5
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+from typing import Callable, Dict, List
+
+from ..config import FIELD_RAPPORT_VERZONDEN, FIELD_EMAIL_SEQUENCE_STATUS, NURTURE_ACTIVE_STAGE
+from ..utils import get_logger
+from ..nurture.batch import NUMPY_AVAILABLE, DealSnapshot, evaluate
+from ..nurture.scheduler import get_next_email_for_deal
+
+logger = get_logger("benchmark")
+
+ODD_DATES = ["", None, "onbekend", "2024-02-30", "2024-1-5", "05-01-2024", "2024-13-01"]
+ODD_STATUSES = ["", None, "Actief", "9", "-1", " 3", "8"]
+
+
+def synthetic_deals(count: int, today: date, seed: int = 21) -> List[Dict]:
+    """Deals as the list endpoint returns them, with the nurture custom fields."""
+    rng = random.Random(seed)
+    deals = []
+    for deal_id in range(1, count + 1):
+        rapport = (today - timedelta(days=rng.randint(-2, 45))).isoformat()
+        status = str(rng.randint(0, 8)) if rng.random() < 0.9 else ""
+        if rng.random() < 0.01:
+            rapport = rng.choice(ODD_DATES)
+        if rng.random() < 0.01:
+            status = rng.choice(ODD_STATUSES)
+        deals.append({
+            'id': deal_id,
+            'title': f"Vacature Analyse - Functie {deal_id}",
+            'stage_id': NURTURE_ACTIVE_STAGE if rng.random() < 0.95 else NURTURE_ACTIVE_STAGE + 1,
+            FIELD_RAPPORT_VERZONDEN: rapport,
+            FIELD_EMAIL_SEQUENCE_STATUS: status,
+        })
+    return deals
+
+
+def per_deal(deals: List[Dict]) -> List[int]:
+    """Due email number per deal (0 = none), the pre-batch way."""
+    return [(get_next_email_for_deal(deal) or {}).get('email_num', 0) for deal in deals]
+
+
+def check_compatibility(deals: List[Dict], today: date) -> int:
+    """Compare both evaluations; returns the number of mismatches (logged)."""
+    expected = per_deal(deals)
+    actual = evaluate(DealSnapshot.from_deals(deals), today).email_num.tolist()
+
+    mismatches = [deal for deal, a, b in zip(deals, expected, actual) if a != b]
+    for deal in mismatches[:3]:
+        logger.error(f"Mismatch for deal {deal['id']}: {deal}")
+    logger.info(f"Compatibility: {len(deals) - len(mismatches)}/{len(deals)} deals identical")
+    return len(mismatches)
+
+
+def best_of(repeat: int, func: Callable[[], object]) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark nurture eligibility: per deal vs. batch")
+    parser.add_argument("--deals", type=int, nargs="+", default=[10000, 100000], help="Pipeline sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per measurement (best is shown)")
+    args = parser.parse_args(argv)
+
+    if not NUMPY_AVAILABLE:
+        logger.error("NumPy is not installed")
+        return 1
+
+    # get_next_email_for_deal logs every due deal (INFO) and every bad date (ERROR)
+    logging.getLogger("v2.nurture_scheduler").setLevel(logging.CRITICAL)
+    today = date.today()
+
+    if check_compatibility(synthetic_deals(5000, today, seed=7), today):
+        return 1
+
+    print(f"{'deals':>8}{'due':>8}{'per-deal (ms)':>15}{'snapshot (ms)':>15}"
+          f"{'evaluate (ms)':>15}{'mirror rows (ms)':>18}{'speedup':>10}")
+    for count in args.deals:
+        deals = synthetic_deals(count, today)
+        snapshot = DealSnapshot.from_deals(deals)
+        rows = list(zip(snapshot.deal_id.tolist(), snapshot.stage_id.tolist(),
+                        [deal[FIELD_RAPPORT_VERZONDEN] for deal in deals], snapshot.current_email.tolist()))
+        due = int(evaluate(snapshot, today).due.sum())
+
+        scalar = best_of(args.repeat, lambda: per_deal(deals))
+        build = best_of(args.repeat, lambda: DealSnapshot.from_deals(deals))
+        vector = best_of(args.repeat, lambda: evaluate(snapshot, today))
+        from_rows = best_of(args.repeat, lambda: DealSnapshot.from_rows(rows))
+        print(
+            f"{count:>8}{due:>8}{scalar * 1e3:>15.1f}{build * 1e3:>15.1f}"
+            f"{vector * 1e3:>15.2f}{from_rows * 1e3:>18.1f}{scalar / (build + vector):>9.1f}x"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""
+Benchmark: nurture email rendering before and after the render cache.
+
+Times one email per recipient (names and job titles include HTML, braces,
+percent signs, backslashes and non-ASCII):
+
+- legacy: the previous get_nurture_email_html, which built all eight
+  emails (each through wrap_email) and returned one
+- direct: only the requested _get_email_N (f-strings plus wrap_email),
+  what get_nurture_email_html does on a cache miss
+- cached: get_nurture_email_html for a recipient already rendered (LRU hit)
+
+Usage:
+    python -m v2.benchmarks.nurture_templates
+    python -m v2.benchmarks.nurture_templates --recipients 2000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Callable, List, Tuple
+
+from ..nurture import templates
+
+NAMES = ["Jan", "daar", "Anne-Marie", "Zoë", "<b>Piet</b>", "{voornaam}", "100%", "a\\b", "", "José María"]
+TITLES = ["je vacature", "Monteur", "Senior {Developer}", "Sales & Marketing", "Lasser 50%", "Chef <kok>", ""]
+
+
+def legacy_get_nurture_email_html(email_num: int, voornaam: str, functie_titel: str) -> str:
+    """Pre-cache get_nurture_email_html, kept as the baseline."""
+    rendered = {num: build(voornaam, functie_titel) for num, build in templates._EMAILS.items()}
+    return rendered.get(email_num, "")
+
+
+def per_email(recipients: List[Tuple[int, str, str]], render: Callable[[int, str, str], str]) -> float:
+    """Best of 3: microseconds per rendered email."""
+    best = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        for recipient in recipients:
+            render(*recipient)
+        best = min(best, time.perf_counter() - started)
+    return best / len(recipients) * 1e6
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark nurture template rendering")
+    parser.add_argument("--recipients", type=int, default=1000, help="Emails rendered per measurement")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(24)
+    recipients = [
+        (rng.randint(1, 8), f"{rng.choice(NAMES)}{i}", rng.choice(TITLES))
+        for i in range(args.recipients)
+    ]
+
+    direct = lambda num, name, title: templates._EMAILS[num](name, title)
+    results = [
+        ("legacy (all 8 built)", per_email(recipients, legacy_get_nurture_email_html)),
+        ("direct (one template)", per_email(recipients, direct)),
+    ]
+    templates.get_nurture_email_html.cache_clear()
+    per_email(recipients[:templates.NURTURE_TEMPLATE_CACHE_SIZE], templates.get_nurture_email_html)
+    results.append(("cached (LRU hit)",
+                    per_email(recipients[:templates.NURTURE_TEMPLATE_CACHE_SIZE], templates.get_nurture_email_html)))
+
+    print(f"{'render':<24}{'us/email':>10}{'vs legacy':>11}")
+    for name, cost in results:
+        print(f"{name:<24}{cost:>10.2f}{results[0][1] / cost:>10.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+    sys.exit(main())
@@ -0,0 +1,282 @@
+"""
+Benchmark: one SMTP connection per email vs. SMTPPool.
+
+Starts a local SMTP stub (EHLO, STARTTLS with a throwaway certificate,
+AUTH PLAIN/LOGIN, MAIL/RCPT/DATA, NOOP, RSET, QUIT) that counts sessions and
+delivered messages, and sends a nurture-sized batch of emails:
+
+- per-email: a new connection, STARTTLS and login for every message, like
+  EmailService.send before the pool
+- pooled: SMTPPool.send, which EmailService.send now uses
+
+Before timing, the pool is checked against a misbehaving stub: connections
+silently dropped by the server, 421 "closing" replies, and idle
+connections going stale. Every message must still arrive exactly once.
+
+Localhost has no network round-trip, so --rtt adds a simulated round-trip
+time per SMTP command and per TLS handshake.
+
+Usage:
+    python -m v2.benchmarks.smtp_pool
+    python -m v2.benchmarks.smtp_pool --emails 60 --threads 2 --rtt 20
+"""
+
+import argparse
+import base64
+import os
+import smtplib
+import socket
+import socketserver
+import ssl
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.text import MIMEText
+from typing import Callable, List, Optional
+
+from ..utils import get_logger
+from ..services.smtp_pool import SMTPPool
+from .http_client import self_signed_cert
+
+logger = get_logger("benchmark")
+
+USER, PASSWORD = "stub@kandidatentekort.nl", "app password"
+
+
+class SMTPStub(socketserver.ThreadingTCPServer):
+    """Minimal SMTP server; drop_after / close_after simulate servers ending sessions."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, rtt: float, cert_file: Optional[str], drop_after: int = 0, close_after: int = 0):
+        super().__init__(("127.0.0.1", 0), SMTPStubHandler)
+        self.rtt = rtt
+        self.context = None
+        if cert_file:
+            self.context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            self.context.load_cert_chain(cert_file)
+        self.drop_after = drop_after    # Silently drop the connection after n messages
+        self.close_after = close_after  # Answer 421 to the next command after n messages
+        self.sessions = 0
+        self.logins = 0
+        self.delivered: List[str] = []
+        self._lock = threading.Lock()
+        self._open: List[socket.socket] = []
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def reset(self) -> None:
+        with self._lock:
+            self.sessions = 0
+            self.logins = 0
+            self.delivered = []
+
+    def drop_all(self) -> None:
+        """Close every open session without a reply, like a server restart."""
+        with self._lock:
+            sockets, self._open = self._open, []
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class SMTPStubHandler(socketserver.StreamRequestHandler):
+
+    def setup(self) -> None:
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        super().setup()
+        with self.server._lock:
+            self.server.sessions += 1
+            self.server._open.append(self.request)
+
+    def reply(self, line: str) -> None:
+        time.sleep(self.server.rtt)
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self) -> None:
+        server = self.server
+        sent = 0
+        self.reply("220 stub ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip()
+            verb = command.split(" ", 1)[0].upper()
+
+            if server.close_after and sent >= server.close_after:
+                self.reply("421 4.7.0 Closing connection")
+                return
+            if server.drop_after and sent >= server.drop_after:
+                return
+
+            if verb in ("EHLO", "HELO"):
+                extensions = ["AUTH PLAIN LOGIN"]
+                if server.context and not isinstance(self.request, ssl.SSLSocket):
+                    extensions.append("STARTTLS")
+                lines = ["stub"] + extensions
+                self.reply("\r\n".join(
+                    f"250{'-' if i < len(lines) - 1 else ' '}{text}" for i, text in enumerate(lines)
+                ))
+            elif verb == "STARTTLS":
+                self.reply("220 Ready to start TLS")
+                time.sleep(server.rtt * 2)  # TLS handshake round-trips
+                plain, self.request = self.request, server.context.wrap_socket(self.request, server_side=True)
+                with server._lock:  # wrap_socket detaches the plain socket
+                    server._open = [self.request if sock is plain else sock for sock in server._open]
+                self.rfile = self.request.makefile("rb")
+                self.wfile = socketserver._SocketWriter(self.request)
+            elif verb == "AUTH":
+                if command.upper().startswith("AUTH PLAIN"):
+                    _, user, password = base64.b64decode(command.split()[-1]).decode().split("\0")
+                else:
+                    self.reply("334 VXNlcm5hbWU6")
+                    user = base64.b64decode(self.rfile.readline().strip()).decode()
+                    self.reply("334 UGFzc3dvcmQ6")
+                    password = base64.b64decode(self.rfile.readline().strip()).decode()
+                if (user, password) != (USER, PASSWORD.replace(" ", "")):
+                    self.reply("535 5.7.8 Bad credentials")
+                    continue
+                with server._lock:
+                    server.logins += 1
+                self.reply("235 2.7.0 Accepted")
+            elif verb == "DATA":
+                self.reply("354 Go ahead")
+                body = []
+                while True:
+                    data = self.rfile.readline()
+                    if data in (b".\r\n", b""):
+                        break
+                    body.append(data.decode())
+                subject = next((l.split(":", 1)[1].strip() for l in body if l.startswith("Subject:")), "")
+                with server._lock:
+                    server.delivered.append(subject)
+                sent += 1
+                self.reply("250 2.0.0 OK queued")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:  # MAIL, RCPT, NOOP, RSET
+                self.reply("250 OK")
+
+
+def message(index: int) -> MIMEText:
+    msg = MIMEText(f"<p>Nurture email {index}</p>", "html", "utf-8")
+    msg["Subject"] = f"Nurture {index}"
+    msg["From"] = f"Kandidatentekort.nl <{USER}>"
+    msg["To"] = f"lead{index}@example.com"
+    return msg
+
+
+def send_unpooled(port: int, context: ssl.SSLContext) -> Callable[[MIMEText], None]:
+    """What EmailService.send did per email."""
+    def send(msg: MIMEText) -> None:
+        with smtplib.SMTP("127.0.0.1", port, timeout=30) as server:
+            server.starttls(context=context)
+            server.login(USER, PASSWORD.replace(" ", ""))
+            server.send_message(msg)
+    return send
+
+
+def make_pool(port: int, context: ssl.SSLContext, **kwargs) -> SMTPPool:
+    return SMTPPool("127.0.0.1", port, USER, PASSWORD, ssl_context=context, **kwargs)
+
+
+def check_resilience(cert_file: str, context: ssl.SSLContext) -> bool:
+    """Every message arrives exactly once despite dropped, closed and stale connections."""
+    ok = True
+    scenarios = [
+        ("server drops session every 3 messages", dict(drop_after=3), {}),
+        ("server answers 421 every 4 messages", dict(close_after=4), {}),
+    ]
+    for name, stub_args, pool_args in scenarios:
+        stub = SMTPStub(0, cert_file, **stub_args)
+        threading.Thread(target=stub.serve_forever, daemon=True).start()
+        pool = make_pool(stub.port, context, size=2, **pool_args)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(pool.send, [message(i) for i in range(20)]))
+        ok &= report(name, stub, pool, 20)
+        stub.shutdown()
+
+    # Idle: the server restarts while connections sit in the pool, then they expire
+    stub = SMTPStub(0, cert_file)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    pool = make_pool(stub.port, context, size=1, check_after=0.2, idle_timeout=1.0)
+    pool.send(message(0))
+    stub.drop_all()
+    time.sleep(0.3)
+    pool.send(message(1))  # NOOP fails -> fresh connection
+    pool.send(message(2))  # Immediately reused, no NOOP
+    time.sleep(1.2)
+    pool.send(message(3))  # Past idle_timeout -> closed, fresh connection
+    ok &= report("stale and idle connections", stub, pool, 4)
+    stub.shutdown()
+    return ok
+
+
+def report(name: str, stub: SMTPStub, pool: SMTPPool, expected: int) -> bool:
+    delivered = sorted(stub.delivered)
+    passed = len(delivered) == expected and len(set(delivered)) == expected
+    stats = pool.stats()
+    print(
+        f"  {'ok  ' if passed else 'FAIL'} {name}: {len(delivered)}/{expected} delivered, "
+        f"{stub.sessions} sessions, {stats['reconnects']} reconnects, {stats['failed_checks']} failed checks"
+    )
+    return passed
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark SMTPPool against one connection per email")
+    parser.add_argument("--emails", type=int, default=40, help="Emails to send")
+    parser.add_argument("--threads", type=int, default=1, help="Concurrent senders (and pool size)")
+    parser.add_argument("--rtt", type=float, default=10.0, help="Simulated round-trip time in ms")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cert_file = self_signed_cert(tmp)
+        if not cert_file:
+            print("openssl not found - the stub needs a certificate for STARTTLS")
+            return 1
+        context = ssl.create_default_context(cafile=cert_file)
+
+        print("Resilience:")
+        if not check_resilience(cert_file, context):
+            return 1
+
+        stub = SMTPStub(args.rtt / 1000.0, cert_file)
+        threading.Thread(target=stub.serve_forever, daemon=True).start()
+        pool = make_pool(stub.port, context, size=args.threads)
+        modes = [("per-email connection", send_unpooled(stub.port, context)), ("SMTPPool", pool.send)]
+
+        print(f"\nStub: 127.0.0.1:{stub.port} (STARTTLS), rtt {args.rtt:.0f} ms, "
+              f"{args.emails} emails, {args.threads} threads")
+        print(f"{'mode':<24}{'delivered':>10}{'sessions':>10}{'logins':>8}{'total (s)':>11}{'ms/email':>10}")
+        results = []
+        for name, send in modes:
+            stub.reset()
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.threads) as executor:
+                list(executor.map(send, [message(i) for i in range(args.emails)]))
+            total = time.perf_counter() - started
+            results.append(total)
+            print(
+                f"{name:<24}{len(stub.delivered):>10}{stub.sessions:>10}{stub.logins:>8}"
+                f"{total:>11.2f}{total / args.emails * 1000 * args.threads:>10.1f}"
+            )
+
+        print(f"Speedup: {results[0] / results[1]:.1f}x")
+        pool.close_idle()
+        stub.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+    sys.exit(main())
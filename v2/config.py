@@ -4,6 +4,7 @@ All environment variables and constants in one place.
 """
 
 import os
+import tempfile
 
 # =============================================================================
 # API KEYS & CREDENTIALS
@@ -14,11 +15,19 @@ PIPEDRIVE_API_TOKEN = os.getenv('PIPEDRIVE_API_TOKEN')
 TYPEFORM_API_TOKEN = os.getenv('TYPEFORM_API_TOKEN')
 GMAIL_USER = os.getenv('GMAIL_USER', 'artsrecruitin@gmail.com')
 GMAIL_APP_PASSWORD = os.getenv('GMAIL_APP_PASSWORD') or os.getenv('GMAIL_PASS')
+SMTP_HOST = os.getenv('SMTP_HOST', 'smtp.gmail.com')
+SMTP_PORT = int(os.getenv('SMTP_PORT', '587'))
+SMTP_USE_SSL = os.getenv('SMTP_USE_SSL', 'false').lower() == 'true'  # Implicit TLS (465) instead of STARTTLS
 
 # PDFMonkey
 PDFMONKEY_API_KEY = os.getenv('PDFMONKEY_API_KEY', '')
 PDFMONKEY_TEMPLATE_ANALYSE = os.getenv('PDFMONKEY_TEMPLATE_ANALYSE', '')
 PDFMONKEY_TEMPLATE_VACATURE = os.getenv('PDFMONKEY_TEMPLATE_VACATURE', '')
+PDFMONKEY_API_URL = os.getenv('PDFMONKEY_API_URL', 'https://api.pdfmonkey.io/api/v1/documents')
+PDFMONKEY_WEBHOOK_SECRET = os.getenv('PDFMONKEY_WEBHOOK_SECRET', '')  # ?token= on /webhook/pdfmonkey
+
+# Pipedrive webhooks (deal/person changes for the local mirror)
+PIPEDRIVE_WEBHOOK_SECRET = os.getenv('PIPEDRIVE_WEBHOOK_SECRET', '')  # ?token= on /webhook/pipedrive; required
 
 # Meta/Facebook
 META_VERIFY_TOKEN = os.getenv('META_VERIFY_TOKEN', 'kandidatentekort_verify_2024')
@@ -30,6 +39,7 @@ FB_PIXEL_ID = os.getenv('FB_PIXEL_ID', '238226887541404')
 # =============================================================================
 
 PIPEDRIVE_BASE_URL = "https://api.pipedrive.com/v1"
+PIPEDRIVE_API_V2_URL = "https://api.pipedrive.com/api/v2"  # Bulk reads (persons?ids=)
 PIPELINE_ID = 4           # Kandidatentekort pipeline
 STAGE_ID = 21             # Gekwalificeerd stage
 OWNER_ID = 23957248       # Wouter
@@ -70,6 +80,12 @@ EMAIL_SCHEDULE = {
 # Only send nurture to deals in this stage
 NURTURE_ACTIVE_STAGE = 21  # Gekwalificeerd
 
+# Nurture send pipeline (see nurture/pipeline.py)
+NURTURE_SEND_WORKERS = int(os.getenv('NURTURE_SEND_WORKERS', '2'))  # Match SMTP_POOL_SIZE
+NURTURE_SEND_RATE_PER_MINUTE = float(os.getenv('NURTURE_SEND_RATE_PER_MINUTE', '30'))  # 0 = no cap
+NURTURE_UPDATE_WORKERS = int(os.getenv('NURTURE_UPDATE_WORKERS', '4'))  # Concurrent Pipedrive updates
+NURTURE_TEMPLATE_CACHE_SIZE = int(os.getenv('NURTURE_TEMPLATE_CACHE_SIZE', '512'))  # Rendered emails kept (~8 KB each)
+
 # =============================================================================
 # LEAD SCORING WEIGHTS
 # =============================================================================
@@ -124,14 +140,90 @@ USE_PDFMONKEY = bool(PDFMONKEY_API_KEY and PDFMONKEY_TEMPLATE_ANALYSE)
 ENABLE_AUTO_ANALYSIS = True  # V2: Re-enabled!
 ENABLE_LEAD_SCORING = True
 ENABLE_ASYNC_PROCESSING = True
+# Typeform: reply as soon as the submission is persisted; file extraction, confirmation
+# email, CRM and scoring then run as queued stages (see handlers/typeform.py)
+TYPEFORM_ACK_FIRST = os.getenv('TYPEFORM_ACK_FIRST', 'false').lower() == 'true'
+
+# =============================================================================
+# LOCAL STATE & BACKGROUND JOBS
+# =============================================================================
+
+# Local SQLite stores (job queue etc). Point at a persistent disk in production.
+DATA_DIR = os.getenv('KT_DATA_DIR', os.path.join(tempfile.gettempdir(), 'kandidatentekort'))
+
+JOB_QUEUE_PATH = os.getenv('JOB_QUEUE_PATH', os.path.join(DATA_DIR, 'jobs.sqlite3'))
+JOB_QUEUE_WORKERS = int(os.getenv('JOB_QUEUE_WORKERS', '2'))  # Per gunicorn worker
+JOB_QUEUE_LEASE_SECONDS = int(os.getenv('JOB_QUEUE_LEASE_SECONDS', '120'))
+JOB_QUEUE_MAX_ATTEMPTS = int(os.getenv('JOB_QUEUE_MAX_ATTEMPTS', '3'))
+# Typeform intake stages get their own queue and workers, so queued analyses never delay them
+INTAKE_QUEUE_PATH = os.getenv('INTAKE_QUEUE_PATH', os.path.join(DATA_DIR, 'intake_jobs.sqlite3'))
+INTAKE_QUEUE_WORKERS = int(os.getenv('INTAKE_QUEUE_WORKERS', '2'))  # Per gunicorn worker
+
+# Content-addressed cache for Claude analyses
+ANALYSIS_CACHE_PATH = os.getenv('ANALYSIS_CACHE_PATH', os.path.join(DATA_DIR, 'analysis_cache.sqlite3'))
+ANALYSIS_CACHE_TTL_DAYS = int(os.getenv('ANALYSIS_CACHE_TTL_DAYS', '30'))
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv('ANALYSIS_CACHE_MAX_ENTRIES', '5000'))
+
+# Webhook redelivery suppression (see utils/idempotency.py)
+IDEMPOTENCY_PATH = os.getenv('IDEMPOTENCY_PATH', os.path.join(DATA_DIR, 'idempotency.sqlite3'))
+IDEMPOTENCY_TTL_HOURS = int(os.getenv('IDEMPOTENCY_TTL_HOURS', '48'))  # Meta retries for up to 36 hours
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv('IDEMPOTENCY_MAX_ENTRIES', '20000'))
+
+# Warm ReportLab worker processes (see utils/render_pool.py)
+PDF_RENDER_WORKERS = int(os.getenv('PDF_RENDER_WORKERS', '2'))  # Per gunicorn worker
+PDF_RENDER_TIMEOUT = int(os.getenv('PDF_RENDER_TIMEOUT', '60'))  # seconds
+
+# PDFMonkey completion tracking (see services/pdfmonkey_tracker.py)
+PDFMONKEY_TRACKER_PATH = os.getenv('PDFMONKEY_TRACKER_PATH', os.path.join(DATA_DIR, 'pdfmonkey.sqlite3'))
+PDFMONKEY_WEBHOOK_ENABLED = os.getenv('PDFMONKEY_WEBHOOK_ENABLED', 'false').lower() == 'true'
+PDFMONKEY_TIMEOUT = int(os.getenv('PDFMONKEY_TIMEOUT', '90'))  # seconds per document
+
+# Local Pipedrive mirror (see services/pipedrive_mirror.py)
+PIPEDRIVE_MIRROR_PATH = os.getenv('PIPEDRIVE_MIRROR_PATH', os.path.join(DATA_DIR, 'pipedrive_mirror.sqlite3'))
+PIPEDRIVE_MIRROR_MAX_AGE = int(os.getenv('PIPEDRIVE_MIRROR_MAX_AGE', '300'))  # seconds before a delta sync
+
+# Single leader across gunicorn workers for nurture sends (see utils/leader_lease.py)
+LEADER_LEASE_PATH = os.getenv('LEADER_LEASE_PATH', os.path.join(DATA_DIR, 'leases.sqlite3'))
+LEADER_LEASE_TTL = int(os.getenv('LEADER_LEASE_TTL', '30'))  # seconds before a dead leader is replaced
+
+# Organization/person de-duplication for repeat leads (see services/crm_index.py)
+CRM_INDEX_PATH = os.getenv('CRM_INDEX_PATH', os.path.join(DATA_DIR, 'crm_index.sqlite3'))
+
+# Person lookups for outgoing email (see services/person_resolver.py)
+PERSON_CACHE_TTL = int(os.getenv('PERSON_CACHE_TTL', '900'))  # seconds
+PERSON_CACHE_MAX_ENTRIES = int(os.getenv('PERSON_CACHE_MAX_ENTRIES', '5000'))
+
+# Pooled SMTP connections (see services/smtp_pool.py)
+SMTP_POOL_SIZE = int(os.getenv('SMTP_POOL_SIZE', '2'))  # Per gunicorn worker
+SMTP_IDLE_TIMEOUT = int(os.getenv('SMTP_IDLE_TIMEOUT', '60'))  # seconds before an idle connection is closed
+SMTP_MAX_MESSAGES = int(os.getenv('SMTP_MAX_MESSAGES', '100'))  # per connection
+
+# Outbound HTTP keep-alive pools (see utils/http_client.py)
+HTTP_POOL_HOSTS = int(os.getenv('HTTP_POOL_HOSTS', '10'))  # Hosts with a kept pool
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '10'))  # Idle connections per host, per gunicorn worker
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))  # seconds; read timeouts are per call
 
 # =============================================================================
 # CLAUDE AI SETTINGS
 # =============================================================================
 
+ANTHROPIC_BASE_URL = os.getenv('ANTHROPIC_BASE_URL', 'https://api.anthropic.com')
 CLAUDE_MODEL = "claude-sonnet-4-20250514"
 CLAUDE_MAX_TOKENS = 4000
 CLAUDE_TIMEOUT = 60  # seconds
+CLAUDE_RETRIES = 5  # 429s wait for the host-wide pause; 5xx/529, timeouts and connection errors back off
+CLAUDE_RETRY_DELAY = 2.0  # Seconds before the first retry after a 5xx or connection error, doubled per attempt
+
+# Host-wide Claude limits, shared by all gunicorn workers (see utils/rate_limiter.py)
+CLAUDE_RATE_LIMIT_PATH = os.getenv('CLAUDE_RATE_LIMIT_PATH', os.path.join(DATA_DIR, 'claude_rate_limit.sqlite3'))
+CLAUDE_MAX_CONCURRENT = int(os.getenv('CLAUDE_MAX_CONCURRENT', '4'))
+CLAUDE_REQUESTS_PER_MINUTE = int(os.getenv('CLAUDE_REQUESTS_PER_MINUTE', '50'))
+CLAUDE_INPUT_TOKENS_PER_MINUTE = int(os.getenv('CLAUDE_INPUT_TOKENS_PER_MINUTE', '30000'))
+CLAUDE_OUTPUT_TOKENS_PER_MINUTE = int(os.getenv('CLAUDE_OUTPUT_TOKENS_PER_MINUTE', '8000'))
+
+# Message Batches API (backlog re-analysis, see v2/reanalyze.py)
+CLAUDE_BATCH_POLL_SECONDS = int(os.getenv('CLAUDE_BATCH_POLL_SECONDS', '30'))
+CLAUDE_BATCH_MAX_WAIT_HOURS = 24  # Batches expire after 24 hours
 
 # =============================================================================
 # BRAND COLORS (for PDF generation)
@@ -163,6 +255,8 @@ def validate_config():
         issues.append("PIPEDRIVE_API_TOKEN not set - CRM integration disabled")
     if not GMAIL_APP_PASSWORD:
         issues.append("GMAIL_APP_PASSWORD not set - Email sending disabled")
+    if PDFMONKEY_WEBHOOK_ENABLED and not PDFMONKEY_WEBHOOK_SECRET:
+        issues.append("PDFMONKEY_WEBHOOK_SECRET not set - /webhook/pdfmonkey rejects all events")
 
     return issues
 
@@ -3,3 +3,5 @@
 from .typeform import typeform_webhook, parse_typeform_data
 from .meta_lead import meta_lead_webhook
 from .manual import send_pdf_email, update_pdf_urls
+from .pdfmonkey import pdfmonkey_webhook
+from .pipedrive import pipedrive_webhook
@@ -7,7 +7,8 @@ from datetime import datetime, timedelta
 from flask import request, jsonify
 
 from ..config import PIPEDRIVE_BASE_URL, PIPEDRIVE_API_TOKEN
-from ..services import PipedriveService, EmailService
+from ..services import PipedriveService, EmailService, get_pipedrive_mirror, get_person_resolver
+from ..services.person_resolver import primary_email
 from ..templates import get_pdf_delivery_email
 from ..utils import get_logger
 
@@ -105,8 +106,8 @@ def send_pdf_email():
 
         pipedrive = PipedriveService()
 
-        # Get deal details
-        deal = pipedrive.get_deal(deal_id)
+        # Get deal details (mirror first, includes the person's email)
+        deal = get_pipedrive_mirror().get_deal(deal_id) or pipedrive.get_deal(deal_id)
         if not deal:
             return jsonify({"error": f"Deal {deal_id} not found"}), 404
 
@@ -117,11 +118,8 @@ def send_pdf_email():
         bedrijf = data.get('bedrijf', 'je bedrijf')
 
         # Try to get email from deal's person
-        if not recipient_email:
-            person_id = deal.get('person_id', {}).get('value') if isinstance(deal.get('person_id'), dict) else deal.get('person_id')
-            if person_id:
-                # Note: Would need to fetch person details here
-                pass
+        if not recipient_email and deal.get('person_id'):
+            recipient_email = primary_email(get_person_resolver().resolve_one(deal['person_id']))
 
         if not recipient_email:
             return jsonify({"error": "recipient_email is required (not found in deal)"}), 400
@@ -10,7 +10,8 @@ from flask import request, jsonify
 from ..config import META_VERIFY_TOKEN, TYPEFORM_ID
 from ..services import PipedriveService, EmailService, LeadScorer
 from ..templates import get_meta_welcome_email
-from ..utils import get_logger
+from ..utils import get_logger, get_idempotency_store, idempotent
+from ..utils.idempotency import meta_delivery_key
 
 logger = get_logger("meta_lead_handler")
 
@@ -73,6 +74,7 @@ def parse_meta_lead_data(data: Dict) -> Dict[str, Any]:
     }
 
 
+@idempotent(meta_delivery_key, get_idempotency_store)
 def meta_lead_webhook():
     """
     Handle Meta/Facebook Lead Ads webhook.
@@ -143,9 +145,9 @@ def meta_lead_webhook():
 
         org_id = None
         if lead['bedrijf']:
-            org_id = pipedrive.create_organization(lead['bedrijf'])
+            org_id, _ = pipedrive.find_or_create_organization(lead['bedrijf'], lead['email'])
 
-        person_id = pipedrive.create_person(
+        person_id, _ = pipedrive.find_or_create_person(
             name=lead['contact'] or voornaam,
             email=lead['email'],
             phone=lead['telefoon'],
@@ -0,0 +1,38 @@
+"""
+PDFMonkey Webhook Handler - document generation finished.
+Wakes the tracker so a finished document is checked on the API right away
+(see services/pdfmonkey_tracker.py).
+"""
+
+import hmac
+
+from flask import request, jsonify
+
+from ..config import PDFMONKEY_WEBHOOK_SECRET
+from ..services.pdfmonkey_tracker import get_pdfmonkey_tracker
+from ..utils import get_logger
+
+logger = get_logger("pdfmonkey_handler")
+
+
+def pdfmonkey_webhook():
+    """
+    Note a PDFMonkey documents.generation.success / .failure event.
+
+    Configure the PDFMonkey webhook URL as
+    https://<host>/webhook/pdfmonkey?token=<PDFMONKEY_WEBHOOK_SECRET>
+    Without a secret every event is rejected (polling still completes documents).
+    """
+    if not PDFMONKEY_WEBHOOK_SECRET or not hmac.compare_digest(
+        request.args.get('token', ''), PDFMONKEY_WEBHOOK_SECRET
+    ):
+        logger.warning("PDFMonkey webhook with invalid token rejected")
+        return jsonify({"error": "Invalid token"}), 403
+
+    data = request.get_json(force=True, silent=True) or {}
+    document_id = get_pdfmonkey_tracker().record_webhook(data)
+    if not document_id:
+        return jsonify({"error": "No document in payload"}), 400
+
+    logger.info(f"PDFMonkey webhook: document {document_id} recorded")
+    return jsonify({"success": True, "document_id": document_id}), 200
@@ -0,0 +1,38 @@
+"""
+Pipedrive Webhook Handler - deal and person changes.
+Keeps the local mirror current between delta syncs (see services/pipedrive_mirror.py).
+"""
+
+import hmac
+
+from flask import request, jsonify
+
+from ..config import PIPEDRIVE_WEBHOOK_SECRET
+from ..services.pipedrive_mirror import get_pipedrive_mirror
+from ..utils import get_logger
+
+logger = get_logger("pipedrive_handler")
+
+
+def pipedrive_webhook():
+    """
+    Apply a Pipedrive deal/person added, updated or deleted event to the mirror.
+
+    Configure the Pipedrive webhooks (object deal and person, action *) as
+    https://<host>/webhook/pipedrive?token=<PIPEDRIVE_WEBHOOK_SECRET>
+    Nurture emails are sent from mirrored data, so unsigned events are never applied.
+    """
+    if not PIPEDRIVE_WEBHOOK_SECRET or not hmac.compare_digest(
+        request.args.get('token', ''), PIPEDRIVE_WEBHOOK_SECRET
+    ):
+        logger.warning("Pipedrive webhook with invalid token rejected")
+        return jsonify({"error": "Invalid token"}), 403
+
+    data = request.get_json(force=True, silent=True) or {}
+    event = get_pipedrive_mirror().apply_webhook(data)
+    if not event:
+        # Other objects are acknowledged so Pipedrive does not retry them
+        return jsonify({"success": True, "ignored": True}), 200
+
+    logger.debug(f"Pipedrive webhook: {event} applied")
+    return jsonify({"success": True, "event": event}), 200
@@ -3,24 +3,32 @@ Typeform Webhook Handler - Main lead capture endpoint.
 V2: Re-enables automatic Claude analysis with async processing.
 """
 
-import threading
+import time
 from typing import Dict, Any, Optional
 from flask import request, jsonify
 from datetime import datetime
 
-from ..config import ENABLE_AUTO_ANALYSIS, ENABLE_ASYNC_PROCESSING
+from ..config import ENABLE_AUTO_ANALYSIS, ENABLE_ASYNC_PROCESSING, TYPEFORM_ACK_FIRST
 from ..services import (
     PipedriveService,
     analyze_vacancy,
     EmailService,
     PDFGenerator,
+    wait_for_pdf,
     LeadScorer
 )
 from ..templates import get_confirmation_email, get_analysis_report_email
-from ..utils import get_logger, extract_text_from_file
+from ..utils import (
+    get_logger, extract_text_from_file, get_job_queue, get_intake_queue, get_render_pool, get_idempotency_store, idempotent
+)
+from ..utils.idempotency import typeform_delivery_key
+from ..utils.metrics import get_metrics, stage_timer
 
 logger = get_logger("typeform_handler")
 
+ANALYSIS_JOB = "typeform_analysis"
+INTAKE_JOB = "typeform_intake"
+
 
 def parse_typeform_data(webhook_data: Dict) -> Dict[str, Any]:
     """
@@ -136,26 +144,24 @@ def process_analysis_async(
 ):
     """
     Background task: Analyze vacancy, generate PDFs, send email.
-    This runs in a separate thread to not block the webhook response.
+    Runs as a durable job queue job to not block the webhook response.
     """
     try:
         logger.info(f"[ASYNC] Starting analysis for deal {deal_id}")
 
+        # Warm the ReportLab workers while Claude is busy (no-op once running)
+        get_render_pool().start(wait=False)
+
         # 1. Run Claude analysis
         analysis = analyze_vacancy(vacancy_text, bedrijf)
 
         if not analysis.success:
-            logger.error(f"[ASYNC] Analysis failed for deal {deal_id}: {analysis.error}")
-            # Add note to Pipedrive about failure
-            pipedrive = PipedriveService()
-            pipedrive.add_note(deal_id, f"⚠️ Automatische analyse mislukt: {analysis.error}")
-            return
+            raise RuntimeError(f"Analysis failed: {analysis.error}")
 
         logger.info(f"[ASYNC] Analysis complete: score={analysis.score}")
 
-        # 2. Generate PDF
-        pdf_gen = PDFGenerator()
-        pdf_result = pdf_gen.generate_analysis_report(
+        # 2. Start the PDF; it renders while the analysis goes to Pipedrive
+        pdf_future = PDFGenerator().start_analysis_report(
             bedrijf, voornaam, functie, analysis
         )
 
@@ -176,6 +182,7 @@ def process_analysis_async(
             original_text=vacancy_text[:500]
         )
 
+        pdf_result = wait_for_pdf(pdf_future)
         attachments = []
         if pdf_result.success and pdf_result.pdf_bytes:
             attachments.append((f"Analyse_{bedrijf}.pdf", pdf_result.pdf_bytes))
@@ -193,9 +200,134 @@ def process_analysis_async(
         logger.info(f"[ASYNC] Complete for deal {deal_id}")
 
     except Exception as e:
+        # Raised so the job queue retries it (see analysis_failed for the final attempt)
         logger.error(f"[ASYNC] Error for deal {deal_id}: {e}", exc_info=True)
+        raise
+
+
+def analysis_failed(error: str, deal_id: int, **payload):
+    """Job failed permanently: leave a note on the deal."""
+    PipedriveService().add_note(deal_id, f"⚠️ Automatische analyse mislukt: {error}")
+
+
+get_job_queue().register(ANALYSIS_JOB, process_analysis_async, on_failure=analysis_failed)
+
+
+# =============================================================================
+# INTAKE STAGES
+# =============================================================================
+# Each stage takes and returns the lead dict (JSON, so it can be a job payload).
+# The synchronous handler runs them in order; in TYPEFORM_ACK_FIRST mode every
+# stage is a job that enqueues the next one, so a retry repeats one stage only.
+
+def stage_extract(lead: Dict[str, Any]) -> Dict[str, Any]:
+    """Use the uploaded file's text as vacancy text when it has any."""
+    lead['vacancy_text'] = lead['vacature']
+    if lead['file_url']:
+        logger.info("Extracting text from uploaded file...")
+        extracted = extract_text_from_file(lead['file_url'])
+        if extracted and len(extracted) > 50:
+            lead['vacancy_text'] = extracted
+            logger.info(f"Using extracted file text: {len(extracted)} chars")
+    return lead
+
+
+def stage_confirm(lead: Dict[str, Any]) -> Dict[str, Any]:
+    """Send the confirmation email."""
+    confirmation_html = get_confirmation_email(lead['voornaam'], lead['bedrijf'], lead['functie'])
+    lead['confirmation_sent'] = EmailService().send(
+        lead['email'],
+        f"✅ Ontvangen: Vacature-analyse voor {lead['functie']}",
+        confirmation_html
+    ).success
+    return lead
+
+
+def stage_crm(lead: Dict[str, Any]) -> Dict[str, Any]:
+    """Create (or reuse) organization and person, and create the deal."""
+    lead_result = PipedriveService().create_full_lead(
+        company_name=lead['bedrijf'],
+        contact_name=lead['contact'],
+        email=lead['email'],
+        phone=lead['telefoon'],
+        vacancy_title=lead['functie'],
+        vacancy_text=lead['vacancy_text'],
+        source='typeform_prefilled' if lead['prefilled'] else 'typeform'
+    )
+    lead.update(lead_result)
+    return lead
+
+
+def stage_score(lead: Dict[str, Any]) -> Dict[str, Any]:
+    """Calculate the lead score."""
+    lead_score = LeadScorer().score_from_typeform(lead)
+    logger.info(f"Lead score: {lead_score.total_score} ({lead_score.category})")
+    lead['lead_score'] = lead_score.total_score
+    lead['lead_category'] = lead_score.category
+    return lead
+
+
+def stage_analysis(lead: Dict[str, Any]) -> Dict[str, Any]:
+    """Start the Claude analysis if enabled and there is enough vacancy text."""
+    vacancy_text, deal_id = lead['vacancy_text'], lead.get('deal_id')
+    lead['analysis_started'] = False
+    if ENABLE_AUTO_ANALYSIS and vacancy_text and len(vacancy_text) > 100 and deal_id:
+        if ENABLE_ASYNC_PROCESSING:
+            # Persist to the job queue; a bounded worker pool picks it up
+            job_id = get_job_queue().enqueue(ANALYSIS_JOB, {
+                'deal_id': deal_id,
+                'vacancy_text': vacancy_text,
+                'email': lead['email'],
+                'voornaam': lead['voornaam'],
+                'bedrijf': lead['bedrijf'],
+                'functie': lead['functie']
+            })
+            logger.info(f"Async analysis queued for deal {deal_id} (job {job_id})")
+        else:
+            # Synchronous (blocks response, no retries)
+            try:
+                process_analysis_async(
+                    deal_id, vacancy_text, lead['email'], lead['voornaam'], lead['bedrijf'], lead['functie']
+                )
+            except Exception as e:
+                analysis_failed(str(e), deal_id)
+        lead['analysis_started'] = True
+    return lead
+
+
+INTAKE_STAGES = (
+    ("extract", stage_extract),
+    ("confirm", stage_confirm),
+    ("crm", stage_crm),
+    ("score", stage_score),
+    ("analysis", stage_analysis),
+)
+
+
+def run_intake_stage(stage: int, lead: Dict[str, Any]) -> None:
+    """Job handler: run one intake stage, then queue the next."""
+    name, run = INTAKE_STAGES[stage]
+    if stage == 0:
+        get_metrics().record("typeform.queue_wait", time.time() - lead['received_at'])
+    with stage_timer(f"typeform.{name}"):
+        lead = run(lead)
+
+    if stage + 1 < len(INTAKE_STAGES):
+        get_intake_queue().enqueue(INTAKE_JOB, {'stage': stage + 1, 'lead': lead})
+    else:
+        get_metrics().record("typeform.total", time.time() - lead['received_at'])
+        logger.info(
+            f"Intake done: confirmation={lead['confirmation_sent']}, deal={lead.get('deal_id')}, "
+            f"analysis={lead['analysis_started']}"
+        )
+
 
+get_intake_queue().register(INTAKE_JOB, run_intake_stage)
+# Drains intake jobs queued on the shared job queue before it had its own
+get_job_queue().register(INTAKE_JOB, run_intake_stage)
 
+
+@idempotent(typeform_delivery_key, get_idempotency_store)
 def typeform_webhook():
     """
     Handle Typeform webhook submissions.
@@ -208,6 +340,9 @@ def typeform_webhook():
     5. Create Pipedrive records
     6. Calculate lead score
     7. Start async analysis (if enabled)
+
+    With TYPEFORM_ACK_FIRST, steps 3-7 are queued as INTAKE_STAGES jobs and the
+    response only confirms that the submission was persisted.
     """
     logger.info("TYPEFORM WEBHOOK RECEIVED")
 
@@ -223,76 +358,34 @@ def typeform_webhook():
             logger.error(f"No valid email: {parsed}")
             return jsonify({"error": "No valid email", "parsed": parsed}), 400
 
-        # Extract file content if uploaded
-        vacancy_text = parsed['vacature']
-        if parsed['file_url']:
-            logger.info("Extracting text from uploaded file...")
-            extracted = extract_text_from_file(parsed['file_url'])
-            if extracted and len(extracted) > 50:
-                vacancy_text = extracted
-                logger.info(f"Using extracted file text: {len(extracted)} chars")
+        lead = {**parsed, 'received_at': time.time()}
 
-        # Send confirmation email immediately
-        email_service = EmailService()
-        confirmation_html = get_confirmation_email(
-            parsed['voornaam'],
-            parsed['bedrijf'],
-            parsed['functie']
-        )
-        confirmation_sent = email_service.send(
-            parsed['email'],
-            f"✅ Ontvangen: Vacature-analyse voor {parsed['functie']}",
-            confirmation_html
-        ).success
+        # Ack-first: persist and reply, the stages run on the intake queue workers
+        if TYPEFORM_ACK_FIRST:
+            job_id = get_intake_queue().enqueue(INTAKE_JOB, {'stage': 0, 'lead': lead})
+            get_metrics().record("typeform.ack", time.time() - lead['received_at'])
+            logger.info(f"Submission accepted, intake queued (job {job_id})")
+            return jsonify({"success": True, "accepted": True, "job_id": job_id}), 200
 
-        # Create Pipedrive records
-        pipedrive = PipedriveService()
-        lead_result = pipedrive.create_full_lead(
-            company_name=parsed['bedrijf'],
-            contact_name=parsed['contact'],
-            email=parsed['email'],
-            phone=parsed['telefoon'],
-            vacancy_title=parsed['functie'],
-            vacancy_text=vacancy_text,
-            source='typeform_prefilled' if parsed['prefilled'] else 'typeform'
-        )
-
-        deal_id = lead_result.get('deal_id')
-
-        # Calculate and store lead score
-        scorer = LeadScorer()
-        lead_score = scorer.score_from_typeform(parsed)
-        logger.info(f"Lead score: {lead_score.total_score} ({lead_score.category})")
-
-        # Start async analysis if enabled and we have vacancy text
-        analysis_started = False
-        if ENABLE_AUTO_ANALYSIS and vacancy_text and len(vacancy_text) > 100 and deal_id:
-            if ENABLE_ASYNC_PROCESSING:
-                # Run in background thread
-                thread = threading.Thread(
-                    target=process_analysis_async,
-                    args=(deal_id, vacancy_text, parsed['email'], parsed['voornaam'], parsed['bedrijf'], parsed['functie'])
-                )
-                thread.daemon = True
-                thread.start()
-                analysis_started = True
-                logger.info(f"Async analysis started for deal {deal_id}")
-            else:
-                # Synchronous (blocks response)
-                process_analysis_async(deal_id, vacancy_text, parsed['email'], parsed['voornaam'], parsed['bedrijf'], parsed['functie'])
-                analysis_started = True
+        for name, run in INTAKE_STAGES:
+            with stage_timer(f"typeform.{name}"):
+                lead = run(lead)
+        get_metrics().record("typeform.total", time.time() - lead['received_at'])
 
-        logger.info(f"Done: confirmation={confirmation_sent}, deal={deal_id}, analysis={analysis_started}")
+        logger.info(
+            f"Done: confirmation={lead['confirmation_sent']}, deal={lead.get('deal_id')}, "
+            f"analysis={lead['analysis_started']}"
+        )
 
         return jsonify({
             "success": True,
-            "confirmation_sent": confirmation_sent,
-            "analysis_started": analysis_started,
-            "lead_score": lead_score.total_score,
-            "lead_category": lead_score.category,
-            "org_id": lead_result.get('org_id'),
-            "person_id": lead_result.get('person_id'),
-            "deal_id": deal_id
+            "confirmation_sent": lead['confirmation_sent'],
+            "analysis_started": lead['analysis_started'],
+            "lead_score": lead['lead_score'],
+            "lead_category": lead['lead_category'],
+            "org_id": lead.get('org_id'),
+            "person_id": lead.get('person_id'),
+            "deal_id": lead.get('deal_id')
         }), 200
 
     except Exception as e:
@@ -19,6 +19,8 @@ Endpoints:
     GET  /health/detailed   - Detailed health check per service
     POST /webhook/typeform  - Typeform submissions
     POST /webhook/meta-lead - Meta/Facebook Lead Ads
+    POST /webhook/pdfmonkey - PDFMonkey document finished
+    POST /webhook/pipedrive - Pipedrive deal/person changes (mirror)
     POST /update-pdf-urls   - Add PDF URLs to deal
     POST /send-pdf-email    - Send PDF delivery email
     POST /nurture/process   - Process pending nurture emails
@@ -35,9 +37,20 @@ from datetime import datetime
 from .config import get_config_status, validate_config
 from .handlers.typeform import typeform_webhook
 from .handlers.meta_lead import meta_lead_webhook
+from .handlers.pdfmonkey import pdfmonkey_webhook
+from .handlers.pipedrive import pipedrive_webhook
 from .handlers.manual import update_pdf_urls, send_pdf_email, test_email
-from .nurture.processor import process_pending_nurtures
-from .utils import get_logger
+from .nurture.processor import process_pending_nurtures, NURTURE_LEASE
+from .nurture.templates import template_stats
+from .services.pdfmonkey_tracker import get_pdfmonkey_tracker
+from .services.pipedrive_mirror import get_pipedrive_mirror
+from .services.person_resolver import get_person_resolver
+from .services.crm_index import get_crm_index
+from .services.smtp_pool import get_smtp_pool
+from .utils import (
+    get_logger, get_job_queue, get_intake_queue, get_analysis_cache, get_usage_tracker, get_rate_limiter,
+    get_render_pool, get_http_client, get_idempotency_store, get_metrics, get_leader_lease
+)
 
 logger = get_logger("main")
 
@@ -92,6 +105,22 @@ def health_detailed():
         "version": "2.0",
         "timestamp": datetime.now().isoformat(),
         "services": config,
+        "job_queue": get_job_queue().stats(),
+        "intake_queue": get_intake_queue().stats(),
+        "analysis_cache": get_analysis_cache().stats(),
+        "idempotency": get_idempotency_store().stats(),
+        "stages": get_metrics().stats(),
+        "claude_usage": get_usage_tracker().stats(),
+        "claude_rate_limit": get_rate_limiter().stats(),
+        "pdf_render": get_render_pool().stats(),
+        "pdfmonkey": get_pdfmonkey_tracker().stats(),
+        "http": get_http_client().stats(),
+        "smtp": get_smtp_pool().stats(),
+        "pipedrive_mirror": get_pipedrive_mirror().stats(),
+        "persons": get_person_resolver().stats(),
+        "crm_index": get_crm_index().stats(),
+        "nurture_lease": get_leader_lease(NURTURE_LEASE).stats(),
+        "nurture_templates": template_stats(),
         "features": {
             "auto_analysis": config.get("auto_analysis", False),
             "lead_scoring": config.get("lead_scoring", False),
@@ -117,6 +146,18 @@ def handle_meta_lead():
     return meta_lead_webhook()
 
 
+@app.route("/webhook/pdfmonkey", methods=["POST"])
+def handle_pdfmonkey():
+    """Handle PDFMonkey document generation webhooks."""
+    return pdfmonkey_webhook()
+
+
+@app.route("/webhook/pipedrive", methods=["POST"])
+def handle_pipedrive():
+    """Handle Pipedrive deal/person change webhooks."""
+    return pipedrive_webhook()
+
+
 # =============================================================================
 # MANUAL PROCESSING ENDPOINTS
 # =============================================================================
@@ -177,5 +218,10 @@ if __name__ == "__main__":
     port = int(os.getenv("PORT", 5000))
     debug = os.getenv("FLASK_DEBUG", "false").lower() == "true"
 
+    # Start background workers (also drains jobs left over from a previous worker);
+    # elsewhere they start on the first enqueue
+    get_job_queue().start()
+    get_intake_queue().start()
+
     logger.info(f"Starting server on port {port} (debug={debug})")
     app.run(host="0.0.0.0", port=port, debug=debug)
@@ -1,4 +1,6 @@
 """V2 Nurture System Package"""
 
+from .pipeline import NurturePipeline, NurtureEmail, render_nurture_email
 from .processor import NurtureProcessor, process_pending_nurtures
 from .scheduler import get_next_email_for_deal
+from .due_index import NurtureDueIndex, DueScheduler
@@ -0,0 +1,170 @@
+"""
+Vectorized nurture eligibility for a whole pipeline.
+
+get_next_email_for_deal parses the rapport date with strptime and looks up
+the next email one deal at a time. For a full run the same decision is made
+here in one NumPy pass over a columnar snapshot:
+
+    snapshot = DealSnapshot.from_rows(mirror.nurture_columns(stage_id, len(EMAIL_SCHEDULE)))
+    result = evaluate(snapshot, stage_id=NURTURE_ACTIVE_STAGE)
+    deals = mirror.get_deals(result.due_ids())
+
+The result matches get_next_email_for_deal for every deal (email number due,
+days elapsed); only the due deals then need to be loaded and rendered.
+NumPy is optional: without it NUMPY_AVAILABLE is False and callers keep the
+per-deal path.
+"""
+
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ..config import EMAIL_SCHEDULE, FIELD_RAPPORT_VERZONDEN, FIELD_EMAIL_SEQUENCE_STATUS
+from ..utils import get_logger
+
+logger = get_logger("nurture_batch")
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    logger.warning("NumPy not installed - nurture eligibility is evaluated per deal")
+
+NO_DATE = -(2 ** 31)  # days_elapsed of deals without a (valid) rapport date
+DIGIT_POSITIONS = [0, 1, 2, 3, 5, 6, 8, 9]  # in YYYY-MM-DD
+
+
+def _sequence_number(value: Any) -> int:
+    """Last sent email number, as get_next_email_for_deal reads it."""
+    try:
+        return int(value) if value else 0
+    except (TypeError, ValueError):
+        return 0
+
+
+def _parse_dates(values: Sequence[Any]) -> "np.ndarray":
+    """YYYY-MM-DD strings -> datetime64[D], NaT for missing or invalid dates (as strptime decides)."""
+    strings = [value if isinstance(value, str) else "" for value in values]
+    dates = np.full(len(strings), np.datetime64("NaT"), dtype="datetime64[D]")
+    if not strings:
+        return dates
+
+    # Exact YYYY-MM-DD: digits and calendar checked on the code points, no exceptions per bad value
+    codes = np.array(strings, dtype="U10").view(np.uint32).reshape(len(strings), 10).astype(np.int64)
+    digits = codes - ord("0")
+    lengths = np.fromiter(map(len, strings), dtype=np.int64, count=len(strings))
+    shaped = ((lengths == 10) & (codes[:, 4] == ord("-")) & (codes[:, 7] == ord("-"))
+              & ((digits[:, DIGIT_POSITIONS] >= 0) & (digits[:, DIGIT_POSITIONS] <= 9)).all(axis=1))
+
+    year = digits[:, 0] * 1000 + digits[:, 1] * 100 + digits[:, 2] * 10 + digits[:, 3]
+    month = digits[:, 5] * 10 + digits[:, 6]
+    day = digits[:, 8] * 10 + digits[:, 9]
+    valid = shaped & (year >= 1) & (month >= 1) & (month <= 12) & (day >= 1)
+
+    month_start = ((np.where(valid, year, 1970) - 1970) * 12 + np.where(valid, month, 1) - 1).astype("datetime64[M]")
+    month_days = ((month_start + 1).astype("datetime64[D]") - month_start.astype("datetime64[D]")).astype(np.int64)
+    valid &= day <= month_days
+    dates[valid] = month_start[valid].astype("datetime64[D]") + (day[valid] - 1)
+
+    # Other spellings strptime accepts (2024-1-5): rare, parsed one by one
+    for i in np.flatnonzero(~shaped & (lengths > 0)):
+        try:
+            dates[i] = np.datetime64(datetime.strptime(strings[i], '%Y-%m-%d').date(), "D")
+        except ValueError:
+            pass
+    return dates
+
+
+@dataclass
+class DealSnapshot:
+    """Columnar view of the deals to evaluate: one array entry per deal."""
+
+    deal_id: "np.ndarray"        # int64
+    stage_id: "np.ndarray"       # int64 (0 when unknown)
+    rapport_date: "np.ndarray"   # datetime64[D], NaT when missing / invalid
+    current_email: "np.ndarray"  # int64, last sent email number
+
+    def __len__(self) -> int:
+        return len(self.deal_id)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[int, Optional[int], Optional[str], int]]) -> "DealSnapshot":
+        """From (deal_id, stage_id, rapport_verzonden, sequence_num) rows, e.g. PipedriveMirror.nurture_columns."""
+        rows = list(rows)
+        return cls(
+            deal_id=np.array([row[0] for row in rows], dtype=np.int64),
+            stage_id=np.array([row[1] or 0 for row in rows], dtype=np.int64),
+            rapport_date=_parse_dates([row[2] for row in rows]),
+            current_email=np.array([min(max(row[3] or 0, -1), 1 << 31) for row in rows], dtype=np.int64),
+        )
+
+    @classmethod
+    def from_deals(cls, deals: Iterable[Dict]) -> "DealSnapshot":
+        """From Pipedrive deal dicts (list or detail endpoint shape)."""
+        return cls.from_rows(
+            (
+                deal.get('id') or 0,
+                deal.get('stage_id'),
+                deal.get(FIELD_RAPPORT_VERZONDEN),
+                _sequence_number(deal.get(FIELD_EMAIL_SEQUENCE_STATUS, '0')),
+            )
+            for deal in deals
+        )
+
+
+@dataclass
+class Eligibility:
+    """Per deal: email number due now (0 = none) and days since the rapport (NO_DATE = no date)."""
+
+    deal_id: "np.ndarray"
+    email_num: "np.ndarray"
+    days_elapsed: "np.ndarray"
+
+    @property
+    def due(self) -> "np.ndarray":
+        return self.email_num > 0
+
+    def due_ids(self) -> List[int]:
+        return self.deal_id[self.due].tolist()
+
+    def counts(self) -> Dict[int, int]:
+        """Number of deals due per email number."""
+        numbers, counts = np.unique(self.email_num[self.due], return_counts=True)
+        return dict(zip(numbers.tolist(), counts.tolist()))
+
+
+def evaluate(
+    snapshot: DealSnapshot,
+    today: date = None,
+    stage_id: int = None,
+    schedule: Dict[int, Dict] = EMAIL_SCHEDULE,
+) -> Eligibility:
+    """
+    get_next_email_for_deal for every deal at once. With stage_id, deals in
+    other stages are never due.
+    """
+    today = np.datetime64(today or datetime.now().date(), "D")
+    has_date = ~np.isnat(snapshot.rapport_date)
+    days = np.where(has_date, (today - snapshot.rapport_date).astype(np.int64), NO_DATE)
+
+    # Day offset of every email number; numbers outside the schedule are never due
+    max_num = max(schedule)
+    offsets = np.full(max_num + 2, np.iinfo(np.int64).max, dtype=np.int64)
+    for num, email in schedule.items():
+        if num > 0:
+            offsets[num] = email['day']
+
+    next_email = snapshot.current_email + 1
+    in_schedule = (next_email >= 1) & (next_email <= max_num)
+    scheduled_day = offsets[np.where(in_schedule, next_email, max_num + 1)]
+
+    due = has_date & in_schedule & (days >= scheduled_day)
+    if stage_id is not None:
+        due &= snapshot.stage_id == stage_id
+
+    return Eligibility(
+        deal_id=snapshot.deal_id,
+        email_num=np.where(due, next_email, 0),
+        days_elapsed=days,
+    )
@@ -0,0 +1,272 @@
+"""
+Due-date index for nurture emails.
+
+The hourly scheduler rescanned every open deal in the nurture stage just to
+find the few whose next email was due. Instead every deal in the sequence is
+indexed once with the timestamp its next email becomes due (rapport date +
+EMAIL_SCHEDULE day, at the start of the send window). DueScheduler sleeps
+until the earliest entry, then hands only the due deal IDs to the caller,
+which sends, re-indexes the following email (set) or drops the deal (remove).
+
+The index lives in SQLite (ordered by due_at), so the schedule is shared
+with other processes. The scheduler still runs a full reindex when it starts
+(or takes over the lease) and periodically after that, to pick up changes
+made in Pipedrive (paused sequences, new deals).
+
+Sent emails are recorded per deal until Pipedrive has stored the new email
+number. While the record exists the caller retries the Pipedrive update
+instead of sending the same email again.
+With a LeaderLease only the process holding it schedules and sends; the
+others stand by and take over when the leader dies.
+"""
+
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from ..utils import get_logger
+from ..utils.leader_lease import LeaderLease
+from ..utils.sqlite_store import SQLiteStore
+
+logger = get_logger("nurture_due_index")
+
+RETRY_SECONDS = 15 * 60  # Deals still due after a run (send failed) are retried this much later
+
+
+def due_at(rapport_date: Union[str, date], day: int, send_hour: int = 9) -> Optional[float]:
+    """Timestamp an email scheduled `day` days after rapport_date (YYYY-MM-DD) becomes due."""
+    if isinstance(rapport_date, str):
+        try:
+            rapport_date = datetime.strptime(rapport_date, '%Y-%m-%d').date()
+        except ValueError:
+            return None
+    if not rapport_date:
+        return None
+    send_day = rapport_date + timedelta(days=day)
+    return datetime(send_day.year, send_day.month, send_day.day, send_hour).timestamp()
+
+
+def window_start(ts: float, window: Tuple[int, int]) -> float:
+    """ts when it falls inside the daily send window [start, end) hours, else the next window opening."""
+    start_hour, end_hour = window
+    moment = datetime.fromtimestamp(ts)
+    if start_hour <= moment.hour < end_hour:
+        return ts
+    opening = moment.replace(hour=start_hour, minute=0, second=0, microsecond=0)
+    if moment.hour >= end_hour:
+        opening += timedelta(days=1)
+    return opening.timestamp()
+
+
+class NurtureDueIndex(SQLiteStore):
+    """deal_id -> (due_at, email_num) of the next nurture email, ordered by due_at."""
+
+    SCHEMA = """
+CREATE TABLE IF NOT EXISTS nurture_due (
+    deal_id INTEGER PRIMARY KEY,
+    due_at REAL NOT NULL,
+    email_num INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_nurture_due_at ON nurture_due (due_at);
+CREATE TABLE IF NOT EXISTS nurture_sent (
+    deal_id INTEGER PRIMARY KEY,
+    email_num INTEGER NOT NULL,
+    sent_at REAL NOT NULL
+);
+"""
+
+    def set(self, deal_id: int, due_at: float, email_num: int) -> None:
+        self._connect().execute(
+            "INSERT OR REPLACE INTO nurture_due (deal_id, due_at, email_num, updated_at) VALUES (?, ?, ?, ?)",
+            (deal_id, due_at, email_num, time.time())
+        )
+
+    def remove(self, deal_id: int) -> None:
+        self._connect().execute("DELETE FROM nurture_due WHERE deal_id = ?", (deal_id,))
+
+    def __contains__(self, deal_id: int) -> bool:
+        return self._connect().execute(
+            "SELECT 1 FROM nurture_due WHERE deal_id = ?", (deal_id,)
+        ).fetchone() is not None
+
+    def mark_sent(self, deal_id: int, email_num: int) -> None:
+        """Record that email_num went out, until clear_sent() once Pipedrive has it."""
+        self._connect().execute(
+            "INSERT OR REPLACE INTO nurture_sent (deal_id, email_num, sent_at) VALUES (?, ?, ?)",
+            (deal_id, email_num, time.time())
+        )
+
+    def sent_email(self, deal_id: int) -> Optional[int]:
+        """Email number sent to the deal but not yet recorded in Pipedrive, if any."""
+        row = self._connect().execute(
+            "SELECT email_num FROM nurture_sent WHERE deal_id = ?", (deal_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def clear_sent(self, deal_id: int) -> None:
+        self._connect().execute("DELETE FROM nurture_sent WHERE deal_id = ?", (deal_id,))
+
+    def replace_all(self, entries: Iterable[Tuple[int, float, int]]) -> int:
+        """Replace the whole index with (deal_id, due_at, email_num) entries from a full scan."""
+        now = time.time()
+        rows = [(deal_id, due, email_num, now) for deal_id, due, email_num in entries]
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM nurture_due")
+            conn.executemany(
+                "INSERT OR REPLACE INTO nurture_due (deal_id, due_at, email_num, updated_at) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    def due(self, now: float = None, limit: int = None) -> List[int]:
+        """Deal IDs due at now, earliest first."""
+        return [row[0] for row in self._connect().execute(
+            "SELECT deal_id FROM nurture_due WHERE due_at <= ? ORDER BY due_at LIMIT ?",
+            (now if now is not None else time.time(), limit if limit is not None else -1)
+        )]
+
+    def postpone(self, deal_ids: Iterable[int], until: float, now: float = None) -> None:
+        """Move entries of deal_ids that are still due at now to until."""
+        self._connect().executemany(
+            "UPDATE nurture_due SET due_at = ?, updated_at = ? WHERE deal_id = ? AND due_at <= ?",
+            [(until, time.time(), deal_id, now if now is not None else time.time()) for deal_id in deal_ids]
+        )
+
+    def next_due_at(self) -> Optional[float]:
+        return self._connect().execute("SELECT MIN(due_at) FROM nurture_due").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Indexed deals, deals due now and the next due time, for health endpoints."""
+        conn = self._connect()
+        indexed, due_now = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(due_at <= ?), 0) FROM nurture_due", (time.time(),)
+        ).fetchone()
+        next_due = self.next_due_at()
+        unrecorded = conn.execute("SELECT COUNT(*) FROM nurture_sent").fetchone()[0]
+        return {
+            "indexed": indexed,
+            "due": due_now,
+            "sent_unrecorded": unrecorded,
+            "next_due": datetime.fromtimestamp(next_due).isoformat(timespec="minutes") if next_due else None,
+        }
+
+
+class DueScheduler:
+    """
+    Background thread that sleeps until the next due entry (inside the send
+    window) and calls run_due(deal_ids) for the due deals only. run_due must
+    set() or remove() each deal it handled; anything still due afterwards is
+    retried RETRY_SECONDS later. A deal that can never send (e.g. no email
+    address) should be removed, the next reindex adds it back. reindex()
+    rebuilds the index from a full scan at start and every reindex_interval
+    seconds. Sleeps are capped at
+    max_sleep, so entries added by other processes are picked up too.
+
+    With a lease, every process runs the thread but only the lease holder
+    does any work; the others retry the lease every lease.ttl seconds. The
+    lease can be lost during a run, so run_due should check is_leader()
+    before each send.
+    """
+
+    def __init__(
+        self,
+        index: NurtureDueIndex,
+        run_due: Callable[[List[int]], Any],
+        reindex: Callable[[], Any],
+        reindex_interval: float = 6 * 3600,
+        window: Tuple[int, int] = (9, 17),
+        batch_size: int = 100,
+        lease: Optional[LeaderLease] = None,
+        max_sleep: float = 300.0,
+    ):
+        self.index = index
+        self.run_due = run_due
+        self.reindex = reindex
+        self.reindex_interval = reindex_interval
+        self.window = window
+        self.batch_size = batch_size
+        self.lease = lease
+        self.max_sleep = max_sleep
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._next_reindex = 0.0
+
+    def start(self) -> bool:
+        """Start the thread unless it is already running. Returns whether it was started."""
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="nurture-scheduler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self.lease:
+            self.lease.release()
+
+    def is_leader(self) -> bool:
+        """Whether this process may send right now (running, and holding the lease if there is one)."""
+        return not self._stop.is_set() and (self.lease is None or self.lease.is_leader())
+
+    def wake(self) -> None:
+        """Re-check the index now, e.g. after a deal was (re)indexed with an earlier due time."""
+        self._wake.set()
+
+    def tick(self, now: float = None) -> int:
+        """Run the due deals once (inside the send window). Returns the number of deals handed to run_due."""
+        now = now if now is not None else time.time()
+        if window_start(now, self.window) > now:
+            return 0
+        handled = 0
+        while self.is_leader():
+            deal_ids = self.index.due(now, self.batch_size)
+            if not deal_ids:
+                break
+            try:
+                self.run_due(deal_ids)
+            except Exception as e:
+                logger.error(f"Nurture run for {len(deal_ids)} due deals failed: {e}")
+            self.index.postpone(deal_ids, now + RETRY_SECONDS, now)
+            handled += len(deal_ids)
+        return handled
+
+    def next_wakeup(self, now: float = None) -> float:
+        """Earliest of the next due entry (moved into the send window) and the next reindex."""
+        now = now if now is not None else time.time()
+        wakeup = self._next_reindex
+        next_due = self.index.next_due_at()
+        if next_due is not None:
+            wakeup = min(wakeup, window_start(max(next_due, now), self.window))
+        return wakeup
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            if self.lease and not self.lease.acquire():
+                self._next_reindex = 0.0  # Reindex when taking over
+                self._wake.wait(self.lease.ttl)
+                self._wake.clear()
+                continue
+            try:
+                if time.time() >= self._next_reindex:
+                    self.reindex()
+                    self._next_reindex = time.time() + self.reindex_interval
+                self.tick()
+                sleep = self.next_wakeup() - time.time()
+            except Exception as e:
+                logger.error(f"Nurture scheduler error: {e}")
+                sleep = RETRY_SECONDS
+            self._wake.wait(min(max(1.0, sleep), self.max_sleep))
+            self._wake.clear()
@@ -0,0 +1,255 @@
+"""
+Nurture Send Pipeline - renders, sends and records a nurture run in stages.
+
+1. Render: every due email is built up front from the deal list (no I/O).
+2. Send: a few sender threads share the pooled SMTP connections. A rate cap
+   spaces the sends evenly, so a run takes about emails / rate instead of
+   emails x (SMTP latency + Pipedrive latency).
+3. Record: the Pipedrive status update and note of a sent email are queued
+   to a separate executor and written while the next emails go out. Pipedrive
+   v1 has no bulk deal update, so the batch is flushed concurrently over the
+   pooled HTTP connections.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Tuple, Union
+
+import requests
+
+from ..config import (
+    NURTURE_SEND_WORKERS, NURTURE_SEND_RATE_PER_MINUTE, NURTURE_UPDATE_WORKERS,
+    FIELD_EMAIL_SEQUENCE_STATUS, FIELD_LAATSTE_EMAIL
+)
+from ..services import PipedriveService, EmailService
+from ..services.pipedrive import PipedriveError
+from ..services.pipedrive_mirror import PipedriveMirror
+from ..services.person_resolver import PersonResolver, get_person_resolver, primary_email, first_name
+from ..utils import get_logger
+from .scheduler import get_next_email_for_deal
+from .templates import get_nurture_email_html, get_nurture_email_subject
+
+logger = get_logger("nurture_pipeline")
+
+
+@dataclass
+class NurtureEmail:
+    """A rendered nurture email, ready to send."""
+    deal_id: int
+    email_num: int
+    email_name: str
+    recipient: str
+    subject: str
+    html: str
+
+
+class SendRateLimiter:
+    """Spaces calls at least 60 / per_minute seconds apart (0 = no cap)."""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def render_nurture_email(deal: Dict, person: Dict = None, now: datetime = None) -> Union[NurtureEmail, Dict[str, Any]]:
+    """
+    Build the due email for a deal, or a skipped/error result dict.
+    person comes from PersonResolver; without it the deal's embedded person is used.
+    """
+    deal_id = deal.get('id')
+
+    # Check if email is due
+    next_email = get_next_email_for_deal(deal, now)
+    if not next_email:
+        return {
+            'deal_id': deal_id,
+            'status': 'skipped',
+            'reason': 'No email due'
+        }
+
+    email_num = next_email['email_num']
+
+    # Get recipient info from deal
+    if person is None:
+        person = deal.get('person_id')
+    if not isinstance(person, dict):
+        return {
+            'deal_id': deal_id,
+            'status': 'error',
+            'reason': 'No person linked to deal'
+        }
+
+    email_address = primary_email(person)
+    if not email_address:
+        return {
+            'deal_id': deal_id,
+            'status': 'error',
+            'reason': 'No email address found'
+        }
+
+    # Get job title from deal title
+    deal_title = deal.get('title', '')
+    functie_titel = deal_title.split(' - ')[1] if ' - ' in deal_title else 'je vacature'
+
+    # Get email content
+    voornaam = first_name(person)
+    html = get_nurture_email_html(email_num, voornaam, functie_titel)
+    if not html:
+        return {
+            'deal_id': deal_id,
+            'status': 'error',
+            'reason': f'No template for email {email_num}'
+        }
+
+    return NurtureEmail(
+        deal_id=deal_id,
+        email_num=email_num,
+        email_name=next_email['name'],
+        recipient=email_address,
+        subject=get_nurture_email_subject(email_num),
+        html=html
+    )
+
+
+class NurturePipeline:
+    """Sends a nurture run with parallel senders, a rate cap and batched CRM updates."""
+
+    def __init__(
+        self,
+        pipedrive: PipedriveService = None,
+        email_service: EmailService = None,
+        send_workers: int = NURTURE_SEND_WORKERS,
+        rate_per_minute: float = NURTURE_SEND_RATE_PER_MINUTE,
+        update_workers: int = NURTURE_UPDATE_WORKERS,
+        mirror: PipedriveMirror = None,
+        persons: PersonResolver = None,
+    ):
+        self.pipedrive = pipedrive or PipedriveService()
+        self.mirror = mirror
+        self.persons = persons or get_person_resolver()
+        self.email_service = email_service or EmailService()
+        self.send_workers = max(1, send_workers)
+        self.update_workers = max(1, update_workers)
+        self.rate = SendRateLimiter(rate_per_minute)
+
+    def render(self, deals: Iterable[Dict], now: datetime = None) -> Tuple[List[NurtureEmail], List[Dict[str, Any]], int]:
+        """
+        Split deals into rendered emails and skipped/error results, plus the number
+        of deals read. deals may be a lazy iterator (PipedriveService.iter_deals);
+        only the due deals are kept. A listing error ends the run's input early.
+        The persons of all due deals are then resolved in one go.
+        """
+        due, results, count = [], [], 0
+        try:
+            for deal in deals:
+                count += 1
+                if get_next_email_for_deal(deal, now):
+                    due.append(deal)
+                else:
+                    results.append({'deal_id': deal.get('id'), 'status': 'skipped', 'reason': 'No email due'})
+        except (PipedriveError, requests.RequestException) as e:
+            logger.error(f"Deal listing stopped after {count} deals: {e}")
+            results.append({'deal_id': None, 'status': 'error', 'reason': f'Deal listing failed: {e}'})
+
+        persons = self.persons.resolve(deal.get('person_id') for deal in due)
+        emails = []
+        for deal in due:
+            person = deal.get('person_id')
+            person_id = person.get('value') if isinstance(person, dict) else person
+            rendered = render_nurture_email(deal, persons.get(person_id), now)
+            if isinstance(rendered, NurtureEmail):
+                emails.append(rendered)
+            else:
+                results.append(rendered)
+        return emails, results, count
+
+    def _send(self, email: NurtureEmail, updates: ThreadPoolExecutor, pending: list) -> Dict[str, Any]:
+        self.rate.acquire()
+        try:
+            result = self.email_service.send(email.recipient, email.subject, email.html)
+        except Exception as e:  # retry_with_backoff re-raises after its last attempt
+            result = None
+            error = str(e)
+        else:
+            error = result.error
+
+        if not result or not result.success:
+            logger.error(f"Failed to send email {email.email_num} for deal {email.deal_id}: {error}")
+            return {
+                'deal_id': email.deal_id,
+                'status': 'error',
+                'reason': error
+            }
+
+        logger.info(f"Sent nurture email {email.email_num} to {email.recipient} for deal {email.deal_id}")
+        pending.append(updates.submit(self._record, email, datetime.now().strftime('%Y-%m-%d')))
+        return {
+            'deal_id': email.deal_id,
+            'status': 'sent',
+            'email_num': email.email_num,
+            'email_name': email.email_name,
+            'recipient': email.recipient
+        }
+
+    def _record(self, email: NurtureEmail, sent_on: str) -> bool:
+        """Write the sequence status and a note for a sent email."""
+        updated = self.pipedrive.update_deal_custom_fields(
+            email.deal_id,
+            email_sequence_status=str(email.email_num),
+            laatste_email=sent_on
+        )
+        if updated and self.mirror:
+            # Next run must not see the old status, even before the next sync
+            self.mirror.patch_deal(email.deal_id, {
+                FIELD_EMAIL_SEQUENCE_STATUS: str(email.email_num),
+                FIELD_LAATSTE_EMAIL: sent_on
+            })
+        noted = self.pipedrive.add_note(
+            email.deal_id,
+            f"📧 Nurture Email {email.email_num} verzonden: {email.email_name}"
+        )
+        if not (updated and noted):
+            logger.error(f"Deal {email.deal_id}: nurture email {email.email_num} sent but not fully recorded")
+        return updated and noted
+
+    def run(self, deals: Iterable[Dict]) -> Dict[str, Any]:
+        """Render, send and record; returns the same summary as NurtureProcessor.process_all."""
+        started = time.time()
+        emails, details, count = self.render(deals)
+
+        pending = []
+        with ThreadPoolExecutor(self.update_workers, thread_name_prefix="nurture-update") as updates:
+            with ThreadPoolExecutor(self.send_workers, thread_name_prefix="nurture-send") as senders:
+                details.extend(senders.map(lambda email: self._send(email, updates, pending), emails))
+            wait(pending)
+        unrecorded = sum(1 for future in pending if future.exception() or not future.result())
+
+        results = {
+            'processed': count,
+            'sent': sum(1 for d in details if d['status'] == 'sent'),
+            'skipped': sum(1 for d in details if d['status'] == 'skipped'),
+            'errors': sum(1 for d in details if d['status'] == 'error'),
+            'unrecorded': unrecorded,
+            'duration_seconds': round(time.time() - started, 2),
+            'details': details
+        }
+        logger.info(
+            f"Nurture run: {results['sent']}/{len(emails)} due emails sent in {results['duration_seconds']}s "
+            f"({results['skipped']} skipped, {results['errors']} errors, {unrecorded} not recorded)"
+        )
+        return results
+
@@ -10,12 +10,13 @@ from ..utils import get_logger
 logger = get_logger("nurture_scheduler")
 
 
-def get_next_email_for_deal(deal: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+def get_next_email_for_deal(deal: Dict[str, Any], now: datetime = None) -> Optional[Dict[str, Any]]:
     """
     Determine which nurture email should be sent for a deal.
 
     Args:
         deal: Pipedrive deal data with custom fields
+        now: Moment to evaluate at (default: now; the simulator replays other days)
 
     Returns:
         Dict with email_num, template_id, name, or None if no email due
@@ -46,7 +47,7 @@ def get_next_email_for_deal(deal: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         return None
 
     # Calculate days since rapport sent
-    days_elapsed = (datetime.now() - rapport_date).days
+    days_elapsed = ((now or datetime.now()) - rapport_date).days
 
     # Find next email to send
     next_email_num = current_email + 1
@@ -71,7 +72,7 @@ def get_next_email_for_deal(deal: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     return None
 
 
-def get_sequence_status(deal: Dict[str, Any]) -> Dict[str, Any]:
+def get_sequence_status(deal: Dict[str, Any], now: datetime = None) -> Dict[str, Any]:
     """
     Get full nurture sequence status for a deal.
 
@@ -99,11 +100,11 @@ def get_sequence_status(deal: Dict[str, Any]) -> Dict[str, Any]:
     if rapport_date_str:
         try:
             rapport_date = datetime.strptime(rapport_date_str, '%Y-%m-%d')
-            result['days_since_rapport'] = (datetime.now() - rapport_date).days
+            result['days_since_rapport'] = ((now or datetime.now()) - rapport_date).days
         except ValueError:
             pass
 
     if not result['sequence_complete']:
-        result['next_email'] = get_next_email_for_deal(deal)
+        result['next_email'] = get_next_email_for_deal(deal, now)
 
     return result
@@ -0,0 +1,291 @@
+"""
+Nurture dry-run: replay a pipeline snapshot over a date range without sending.
+
+Every simulated run goes through the real NurturePipeline render and record
+steps (get_next_email_for_deal, templates, PersonResolver, the Pipedrive
+status update and note) against local stubs, so sequence state advances
+exactly as in production. Nothing is sent and there is no network.
+
+Sends and CRM writes are placed on a simulated clock using the pipeline's
+own shape: send_workers SMTP senders behind the rate cap, each sent email
+queuing an update and a note on update_workers Pipedrive workers. The
+report has the sends per day and email number, the busiest hour, SMTP and
+Pipedrive call counts and the estimated runtime of every run.
+
+Usage:
+    python -m v2.nurture.simulator --days 30
+    python -m v2.nurture.simulator --snapshot deals.json --start 2026-01-05 --days 14 \\
+        --run-hours 9 14 --smtp-latency 1.5 --pipedrive-latency 0.4 --rate 30
+"""
+
+import argparse
+import copy
+import heapq
+import json
+import logging
+import math
+import sys
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ..config import (
+    NURTURE_ACTIVE_STAGE, NURTURE_SEND_WORKERS, NURTURE_SEND_RATE_PER_MINUTE, NURTURE_UPDATE_WORKERS
+)
+from ..services.email_sender import EmailResult
+from ..services.person_resolver import PersonResolver
+from ..services.pipedrive import PipedriveService, PipedriveResult, MAX_IDS_PER_REQUEST, MAX_PAGE_SIZE
+from ..utils import get_logger
+from .pipeline import NurturePipeline
+
+logger = get_logger("nurture_simulator")
+
+RECORD_CALLS = 2  # Pipedrive calls per sent email: status update + note
+
+
+@dataclass
+class SimulationSettings:
+    """Run times, pipeline shape and latencies (seconds) of the simulated runs."""
+    run_hours: Sequence[int] = (9,)
+    send_workers: int = NURTURE_SEND_WORKERS
+    rate_per_minute: float = NURTURE_SEND_RATE_PER_MINUTE
+    update_workers: int = NURTURE_UPDATE_WORKERS
+    smtp_latency: float = 1.0
+    pipedrive_latency: float = 0.3
+    use_mirror: bool = True  # Deal listing from the mirror (one delta sync) or paged from Pipedrive
+
+
+# =============================================================================
+# STUBS
+# =============================================================================
+
+class StubPipedrive(PipedriveService):
+    """PipedriveService whose requests are answered from the snapshot and counted."""
+
+    def __init__(self, deals: Dict[int, Dict], persons: Dict[int, Dict] = None):
+        super().__init__(api_token="simulation")
+        self.deals = deals
+        self.persons = persons or {}
+        self.calls: Counter = Counter()
+
+    def _request(self, method: str, endpoint: str, data: Dict = None) -> PipedriveResult:
+        resource, _, rest = endpoint.partition("/")
+        self.calls[f"{method} {resource.split('?')[0]}"] += 1
+        if method == "PUT" and resource == "deals" and int(rest) in self.deals:
+            self.deals[int(rest)].update(data or {})
+        if method == "GET" and resource == "persons" and rest:
+            return PipedriveResult(success=int(rest) in self.persons, data=self.persons.get(int(rest)))
+        return PipedriveResult(success=True, data={})
+
+    def get_persons(self, person_ids: List[int]) -> List[Dict]:
+        self.calls["GET persons (bulk)"] += math.ceil(len(person_ids) / MAX_IDS_PER_REQUEST)
+        return [self.persons[person_id] for person_id in person_ids if person_id in self.persons]
+
+
+class StubEmailService:
+    """EmailService stand-in that counts instead of sending."""
+
+    def __init__(self):
+        self.sent = 0
+
+    def send(self, to_email: str, subject: str, html_body: str, **kwargs) -> EmailResult:
+        self.sent += 1
+        return EmailResult(success=True)
+
+
+# =============================================================================
+# SIMULATED CLOCK
+# =============================================================================
+
+def run_timeline(emails: int, settings: SimulationSettings) -> Tuple[List[float], float]:
+    """
+    Offsets (seconds from run start) at which each email has been sent, and
+    when the last Pipedrive write finishes. Mirrors NurturePipeline.run: the
+    rate cap spaces send starts, send_workers send in parallel, and every
+    sent email queues RECORD_CALLS calls on the update workers.
+    """
+    interval = 60.0 / settings.rate_per_minute if settings.rate_per_minute > 0 else 0.0
+    senders = [0.0] * max(1, settings.send_workers)
+    updaters = [0.0] * max(1, settings.update_workers)
+    next_slot, sent_at, finished = 0.0, [], 0.0
+
+    for _ in range(emails):
+        start = max(heapq.heappop(senders), next_slot)
+        next_slot = start + interval
+        done = start + settings.smtp_latency
+        heapq.heappush(senders, done)
+        sent_at.append(done)
+
+        record_start = max(heapq.heappop(updaters), done)
+        record_done = record_start + RECORD_CALLS * settings.pipedrive_latency
+        heapq.heappush(updaters, record_done)
+        finished = max(finished, record_done)
+    return sent_at, max(finished, sent_at[-1] if sent_at else 0.0)
+
+
+# =============================================================================
+# SIMULATOR
+# =============================================================================
+
+@dataclass
+class RunResult:
+    started: datetime
+    email_nums: List[int]
+    errors: int
+    listing_calls: int
+    runtime: float
+    sent_at: List[datetime] = field(default_factory=list)
+
+
+class NurtureSimulator:
+    """Replays nurture runs over a deal snapshot (the snapshot is copied, never modified)."""
+
+    def __init__(self, deals: Iterable[Dict], settings: SimulationSettings = None, stage_id: int = NURTURE_ACTIVE_STAGE):
+        self.settings = settings or SimulationSettings()
+        self.stage_id = stage_id
+        self.deals = {deal['id']: copy.deepcopy(deal) for deal in deals if deal.get('id')}
+        self.pipedrive = StubPipedrive(self.deals)
+        self.email_service = StubEmailService()
+        self.pipeline = NurturePipeline(
+            pipedrive=self.pipedrive,
+            email_service=self.email_service,
+            persons=PersonResolver(self.pipedrive),
+        )
+
+    def _candidates(self) -> List[Dict]:
+        return [deal for deal in self.deals.values()
+                if deal.get('stage_id') == self.stage_id and deal.get('status', 'open') == 'open']
+
+    def run_once(self, now: datetime) -> RunResult:
+        """One nurture run at now: render due emails, then send and record on the simulated clock."""
+        settings = self.settings
+        candidates = self._candidates()
+        listing_calls = 2 if settings.use_mirror else max(1, math.ceil(len(candidates) / MAX_PAGE_SIZE))
+        before = sum(self.pipedrive.calls.values())
+
+        emails, results, _ = self.pipeline.render(candidates, now)
+        lookup_calls = sum(self.pipedrive.calls.values()) - before
+
+        sent_on = now.strftime('%Y-%m-%d')
+        for email in emails:
+            self.email_service.send(email.recipient, email.subject, email.html)
+            self.pipeline._record(email, sent_on)
+
+        overhead = (listing_calls + lookup_calls) * settings.pipedrive_latency
+        offsets, runtime = run_timeline(len(emails), settings)
+        return RunResult(
+            started=now,
+            email_nums=[email.email_num for email in emails],
+            errors=sum(1 for result in results if result['status'] == 'error'),
+            listing_calls=listing_calls,
+            runtime=overhead + runtime,
+            sent_at=[now + timedelta(seconds=overhead + offset) for offset in offsets],
+        )
+
+    def simulate(self, start: date, days: int) -> Dict[str, Any]:
+        """Run every run_hour of every day from start; returns the report."""
+        runs = [
+            self.run_once(datetime(day.year, day.month, day.day, hour))
+            for day in (start + timedelta(days=i) for i in range(days))
+            for hour in sorted(self.settings.run_hours)
+        ]
+        return self.report(start, days, runs)
+
+    def report(self, start: date, days: int, runs: List[RunResult]) -> Dict[str, Any]:
+        per_day = Counter({(start + timedelta(days=i)).isoformat(): 0 for i in range(days)})
+        per_hour: Counter = Counter()
+        per_email: Counter = Counter()
+        for run in runs:
+            per_day.update(sent.date().isoformat() for sent in run.sent_at)
+            per_hour.update(sent.strftime('%Y-%m-%d %H:00') for sent in run.sent_at)
+            per_email.update(run.email_nums)
+
+        calls = self.pipedrive.calls
+        pipedrive_calls = {
+            "listing": sum(run.listing_calls for run in runs),
+            "person_lookups": calls["GET persons (bulk)"] + calls["GET persons"],
+            "deal_updates": calls["PUT deals"],
+            "notes": calls["POST notes"],
+        }
+        pipedrive_calls["total"] = sum(pipedrive_calls.values())
+        peak_hour, peak = per_hour.most_common(1)[0] if per_hour else (None, 0)
+        longest = max(runs, key=lambda run: run.runtime, default=None)
+
+        return {
+            "start": start.isoformat(),
+            "days": days,
+            "runs": len(runs),
+            "deals": len(self.deals),
+            "emails": sum(per_day.values()),
+            "errors": sum(run.errors for run in runs),
+            "per_day": dict(sorted(per_day.items())),
+            "per_email": dict(sorted(per_email.items())),
+            "peak_hour": {"hour": peak_hour, "emails": peak},
+            "smtp_sends": self.email_service.sent,
+            "pipedrive_calls": pipedrive_calls,
+            "runtime_seconds": {
+                "total": round(sum(run.runtime for run in runs), 1),
+                "longest_run": round(longest.runtime, 1) if longest else 0.0,
+                "longest_run_at": longest.started.isoformat(timespec="minutes") if longest else None,
+            },
+            "settings": {
+                "run_hours": list(self.settings.run_hours),
+                "send_workers": self.settings.send_workers,
+                "rate_per_minute": self.settings.rate_per_minute,
+                "update_workers": self.settings.update_workers,
+                "smtp_latency": self.settings.smtp_latency,
+                "pipedrive_latency": self.settings.pipedrive_latency,
+                "use_mirror": self.settings.use_mirror,
+            },
+        }
+
+
+def load_snapshot(path: Optional[str] = None, stage_id: int = NURTURE_ACTIVE_STAGE) -> List[Dict]:
+    """Deals from a JSON file (list of deals, or a Pipedrive response with 'data'), else the local mirror."""
+    if path:
+        with open(path, encoding="utf-8") as f:
+            body = json.load(f)
+        return (body.get('data') or []) if isinstance(body, dict) else body
+
+    from ..services.pipedrive_mirror import get_pipedrive_mirror
+    mirror = get_pipedrive_mirror()
+    if not mirror.ensure_fresh():
+        logger.warning("Pipedrive mirror not synced or stale - the snapshot may be empty or outdated")
+    return list(mirror.deals_in_stage(stage_id, status="open"))
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Simulate nurture runs without sending anything")
+    parser.add_argument("--snapshot", help="JSON file with deals (default: the local Pipedrive mirror)")
+    parser.add_argument("--start", type=date.fromisoformat, default=date.today(), help="First day (YYYY-MM-DD)")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--run-hours", type=int, nargs="+", default=[9], help="Hours at which a run starts")
+    parser.add_argument("--send-workers", type=int, default=NURTURE_SEND_WORKERS)
+    parser.add_argument("--rate", type=float, default=NURTURE_SEND_RATE_PER_MINUTE, help="Emails per minute (0 = no cap)")
+    parser.add_argument("--update-workers", type=int, default=NURTURE_UPDATE_WORKERS)
+    parser.add_argument("--smtp-latency", type=float, default=1.0, help="Seconds per SMTP send")
+    parser.add_argument("--pipedrive-latency", type=float, default=0.3, help="Seconds per Pipedrive call")
+    parser.add_argument("--no-mirror", action="store_true", help="Estimate deal listing as paged Pipedrive calls")
+    args = parser.parse_args(argv)
+
+    # Every simulated send and update would otherwise log a line
+    for name in ("v2.nurture_scheduler", "v2.nurture_pipeline", "v2.pipedrive"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    settings = SimulationSettings(
+        run_hours=args.run_hours,
+        send_workers=args.send_workers,
+        rate_per_minute=args.rate,
+        update_workers=args.update_workers,
+        smtp_latency=args.smtp_latency,
+        pipedrive_latency=args.pipedrive_latency,
+        use_mirror=not args.no_mirror,
+    )
+    report = NurtureSimulator(load_snapshot(args.snapshot), settings).simulate(args.start, args.days)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
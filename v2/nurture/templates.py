@@ -1,39 +1,48 @@
 """
 Nurture Email Templates - 8 emails over 30 days.
+
+Only the requested email is rendered, and rendered emails are kept in an
+LRU cache per (email, voornaam, functie_titel).
 """
 
+from functools import lru_cache
+from typing import Any, Dict
+
 from ..templates.base import wrap_email, get_cta_section, BRAND_COLORS
-from ..config import CALENDLY_URL, WHATSAPP_URL
+from ..config import CALENDLY_URL, WHATSAPP_URL, NURTURE_TEMPLATE_CACHE_SIZE
+
+NURTURE_SUBJECTS = {
+    1: "Even checken - alles goed ontvangen?",
+    2: "Is het gelukt om de aanpassingen door te voeren?",
+    3: "Hoe gaat het met de resultaten?",
+    4: "Tip: De kracht van een goede functietitel",
+    5: "Tip: Waarom salaris vermelden 35% meer reacties geeft",
+    6: "Tip: Een opening die direct pakt",
+    7: "Gratis adviesgesprek - interesse?",
+    8: "Laatste check-in van mij",
+}
 
 
 def get_nurture_email_subject(email_num: int) -> str:
     """Get subject line for nurture email."""
-    subjects = {
-        1: "Even checken - alles goed ontvangen?",
-        2: "Is het gelukt om de aanpassingen door te voeren?",
-        3: "Hoe gaat het met de resultaten?",
-        4: "Tip: De kracht van een goede functietitel",
-        5: "Tip: Waarom salaris vermelden 35% meer reacties geeft",
-        6: "Tip: Een opening die direct pakt",
-        7: "Gratis adviesgesprek - interesse?",
-        8: "Laatste check-in van mij",
-    }
-    return subjects.get(email_num, "Follow-up van Kandidatentekort.nl")
+    return NURTURE_SUBJECTS.get(email_num, "Follow-up van Kandidatentekort.nl")
 
 
+@lru_cache(maxsize=NURTURE_TEMPLATE_CACHE_SIZE)
 def get_nurture_email_html(email_num: int, voornaam: str, functie_titel: str) -> str:
-    """Generate HTML for nurture email."""
-    templates = {
-        1: _get_email_1(voornaam, functie_titel),
-        2: _get_email_2(voornaam, functie_titel),
-        3: _get_email_3(voornaam, functie_titel),
-        4: _get_email_4(voornaam, functie_titel),
-        5: _get_email_5(voornaam, functie_titel),
-        6: _get_email_6(voornaam, functie_titel),
-        7: _get_email_7(voornaam, functie_titel),
-        8: _get_email_8(voornaam, functie_titel),
+    """Generate HTML for nurture email (LRU-cached per email, name and job title)."""
+    build = _EMAILS.get(email_num)
+    return build(voornaam, functie_titel) if build else ""
+
+
+def template_stats() -> Dict[str, Any]:
+    """Render cache counters, for health endpoints."""
+    info = get_nurture_email_html.cache_info()
+    return {
+        "cached": info.currsize,
+        "hits": info.hits,
+        "misses": info.misses,
     }
-    return templates.get(email_num, "")
 
 
 def _email_content(body: str, preview: str = "") -> str:
@@ -286,3 +295,15 @@ Met vriendelijke groet,<br>
 <span style="color:#6B7280;font-size:13px;">Kandidatentekort.nl</span>
 </p>
 ''', "Laatste check-in - succes met de werving!")
+
+
+_EMAILS = {
+    1: _get_email_1,
+    2: _get_email_2,
+    3: _get_email_3,
+    4: _get_email_4,
+    5: _get_email_5,
+    6: _get_email_6,
+    7: _get_email_7,
+    8: _get_email_8,
+}
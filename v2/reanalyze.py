@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+KANDIDATENTEKORT V2 - Backlog re-analysis
+=========================================
+
+Re-analyzes historical deals after a prompt change through the Claude
+Message Batches API: vacancy texts are collected from the deals' Pipedrive
+notes, submitted as one batch, and the results are written back with
+add_analysis_to_deal.
+
+Usage:
+    python -m v2.reanalyze                      # All deals in the default stage
+    python -m v2.reanalyze --stage 21 --limit 200
+    python -m v2.reanalyze --deal 1234 --deal 1235
+    python -m v2.reanalyze --dry-run            # Only collect, don't submit
+
+Set ANTHROPIC_BASE_URL to point the batch calls at a local stand-in.
+"""
+
+import argparse
+import sys
+from typing import Dict, List
+
+from .config import STAGE_ID, CLAUDE_BATCH_POLL_SECONDS
+from .services.claude_analyzer import ClaudeAnalyzer
+from .services.pipedrive import PipedriveService
+from .utils import get_logger
+
+logger = get_logger("reanalyze")
+
+
+def collect_items(pipedrive: PipedriveService, deals: List[Dict]) -> List[Dict[str, str]]:
+    """Build batch items for deals whose notes contain a vacancy text."""
+    items = []
+    for deal in deals:
+        deal_id = deal.get('id')
+        vacancy_text = pipedrive.get_vacancy_text(deal_id)
+        if not vacancy_text:
+            logger.warning(f"Deal {deal_id}: no vacancy text found in notes - skipped")
+            continue
+
+        org = deal.get('org_id')
+        items.append({
+            "custom_id": f"deal-{deal_id}",
+            "deal_id": deal_id,
+            "vacancy_text": vacancy_text,
+            "bedrijf": deal.get('org_name') or (org.get('name') if isinstance(org, dict) else "") or "",
+        })
+
+    return items
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Re-analyze historical deals via the Message Batches API")
+    parser.add_argument("--stage", type=int, default=STAGE_ID, help="Pipedrive stage to re-analyze")
+    parser.add_argument("--deal", type=int, action="append", help="Specific deal ID (repeatable)")
+    parser.add_argument("--limit", type=int, default=500, help="Maximum number of deals")
+    parser.add_argument("--poll-interval", type=float, default=CLAUDE_BATCH_POLL_SECONDS)
+    parser.add_argument("--no-cache", action="store_true", help="Don't store results in the analysis cache")
+    parser.add_argument("--dry-run", action="store_true", help="Collect vacancy texts but don't submit")
+    args = parser.parse_args(argv)
+
+    pipedrive = PipedriveService()
+
+    if args.deal:
+        deals = [deal for deal in (pipedrive.get_deal(deal_id) for deal_id in args.deal) if deal]
+    else:
+        deals = pipedrive.get_deals_in_stage(args.stage, limit=args.limit)
+    deals = deals[:args.limit]
+
+    items = collect_items(pipedrive, deals)
+    logger.info(f"Collected {len(items)} vacancy texts from {len(deals)} deals")
+
+    if args.dry_run or not items:
+        return 0
+
+    results = ClaudeAnalyzer().analyze_batch(
+        items, poll_interval=args.poll_interval, use_cache=not args.no_cache
+    )
+
+    updated, failed = 0, 0
+    for item in items:
+        result = results[item["custom_id"]]
+        if not result.success:
+            logger.error(f"Deal {item['deal_id']}: analysis failed - {result.error}")
+            failed += 1
+            continue
+
+        if pipedrive.add_analysis_to_deal(item["deal_id"], result):
+            updated += 1
+        else:
+            failed += 1
+
+    logger.info(f"Re-analysis done: {updated} deals updated, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,12 @@
 """V2 Services Package"""
 
 from .claude_analyzer import analyze_vacancy, ClaudeAnalyzer
+from .crm_index import CRMIndex, get_crm_index
 from .pipedrive import PipedriveService
+from .pipedrive_mirror import PipedriveMirror, get_pipedrive_mirror
+from .person_resolver import PersonResolver, get_person_resolver
+from .smtp_pool import SMTPPool, get_smtp_pool
 from .email_sender import EmailService
-from .pdf_generator import PDFGenerator
+from .pdf_generator import PDFGenerator, wait_for_pdf
+from .pdfmonkey_tracker import PDFMonkeyTracker, get_pdfmonkey_tracker
 from .lead_scoring import LeadScorer, calculate_lead_score
@@ -3,11 +3,19 @@ Claude AI Vacancy Analyzer - V8 Enhanced with 5-Expert Panel.
 """
 
 import json
+import time
+import hashlib
 import requests
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 from dataclasses import dataclass
-from ..config import ANTHROPIC_API_KEY, CLAUDE_MODEL, CLAUDE_MAX_TOKENS, CLAUDE_TIMEOUT
-from ..utils import get_logger, retry_with_backoff
+from ..config import (
+    ANTHROPIC_API_KEY, ANTHROPIC_BASE_URL, CLAUDE_MODEL, CLAUDE_MAX_TOKENS, CLAUDE_TIMEOUT,
+    CLAUDE_RETRIES, CLAUDE_RETRY_DELAY, CLAUDE_BATCH_POLL_SECONDS, CLAUDE_BATCH_MAX_WAIT_HOURS
+)
+from ..utils import (
+    get_logger, retry_with_backoff, AnalysisCache, get_analysis_cache, get_usage_tracker, get_rate_limiter,
+    get_http_client
+)
 
 logger = get_logger("claude_analyzer")
 
@@ -25,10 +33,12 @@ class AnalysisResult:
     quick_wins: list
     full_analysis: str
     error: Optional[str] = None
+    usage: Optional[Dict[str, Any]] = None  # Token accounting; None when served from cache
 
 
 # V8 Enhanced Prompt - 5 Expert Panel
-V8_ANALYSIS_PROMPT = '''Je bent een ELITE PANEL van 5 recruitment experts die gezamenlijk vacatureteksten analyseren voor de Nederlandse technische arbeidsmarkt.
+# Static instructions, sent as a cacheable system prompt prefix
+V8_SYSTEM_PROMPT = '''Je bent een ELITE PANEL van 5 recruitment experts die gezamenlijk vacatureteksten analyseren voor de Nederlandse technische arbeidsmarkt.
 
 ## EXPERT PANEL:
 
@@ -38,13 +48,7 @@ V8_ANALYSIS_PROMPT = '''Je bent een ELITE PANEL van 5 recruitment experts die ge
 4. **ARBEIDSMARKT ANALIST** - Kent salaristrends en schaarste per sector
 5. **DIVERSITY & INCLUSION EXPERT** - Identificeert bias en verbetert inclusiviteit
 
-## ANALYSEER DEZE VACATURE:
-
-{vacature_text}
-
-## CONTEXT:
-- Bedrijf: {bedrijf}
-- Sector: {sector}
+De te analyseren vacature en context staan in het gebruikersbericht.
 
 ## EVALUATIE-CRITERIA (Score elk 1-10):
 
@@ -60,7 +64,7 @@ V8_ANALYSIS_PROMPT = '''Je bent een ELITE PANEL van 5 recruitment experts die ge
 
 ## LEVER EXACT DIT JSON FORMAT:
 
-{{
+{
     "overall_score": 7.2,
     "score_section": "Openingszin: 6/10 | Bedrijf: 7/10 | Rolklarheid: 8/10 | Vereisten: 5/10 | Groei: 6/10 | Inclusie: 7/10 | Cialdini: 4/10 | Salaris: 3/10 | CTA: 7/10",
     "executive_summary": "Kernboodschap in 2-3 zinnen over de belangrijkste bevindingen.",
@@ -70,9 +74,9 @@ V8_ANALYSIS_PROMPT = '''Je bent een ELITE PANEL van 5 recruitment experts die ge
         "Derde concrete verbetering"
     ],
     "quick_wins": [
-        {{"title": "Quick Win 1", "description": "Wat te doen", "impact": "Verwacht effect"}},
-        {{"title": "Quick Win 2", "description": "Wat te doen", "impact": "Verwacht effect"}},
-        {{"title": "Quick Win 3", "description": "Wat te doen", "impact": "Verwacht effect"}}
+        {"title": "Quick Win 1", "description": "Wat te doen", "impact": "Verwacht effect"},
+        {"title": "Quick Win 2", "description": "Wat te doen", "impact": "Verwacht effect"},
+        {"title": "Quick Win 3", "description": "Wat te doen", "impact": "Verwacht effect"}
     ],
     "improved_text": "De VOLLEDIG herschreven vacaturetekst (400-600 woorden). Start met pakkende opening die de kandidaat direct aanspreekt. Gebruik 'jij' perspectief. Concrete functie-inhoud. Duidelijke arbeidsvoorwaarden met salarisindicatie. Sterke employer branding. Overtuigende call-to-action.",
     "bonus_tips": [
@@ -81,7 +85,7 @@ V8_ANALYSIS_PROMPT = '''Je bent een ELITE PANEL van 5 recruitment experts die ge
         "Derde tip over opvolging"
     ],
     "cialdini_analysis": "Korte analyse van welke overtuigingsprincipes worden/kunnen worden ingezet"
-}}
+}
 
 BELANGRIJK:
 - Antwoord ALLEEN met valid JSON
@@ -90,42 +94,113 @@ BELANGRIJK:
 - Gebruik concrete getallen en voorbeelden waar mogelijk
 '''
 
+# Per-vacancy tail - the only part of the prompt that changes between requests
+V8_VACANCY_PROMPT = '''## ANALYSEER DEZE VACATURE:
+
+{vacature_text}
+
+## CONTEXT:
+- Bedrijf: {bedrijf}
+- Sector: {sector}
+'''
+
+# Part of the analysis cache key - changes whenever the prompt text changes
+ANALYSIS_PROMPT_VERSION = hashlib.sha256(
+    (V8_SYSTEM_PROMPT + V8_VACANCY_PROMPT).encode('utf-8')
+).hexdigest()[:12]
+
 
 class ClaudeAnalyzer:
     """Claude AI Analyzer with retry logic."""
 
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, base_url: str = None):
         self.api_key = api_key or ANTHROPIC_API_KEY
-        self.api_url = "https://api.anthropic.com/v1/messages"
+        self.base_url = (base_url or ANTHROPIC_BASE_URL).rstrip("/")
+        self.api_url = f"{self.base_url}/v1/messages"
 
-    @retry_with_backoff(max_attempts=2, initial_delay=2.0, exceptions=(requests.RequestException,))
-    def _call_api(self, prompt: str) -> Dict[str, Any]:
-        """Make API call to Claude."""
-        headers = {
+    def _headers(self) -> Dict[str, str]:
+        """Anthropic API headers."""
+        return {
             "x-api-key": self.api_key,
             "anthropic-version": "2023-06-01",
             "content-type": "application/json"
         }
 
-        payload = {
+    def _build_prompt(self, vacancy_text: str, bedrijf: str = "", sector: str = "") -> str:
+        """Build the per-vacancy part of the prompt."""
+        return V8_VACANCY_PROMPT.format(
+            vacature_text=vacancy_text,
+            bedrijf=bedrijf or "Niet opgegeven",
+            sector=sector or "Niet opgegeven"
+        )
+
+    def _build_params(self, prompt: str) -> Dict[str, Any]:
+        """Messages API parameters. The V8 system prompt is sent as a cached prefix."""
+        return {
             "model": CLAUDE_MODEL,
             "max_tokens": CLAUDE_MAX_TOKENS,
+            "system": [{
+                "type": "text",
+                "text": V8_SYSTEM_PROMPT,
+                "cache_control": {"type": "ephemeral"}
+            }],
             "messages": [{"role": "user", "content": prompt}]
         }
 
-        response = requests.post(
-            self.api_url,
-            headers=headers,
-            json=payload,
-            timeout=CLAUDE_TIMEOUT
-        )
-
-        response.raise_for_status()
-        return response.json()
+    def _call_api(self, prompt: str) -> Dict[str, Any]:
+        """
+        Make API call to Claude, waiting for a host-wide rate limit permit first.
 
-    def analyze(self, vacancy_text: str, bedrijf: str = "", sector: str = "") -> AnalysisResult:
+        A 429 pauses every caller until retry-after; 5xx (529 overloaded),
+        timeouts and connection errors are retried with exponential backoff
+        outside the permit. A failed attempt refunds its token reservation.
+        """
+        params = self._build_params(prompt)
+
+        for attempt in range(1, CLAUDE_RETRIES + 1):
+            with get_rate_limiter().acquire(
+                prompt_chars=len(V8_SYSTEM_PROMPT) + len(prompt),
+                max_tokens=params["max_tokens"]
+            ) as permit:
+                usage = {}  # No completion: refund the reserved tokens
+                try:
+                    response = get_http_client().post(
+                        self.api_url,
+                        headers=self._headers(),
+                        json=params,
+                        timeout=CLAUDE_TIMEOUT
+                    )
+
+                    if response.status_code == 429:
+                        retry_after = response.headers.get("retry-after")
+                        permit.rate_limited(float(retry_after) if retry_after else None)
+
+                    response.raise_for_status()
+                    result = response.json()
+                    usage = result.get("usage")
+                    return result
+                except requests.RequestException as e:
+                    status = getattr(e.response, "status_code", None)
+                    if (status is not None and status != 429 and status < 500) or attempt == CLAUDE_RETRIES:
+                        raise
+                    logger.warning(f"Claude API attempt {attempt}/{CLAUDE_RETRIES} failed: {e}")
+                finally:
+                    permit.settle(usage)
+
+            # 429: the next acquire() waits out the pause. Otherwise back off, outside the permit
+            if status != 429:
+                time.sleep(CLAUDE_RETRY_DELAY * (2 ** (attempt - 1)))
+
+    def analyze(
+        self,
+        vacancy_text: str,
+        bedrijf: str = "",
+        sector: str = "",
+        use_cache: bool = True
+    ) -> AnalysisResult:
         """
         Analyze vacancy text using Claude AI.
+        Identical inputs are answered from the analysis cache.
 
         Returns:
             AnalysisResult with structured analysis data
@@ -145,46 +220,39 @@ class ClaudeAnalyzer:
                 error="API key not configured"
             )
 
+        cache = get_analysis_cache() if use_cache else None
+        cache_key = AnalysisCache.make_key(
+            vacancy_text, bedrijf, "", ANALYSIS_PROMPT_VERSION, CLAUDE_MODEL, sector=sector
+        )
+
         try:
+            if cache:
+                cached = cache.get(cache_key)
+                if cached:
+                    logger.info(f"Using cached analysis for {bedrijf or 'unknown company'}")
+                    return self._parse_response_text(cached['response_text'])
+
             logger.info(f"Starting Claude analysis for {bedrijf or 'unknown company'}")
 
-            # Build prompt
-            prompt = V8_ANALYSIS_PROMPT.format(
-                vacature_text=vacancy_text,
-                bedrijf=bedrijf or "Niet opgegeven",
-                sector=sector or "Niet opgegeven"
-            )
+            # Build the per-vacancy part of the prompt
+            prompt = self._build_prompt(vacancy_text, bedrijf, sector)
 
             # Call API
+            started = time.time()
             response = self._call_api(prompt)
+            usage = get_usage_tracker().record(
+                response.get('usage'), time.time() - started, label=bedrijf
+            )
 
             # Extract text from response
             response_text = response['content'][0]['text']
 
-            # Parse JSON from response
-            json_start = response_text.find('{')
-            json_end = response_text.rfind('}') + 1
+            result = self._parse_response_text(response_text)
+            result.usage = usage
+            if cache and self._is_complete(result):
+                cache.set(cache_key, {'response_text': response_text})
 
-            if json_start < 0 or json_end <= json_start:
-                logger.error("No JSON found in Claude response")
-                return self._error_result("No valid JSON in response")
-
-            analysis = json.loads(response_text[json_start:json_end])
-
-            logger.info(f"Analysis complete: score={analysis.get('overall_score')}")
-
-            return AnalysisResult(
-                success=True,
-                score=float(analysis.get('overall_score', 0)),
-                score_section=analysis.get('score_section', ''),
-                top_3_improvements=analysis.get('top_3_improvements', []),
-                improved_text=analysis.get('improved_text', ''),
-                bonus_tips=analysis.get('bonus_tips', []),
-                executive_summary=analysis.get('executive_summary', ''),
-                quick_wins=analysis.get('quick_wins', []),
-                full_analysis=response_text,
-                error=None
-            )
+            return result
 
         except json.JSONDecodeError as e:
             logger.error(f"JSON parse error: {e}")
@@ -196,6 +264,180 @@ class ClaudeAnalyzer:
             logger.error(f"Analysis failed: {e}")
             return self._error_result(str(e))
 
+    # =========================================================================
+    # MESSAGE BATCHES (backlog re-analysis)
+    # =========================================================================
+
+    def _batch_request(self, method: str, path: str, payload: Dict = None) -> requests.Response:
+        """Call the Message Batches API (one attempt)."""
+        response = get_http_client().request(
+            method,
+            f"{self.base_url}/v1/messages/batches{path}",
+            headers=self._headers(),
+            json=payload,
+            timeout=CLAUDE_TIMEOUT
+        )
+        response.raise_for_status()
+        return response
+
+    @retry_with_backoff(max_attempts=3, initial_delay=2.0, exceptions=(requests.RequestException,))
+    def _batch_get(self, path: str) -> requests.Response:
+        """GET from the Message Batches API; reads are safe to retry."""
+        return self._batch_request("GET", path)
+
+    @retry_with_backoff(max_attempts=3, initial_delay=2.0, exceptions=(requests.ConnectTimeout,))
+    def _batch_post(self, payload: Dict) -> requests.Response:
+        """
+        Create a batch. Only connect timeouts are retried (the request never left):
+        after a read timeout or 5xx the batch may have been accepted, and a second
+        POST would create and bill a duplicate batch.
+        """
+        return self._batch_request("POST", "", payload)
+
+    def submit_batch(self, items: List[Dict[str, str]]) -> str:
+        """
+        Submit vacancies as one Message Batch.
+
+        Args:
+            items: dicts with custom_id (1-64 chars, [A-Za-z0-9_-]), vacancy_text
+                   and optionally bedrijf / sector
+
+        Returns:
+            Batch ID
+        """
+        requests_payload = [
+            {
+                "custom_id": item["custom_id"],
+                "params": self._build_params(
+                    self._build_prompt(item["vacancy_text"], item.get("bedrijf", ""), item.get("sector", ""))
+                )
+            }
+            for item in items
+        ]
+
+        batch = self._batch_post({"requests": requests_payload}).json()
+        logger.info(f"Submitted batch {batch['id']} with {len(items)} analyses")
+        return batch["id"]
+
+    def wait_for_batch(
+        self,
+        batch_id: str,
+        poll_interval: float = CLAUDE_BATCH_POLL_SECONDS,
+        max_wait: float = CLAUDE_BATCH_MAX_WAIT_HOURS * 3600
+    ) -> Dict[str, Any]:
+        """Poll until the batch has ended. Returns the final batch object."""
+        deadline = time.time() + max_wait
+
+        while True:
+            batch = self._batch_get(f"/{batch_id}").json()
+            counts = batch.get("request_counts", {})
+
+            if batch.get("processing_status") == "ended":
+                logger.info(f"Batch {batch_id} ended: {counts}")
+                return batch
+
+            if time.time() >= deadline:
+                raise TimeoutError(f"Batch {batch_id} not finished after {max_wait:.0f}s")
+
+            logger.info(f"Batch {batch_id} {batch.get('processing_status')}: {counts}")
+            time.sleep(poll_interval)
+
+    def batch_results(self, batch: Dict[str, Any]) -> Dict[str, AnalysisResult]:
+        """Download and parse the results of an ended batch, keyed by custom_id."""
+        response = get_http_client().get(batch["results_url"], headers=self._headers(), timeout=CLAUDE_TIMEOUT)
+        response.raise_for_status()
+
+        results = {}
+        for line in response.text.splitlines():
+            if not line.strip():
+                continue
+
+            entry = json.loads(line)
+            custom_id = entry["custom_id"]
+            outcome = entry["result"]
+
+            if outcome["type"] != "succeeded":
+                error = outcome.get("error", {}).get("message") or outcome["type"]
+                results[custom_id] = self._error_result(f"Batch request {outcome['type']}: {error}")
+                continue
+
+            message = outcome["message"]
+            usage = get_usage_tracker().record(message.get("usage"), label=f"batch {custom_id}")
+            try:
+                results[custom_id] = self._parse_response_text(message["content"][0]["text"])
+                results[custom_id].usage = usage
+            except (json.JSONDecodeError, KeyError, IndexError, ValueError) as e:
+                results[custom_id] = self._error_result(f"Parse error: {e}")
+
+        return results
+
+    def analyze_batch(
+        self,
+        items: List[Dict[str, str]],
+        poll_interval: float = CLAUDE_BATCH_POLL_SECONDS,
+        use_cache: bool = True
+    ) -> Dict[str, AnalysisResult]:
+        """
+        Analyze many vacancies through the Message Batches API.
+
+        Submits one batch, waits for it to end and returns results keyed by
+        custom_id. Successful results are stored in the analysis cache.
+        """
+        if not self.api_key:
+            logger.error("ANTHROPIC_API_KEY not configured")
+            return {item["custom_id"]: self._error_result("API key not configured") for item in items}
+        if not items:
+            return {}
+
+        batch_id = self.submit_batch(items)
+        batch = self.wait_for_batch(batch_id, poll_interval=poll_interval)
+        results = self.batch_results(batch)
+
+        cache = get_analysis_cache() if use_cache else None
+        for item in items:
+            result = results.get(item["custom_id"])
+            if result is None:
+                results[item["custom_id"]] = self._error_result("No result in batch output")
+            elif cache and self._is_complete(result):
+                cache_key = AnalysisCache.make_key(
+                    item["vacancy_text"], item.get("bedrijf", ""), "", ANALYSIS_PROMPT_VERSION,
+                    CLAUDE_MODEL, sector=item.get("sector", "")
+                )
+                cache.set(cache_key, {'response_text': result.full_analysis})
+
+        return results
+
+    def _parse_response_text(self, response_text: str) -> AnalysisResult:
+        """Parse the JSON analysis out of Claude's response text."""
+        json_start = response_text.find('{')
+        json_end = response_text.rfind('}') + 1
+
+        if json_start < 0 or json_end <= json_start:
+            logger.error("No JSON found in Claude response")
+            return self._error_result("No valid JSON in response")
+
+        analysis = json.loads(response_text[json_start:json_end])
+
+        logger.info(f"Analysis complete: score={analysis.get('overall_score')}")
+
+        return AnalysisResult(
+            success=True,
+            score=float(analysis.get('overall_score', 0)),
+            score_section=analysis.get('score_section', ''),
+            top_3_improvements=analysis.get('top_3_improvements', []),
+            improved_text=analysis.get('improved_text', ''),
+            bonus_tips=analysis.get('bonus_tips', []),
+            executive_summary=analysis.get('executive_summary', ''),
+            quick_wins=analysis.get('quick_wins', []),
+            full_analysis=response_text,
+            error=None
+        )
+
+    @staticmethod
+    def _is_complete(result: AnalysisResult) -> bool:
+        """Only complete analyses are cached: a score and an improved text."""
+        return result.success and result.score > 0 and bool(result.improved_text)
+
     def _error_result(self, error: str) -> AnalysisResult:
         """Return error result."""
         return AnalysisResult(
@@ -213,7 +455,7 @@ class ClaudeAnalyzer:
 
 
 # Convenience function
-def analyze_vacancy(vacancy_text: str, bedrijf: str = "", sector: str = "") -> AnalysisResult:
+def analyze_vacancy(vacancy_text: str, bedrijf: str = "", sector: str = "", use_cache: bool = True) -> AnalysisResult:
     """Analyze vacancy text using Claude AI."""
     analyzer = ClaudeAnalyzer()
-    return analyzer.analyze(vacancy_text, bedrijf, sector)
+    return analyzer.analyze(vacancy_text, bedrijf, sector, use_cache=use_cache)
@@ -0,0 +1,229 @@
+"""
+Local de-duplication index for Pipedrive organizations and persons.
+
+Every lead used to POST a new organization and person, even when the same
+company or contact had sent a vacancy before. The index maps normalized
+keys to Pipedrive IDs, so repeat leads reuse the existing records:
+
+- org_name: company name without case, accents, punctuation and legal form
+  ("Bakkerij De Vries B.V." and "bakkerij de vries" are the same)
+- domain: company email domain -> organization (freemail domains excluded)
+- email: contact email -> person
+
+find_or_create checks the index, then a Pipedrive search, and only creates
+when both miss. Every ID found or created is written back. Entries come from
+our own writes, from searches and from the local Pipedrive mirror (warm). A
+stale entry (record deleted in Pipedrive) is removed with forget().
+"""
+
+import re
+import threading
+import time
+import unicodedata
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from ..utils import get_logger
+from ..utils.sqlite_store import SQLiteStore
+
+logger = get_logger("crm_index")
+
+ORG_NAME, DOMAIN, EMAIL = "org_name", "domain", "email"
+KEY_LOCKS = 64
+
+LEGAL_FORMS = {"bv", "nv", "vof", "cv", "bvba", "gmbh", "ltd", "inc", "llc"}
+NON_ALNUM = re.compile(r"[^a-z0-9]+")
+FREEMAIL_DOMAINS = {
+    "gmail.com", "googlemail.com", "hotmail.com", "hotmail.nl", "outlook.com", "outlook.nl", "live.com",
+    "live.nl", "msn.com", "icloud.com", "me.com", "yahoo.com", "yahoo.nl", "ziggo.nl", "kpnmail.nl",
+    "kpnplanet.nl", "planet.nl", "home.nl", "xs4all.nl", "telfort.nl", "hetnet.nl", "chello.nl",
+    "casema.nl", "upcmail.nl", "proton.me", "protonmail.com", "aol.com", "gmx.com", "gmx.net",
+}
+
+
+def normalize_company(name: Optional[str]) -> Optional[str]:
+    """Company name as index key; None for empty / placeholder names."""
+    if not name:
+        return None
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode().lower()
+    text = text.replace(".", "")  # b.v. -> bv
+    words = [word for word in NON_ALNUM.split(text) if word and word not in LEGAL_FORMS]
+    key = " ".join(words)
+    return key if key and key != "onbekend" else None
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    email = (email or "").strip().lower()
+    return email if "@" in email else None
+
+
+def company_domain(email: Optional[str]) -> Optional[str]:
+    """Email domain that identifies a company (not gmail.com and the like)."""
+    email = normalize_email(email)
+    if not email:
+        return None
+    domain = email.rsplit("@", 1)[1]
+    return None if domain in FREEMAIL_DOMAINS else domain
+
+
+class CRMIndex(SQLiteStore):
+    """Normalized company name / domain / email -> Pipedrive ID, shared by all workers."""
+
+    SCHEMA = """
+CREATE TABLE IF NOT EXISTS crm_index (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    pipedrive_id INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (kind, key)
+);
+CREATE INDEX IF NOT EXISTS crm_index_id ON crm_index (kind, pipedrive_id);
+"""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._key_locks = [threading.Lock() for _ in range(KEY_LOCKS)]
+        self._count_lock = threading.Lock()
+        self._counts = {"hits": 0, "search_hits": 0, "created": 0}
+
+    # =========================================================================
+    # KEYS
+    # =========================================================================
+
+    @staticmethod
+    def org_keys(name: Optional[str], email: Optional[str] = None) -> List[Tuple[str, str]]:
+        keys = []
+        if normalize_company(name):
+            keys.append((ORG_NAME, normalize_company(name)))
+        if company_domain(email):
+            keys.append((DOMAIN, company_domain(email)))
+        return keys
+
+    @staticmethod
+    def person_keys(email: Optional[str]) -> List[Tuple[str, str]]:
+        return [(EMAIL, normalize_email(email))] if normalize_email(email) else []
+
+    # =========================================================================
+    # LOOKUP / WRITE
+    # =========================================================================
+
+    def lookup(self, keys: List[Tuple[str, str]]) -> Optional[int]:
+        """ID of the first key found, in key order."""
+        conn = self._connect()
+        for kind, key in keys:
+            row = conn.execute(
+                "SELECT pipedrive_id FROM crm_index WHERE kind = ? AND key = ?", (kind, key)
+            ).fetchone()
+            if row:
+                return row[0]
+        return None
+
+    def remember(self, keys: List[Tuple[str, str]], pipedrive_id: int, source: str, replace: bool = True) -> None:
+        """Point keys at pipedrive_id; with replace=False only keys not indexed yet are added."""
+        if not pipedrive_id or not keys:
+            return
+        now = time.time()
+        self._connect().executemany(
+            f"INSERT OR {'REPLACE' if replace else 'IGNORE'} INTO crm_index "
+            "(kind, key, pipedrive_id, source, updated_at) VALUES (?, ?, ?, ?, ?)",
+            [(kind, key, pipedrive_id, source, now) for kind, key in keys]
+        )
+
+    def forget(self, kinds: Iterable[str], pipedrive_id: int) -> None:
+        """Drop every key pointing at a record that no longer exists in Pipedrive."""
+        self._connect().executemany(
+            "DELETE FROM crm_index WHERE kind = ? AND pipedrive_id = ?",
+            [(kind, pipedrive_id) for kind in kinds]
+        )
+
+    def _lock_for(self, keys: List[Tuple[str, str]]) -> threading.Lock:
+        """Serializes concurrent leads for the same company/contact in this process."""
+        return self._key_locks[hash(keys[0]) % len(self._key_locks)]
+
+    def find_or_create(
+        self,
+        keys: List[Tuple[str, str]],
+        search: Optional[Callable[[], Optional[int]]],
+        create: Callable[[], Optional[int]],
+    ) -> Tuple[Optional[int], bool]:
+        """
+        Existing ID from the index or search, else the ID returned by create().
+        Returns (id, created). Without keys nothing can be matched and create() is called.
+        """
+        if not keys:
+            return create(), True
+
+        with self._lock_for(keys):
+            found = self.lookup(keys)
+            if found:
+                self._count("hits")
+                self.remember(keys, found, "lookup", replace=False)  # e.g. a new domain for a known company
+                return found, False
+
+            found = search() if search else None
+            if found:
+                self._count("search_hits")
+                self.remember(keys, found, "search")
+                return found, False
+
+            created = create()
+            if created:
+                self._count("created")
+                self.remember(keys, created, "created")
+            return created, True
+
+    def _count(self, name: str) -> None:
+        with self._count_lock:
+            self._counts[name] += 1
+
+    # =========================================================================
+    # WARMING
+    # =========================================================================
+
+    def warm(self, deals: Iterable[Dict]) -> int:
+        """Index the organizations and persons of deals (list-endpoint shape, e.g. the mirror)."""
+        rows, now = [], time.time()
+        for deal in deals:
+            org, person = deal.get('org_id'), deal.get('person_id')
+            org_id = org.get('value') if isinstance(org, dict) else None
+            emails = [entry.get('value') if isinstance(entry, dict) else entry
+                      for entry in (person.get('email') or [])] if isinstance(person, dict) else []
+
+            if org_id:
+                rows += [(kind, key, org_id) for kind, key in self.org_keys(org.get('name'))]
+            for email in emails:
+                if isinstance(person, dict) and person.get('value'):
+                    rows += [(kind, key, person['value']) for kind, key in self.person_keys(email)]
+                if org_id:
+                    rows += [(DOMAIN, company_domain(email), org_id)] if company_domain(email) else []
+
+        # Existing entries win: they come from our own writes and searches
+        self._connect().executemany(
+            "INSERT OR IGNORE INTO crm_index (kind, key, pipedrive_id, source, updated_at) VALUES (?, ?, ?, 'warm', ?)",
+            [(kind, key, pipedrive_id, now) for kind, key, pipedrive_id in rows]
+        )
+        return len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        """Index size per kind and match counters (this process), for health endpoints."""
+        sizes = dict(self._connect().execute("SELECT kind, COUNT(*) FROM crm_index GROUP BY kind").fetchall())
+        with self._count_lock:
+            return {**{kind: sizes.get(kind, 0) for kind in (ORG_NAME, DOMAIN, EMAIL)}, **self._counts}
+
+
+# Singleton
+_crm_index = None
+_crm_index_lock = threading.Lock()
+
+
+def get_crm_index() -> CRMIndex:
+    """Get singleton CRM index, warmed from the Pipedrive mirror on first use."""
+    global _crm_index
+    with _crm_index_lock:
+        if _crm_index is None:
+            from ..config import CRM_INDEX_PATH
+            from .pipedrive_mirror import get_pipedrive_mirror
+            _crm_index = CRMIndex(CRM_INDEX_PATH)
+            if not any(_crm_index.stats()[kind] for kind in (ORG_NAME, DOMAIN, EMAIL)):
+                _crm_index.warm(get_pipedrive_mirror().iter_deals())
+    return _crm_index
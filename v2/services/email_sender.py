@@ -1,5 +1,7 @@
 """
 Email Service - Gmail SMTP sender with templates.
+
+Messages go out over pooled, already logged-in connections (see smtp_pool.py).
 """
 
 import smtplib
@@ -9,8 +11,9 @@ from email.mime.base import MIMEBase
 from email import encoders
 from typing import Optional, List, Tuple
 from dataclasses import dataclass
-from ..config import GMAIL_USER, GMAIL_APP_PASSWORD
+from ..config import GMAIL_USER, GMAIL_APP_PASSWORD, SMTP_HOST, SMTP_PORT, SMTP_USE_SSL
 from ..utils import get_logger, retry_with_backoff
+from .smtp_pool import SMTPPool, get_smtp_pool
 
 logger = get_logger("email_sender")
 
@@ -25,11 +28,18 @@ class EmailResult:
 class EmailService:
     """Service for sending emails via Gmail SMTP."""
 
-    def __init__(self, user: str = None, password: str = None):
+    def __init__(self, user: str = None, password: str = None, pool: SMTPPool = None):
         self.user = user or GMAIL_USER
         self.password = password or GMAIL_APP_PASSWORD
-        self.smtp_server = "smtp.gmail.com"
-        self.smtp_port = 587
+        self.smtp_server = SMTP_HOST
+        self.smtp_port = SMTP_PORT
+        if pool is None:
+            # Default credentials share the process-wide pool
+            custom = (self.user, self.password) != (GMAIL_USER, GMAIL_APP_PASSWORD)
+            pool = SMTPPool(
+                self.smtp_server, self.smtp_port, self.user, self.password, use_ssl=SMTP_USE_SSL
+            ) if custom else get_smtp_pool()
+        self.pool = pool
 
     def is_configured(self) -> bool:
         """Check if email is configured."""
@@ -86,13 +96,8 @@ class EmailService:
             msg['From'] = f"{from_name} <{self.user}>"
             msg['To'] = to_email
 
-            # Send
-            with smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=30) as server:
-                server.starttls()
-                # Clean password (remove accidental spaces)
-                password = self.password.replace(" ", "") if self.password else ""
-                server.login(self.user, password)
-                server.send_message(msg)
+            # Send over a pooled connection (reconnects if it went stale)
+            self.pool.send(msg)
 
             logger.info(f"Email sent successfully to {to_email}")
             return EmailResult(success=True)
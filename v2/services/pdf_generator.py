@@ -3,24 +3,25 @@ PDF Generator Service - PDFMonkey + ReportLab fallback.
 """
 
 import io
-import time
 import requests
+from concurrent.futures import Future, TimeoutError
 from typing import Optional, Dict, Any
 from datetime import datetime
 from dataclasses import dataclass
 from ..config import (
     PDFMONKEY_API_KEY, PDFMONKEY_TEMPLATE_ANALYSE, PDFMONKEY_TEMPLATE_VACATURE,
-    USE_PDFMONKEY, BRAND_COLORS
+    PDFMONKEY_API_URL, USE_PDFMONKEY, BRAND_COLORS, PDF_RENDER_TIMEOUT, PDFMONKEY_TIMEOUT
 )
-from ..utils import get_logger, retry_with_backoff
+from ..utils import get_logger, retry_with_backoff, get_render_pool, get_http_client
+from ..utils.render_pool import get_stylesheet, get_brand_colors
+from .pdfmonkey_tracker import get_pdfmonkey_tracker
 
 logger = get_logger("pdf_generator")
 
 # ReportLab imports (optional)
 try:
-    from reportlab.lib import colors
     from reportlab.lib.pagesizes import A4
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.styles import ParagraphStyle
     from reportlab.lib.units import mm
     from reportlab.lib.enums import TA_CENTER, TA_LEFT
     from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
@@ -43,7 +44,7 @@ class PDFGenerator:
     """PDF generation service with PDFMonkey and ReportLab fallback."""
 
     def __init__(self):
-        self.pdfmonkey_api_url = "https://api.pdfmonkey.io/api/v1/documents"
+        self.pdfmonkey_api_url = PDFMONKEY_API_URL
 
     # =========================================================================
     # PDFMONKEY
@@ -65,72 +66,45 @@ class PDFGenerator:
             }
         }
 
-        response = requests.post(self.pdfmonkey_api_url, headers=headers, json=data, timeout=30)
+        response = get_http_client().post(self.pdfmonkey_api_url, headers=headers, json=data, timeout=30)
         response.raise_for_status()
 
         doc_data = response.json()
         return doc_data.get('document', {}).get('id')
 
-    def _pdfmonkey_wait_and_download(self, document_id: str, max_attempts: int = 30, delay: int = 2) -> Optional[bytes]:
-        """Wait for PDFMonkey document and download."""
-        headers = {"Authorization": f"Bearer {PDFMONKEY_API_KEY}"}
-
-        for attempt in range(max_attempts):
-            try:
-                response = requests.get(
-                    f"{self.pdfmonkey_api_url}/{document_id}",
-                    headers=headers,
-                    timeout=30
-                )
-
-                if response.status_code == 200:
-                    doc = response.json().get('document', {})
-                    status = doc.get('status')
-
-                    if status == 'success':
-                        download_url = doc.get('download_url')
-                        if download_url:
-                            pdf_response = requests.get(download_url, timeout=60)
-                            if pdf_response.status_code == 200:
-                                return pdf_response.content
-
-                    elif status == 'failure':
-                        logger.error(f"PDFMonkey failed: {doc.get('failure_cause')}")
-                        return None
-
-                time.sleep(delay)
-
-            except Exception as e:
-                logger.error(f"PDFMonkey wait error: {e}")
-                time.sleep(delay)
-
-        logger.error("PDFMonkey timeout")
-        return None
-
-    def generate_with_pdfmonkey(self, template_id: str, payload: Dict, filename: str) -> PDFResult:
-        """Generate PDF using PDFMonkey."""
+    def start_with_pdfmonkey(self, template_id: str, payload: Dict, filename: str) -> "Future[PDFResult]":
+        """
+        Create a PDFMonkey document without waiting for it. The tracker completes
+        it (webhook or backoff polling), so no thread is held while it renders.
+        """
         if not PDFMONKEY_API_KEY or not template_id:
-            return PDFResult(success=False, error="PDFMonkey not configured")
+            return _resolved(PDFResult(success=False, error="PDFMonkey not configured"))
 
         try:
             logger.info(f"Generating PDF with PDFMonkey: {filename}")
-
-            # Create document
             document_id = self._pdfmonkey_create(template_id, payload)
             if not document_id:
-                return PDFResult(success=False, error="Failed to create document")
+                return _resolved(PDFResult(success=False, error="Failed to create document"))
+        except Exception as e:
+            logger.error(f"PDFMonkey error: {e}")
+            return _resolved(PDFResult(success=False, error=str(e)))
 
-            # Wait and download
-            pdf_bytes = self._pdfmonkey_wait_and_download(document_id)
+        result = Future()
+
+        def downloaded(tracked: Future) -> None:
+            pdf_bytes = tracked.result()
             if pdf_bytes:
                 logger.info(f"PDFMonkey success: {filename} ({len(pdf_bytes)} bytes)")
-                return PDFResult(success=True, pdf_bytes=pdf_bytes)
+                result.set_result(PDFResult(success=True, pdf_bytes=pdf_bytes))
+            else:
+                result.set_result(PDFResult(success=False, error="Failed to download PDF"))
 
-            return PDFResult(success=False, error="Failed to download PDF")
+        get_pdfmonkey_tracker().track(document_id).add_done_callback(downloaded)
+        return result
 
-        except Exception as e:
-            logger.error(f"PDFMonkey error: {e}")
-            return PDFResult(success=False, error=str(e))
+    def generate_with_pdfmonkey(self, template_id: str, payload: Dict, filename: str) -> PDFResult:
+        """Generate PDF using PDFMonkey and wait for it."""
+        return self.start_with_pdfmonkey(template_id, payload, filename).result()
 
     # =========================================================================
     # REPORTLAB FALLBACK
@@ -153,14 +127,15 @@ class PDFGenerator:
         try:
             buffer = io.BytesIO()
             doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=20*mm, bottomMargin=20*mm)
-            styles = getSampleStyleSheet()
+            styles = get_stylesheet()
+            brand = get_brand_colors()
 
             # Custom styles
             title_style = ParagraphStyle(
                 'CustomTitle',
                 parent=styles['Heading1'],
                 fontSize=24,
-                textColor=colors.HexColor(BRAND_COLORS['navy']),
+                textColor=brand['navy'],
                 spaceAfter=20
             )
 
@@ -168,7 +143,7 @@ class PDFGenerator:
                 'CustomHeader',
                 parent=styles['Heading2'],
                 fontSize=16,
-                textColor=colors.HexColor(BRAND_COLORS['orange']),
+                textColor=brand['orange'],
                 spaceBefore=15,
                 spaceAfter=10
             )
@@ -234,41 +209,81 @@ class PDFGenerator:
     # HIGH-LEVEL METHODS
     # =========================================================================
 
-    def generate_analysis_report(
+    def start_analysis_report(
         self,
         company_name: str,
         contact_name: str,
         vacancy_title: str,
         analysis_result
-    ) -> PDFResult:
+    ) -> "Future[PDFResult]":
         """
-        Generate analysis report PDF.
-        Uses PDFMonkey if configured, falls back to ReportLab.
+        Start the analysis report PDF; the future resolves to a PDFResult.
+        Uses PDFMonkey if configured, falls back to ReportLab on the render pool.
+        Both steps are chained with callbacks, so the caller can do other work
+        (and no thread waits) while the PDF renders.
         """
+        result = Future()
+
+        def reportlab(*_) -> None:
+            # Rendered on a warm worker process (keeps the GIL free here)
+            if not REPORTLAB_AVAILABLE:
+                result.set_result(PDFResult(success=False, error="ReportLab not available"))
+                return
+            try:
+                render = get_render_pool().submit(
+                    self.generate_analysis_report_reportlab,
+                    company_name,
+                    contact_name,
+                    vacancy_title,
+                    analysis_result.score,
+                    analysis_result.score_section,
+                    analysis_result.top_3_improvements,
+                    analysis_result.improved_text,
+                )
+            except Exception as e:
+                logger.error(f"ReportLab render failed: {e}")
+                result.set_result(PDFResult(success=False, error=str(e) or type(e).__name__))
+                return
+            render.add_done_callback(rendered)
+
+        def rendered(render: Future) -> None:
+            error = render.exception()
+            if error is not None:
+                logger.error(f"ReportLab render failed: {error}")
+                result.set_result(PDFResult(success=False, error=str(error) or type(error).__name__))
+            else:
+                result.set_result(render.result())
+
+        def pdfmonkey_done(pdfmonkey: Future) -> None:
+            if pdfmonkey.result().success:
+                result.set_result(pdfmonkey.result())
+            else:
+                logger.warning("PDFMonkey failed, falling back to ReportLab")
+                reportlab()
+
         # Try PDFMonkey first
         if USE_PDFMONKEY:
             payload = self._prepare_analyse_payload(
                 company_name, contact_name, vacancy_title, analysis_result
             )
-            result = self.generate_with_pdfmonkey(
+            self.start_with_pdfmonkey(
                 PDFMONKEY_TEMPLATE_ANALYSE,
                 payload,
                 f"Analyse_{company_name}.pdf"
-            )
-            if result.success:
-                return result
-            logger.warning("PDFMonkey failed, falling back to ReportLab")
-
-        # Fallback to ReportLab
-        return self.generate_analysis_report_reportlab(
-            company_name,
-            contact_name,
-            vacancy_title,
-            analysis_result.score,
-            analysis_result.score_section,
-            analysis_result.top_3_improvements,
-            analysis_result.improved_text
-        )
+            ).add_done_callback(pdfmonkey_done)
+        else:
+            reportlab()
+        return result
+
+    def generate_analysis_report(
+        self,
+        company_name: str,
+        contact_name: str,
+        vacancy_title: str,
+        analysis_result
+    ) -> PDFResult:
+        """Generate analysis report PDF and wait for it (see start_analysis_report)."""
+        return wait_for_pdf(self.start_analysis_report(company_name, contact_name, vacancy_title, analysis_result))
 
     def _prepare_analyse_payload(self, company_name: str, contact_name: str, vacancy_title: str, analysis_result) -> Dict:
         """Prepare payload for PDFMonkey analyse template."""
@@ -300,6 +315,21 @@ class PDFGenerator:
         }
 
 
+def _resolved(result: PDFResult) -> "Future[PDFResult]":
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def wait_for_pdf(future: "Future[PDFResult]", timeout: float = PDFMONKEY_TIMEOUT + PDF_RENDER_TIMEOUT) -> PDFResult:
+    """Result of a started PDF; an error result after timeout seconds (PDFMonkey plus ReportLab fallback)."""
+    try:
+        return future.result(timeout)
+    except TimeoutError:
+        logger.error(f"PDF not ready after {timeout}s")
+        return PDFResult(success=False, error="PDF generation timed out")
+
+
 # Singleton
 _pdf_generator = None
 
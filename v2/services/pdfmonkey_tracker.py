@@ -0,0 +1,373 @@
+"""
+PDFMonkey document tracker - completion via webhook, polling as fallback.
+
+Creating a PDFMonkey document returns immediately; the PDF is rendered
+asynchronously. Instead of every caller sleeping in a GET loop, callers get
+a Future and one tracker thread per process resolves it:
+
+- PDFMonkey's webhook (POST /webhook/pdfmonkey) is a wake-up only: it is
+  noted in a shared SQLite table (it may land on any gunicorn worker) and
+  the process that created the document checks the document on the API
+  right away, within a fraction of a second. Status and download URL always
+  come from the authenticated API, never from the webhook payload.
+- Documents without a recorded status are polled on the API with adaptive
+  backoff (starting at poll_initial, growing by poll_factor up to
+  poll_max). With webhooks enabled the first API poll is delayed to
+  poll_max, so polling only covers lost webhooks.
+
+Status checks and downloads run on a small I/O pool, so no thread is held
+while a document is rendering.
+"""
+
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+import requests
+
+from ..utils import get_logger
+from ..utils.http_client import HTTPClient, get_http_client
+from ..utils.sqlite_store import SQLiteStore
+
+logger = get_logger("pdfmonkey_tracker")
+
+FINAL_STATUSES = ("success", "failure")
+
+
+@dataclass
+class _Tracked:
+    """A document this process is waiting for."""
+    future: Future
+    deadline: float
+    next_poll: float
+    interval: float
+    busy: bool = False
+    polls: int = 0
+    woken_at: float = 0.0       # updated_at of the last webhook note acted on
+    via_webhook: bool = False   # The current API check was triggered by a webhook
+    started: float = field(default_factory=time.time)
+
+
+class PDFMonkeyTracker(SQLiteStore):
+    """Creates PDFMonkey documents and resolves futures when they are ready."""
+
+    SCHEMA = """
+CREATE TABLE IF NOT EXISTS pdfmonkey_documents (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    download_url TEXT,
+    failure_cause TEXT,
+    source TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+    def __init__(
+        self,
+        path: str,
+        api_key: str,
+        api_url: str = "https://api.pdfmonkey.io/api/v1/documents",
+        webhook_enabled: bool = False,
+        poll_initial: float = 1.0,
+        poll_factor: float = 1.5,
+        poll_max: float = 10.0,
+        timeout: float = 120.0,
+        check_interval: float = 0.25,
+        io_workers: int = 4,
+        retention_seconds: float = 24 * 3600,
+        http_client: Optional[HTTPClient] = None,
+    ):
+        super().__init__(path)
+        self.api_key = api_key
+        self.api_url = api_url.rstrip("/")
+        self.webhook_enabled = webhook_enabled
+        self.poll_initial = poll_initial
+        self.poll_factor = poll_factor
+        self.poll_max = poll_max
+        self.timeout = timeout
+        self.check_interval = check_interval
+        self.retention_seconds = retention_seconds
+        self.http = http_client or get_http_client()
+
+        self._pending: Dict[str, _Tracked] = {}
+        self._wakeup = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._io = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="pdfmonkey-io")
+        self._counts = {"completed": 0, "failed": 0, "timed_out": 0, "via_webhook": 0, "api_polls": 0}
+
+    # =========================================================================
+    # PRODUCER API
+    # =========================================================================
+
+    def _headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}"}
+
+    def create(self, template_id: str, payload: Dict[str, Any], filename: str = "document.pdf") -> Optional[str]:
+        """Create a document; returns its ID, or None on failure."""
+        data = {
+            "document": {
+                "document_template_id": template_id,
+                "status": "pending",
+                "payload": payload,
+                "meta": {"_filename": filename}
+            }
+        }
+        try:
+            response = self.http.post(self.api_url, headers=self._headers(), json=data, timeout=30)
+            if response.status_code == 201:
+                document_id = response.json().get("document", {}).get("id")
+                if document_id:
+                    return document_id
+            logger.error(f"PDFMonkey creation failed: {response.status_code} - {response.text[:200]}")
+        except (requests.RequestException, ValueError) as e:
+            logger.error(f"PDFMonkey creation error: {e}")
+        return None
+
+    def generate(self, template_id: str, payload: Dict[str, Any], filename: str = "document.pdf") -> Future:
+        """Create a document and track it. The future resolves to PDF bytes or None."""
+        document_id = self.create(template_id, payload, filename)
+        if not document_id:
+            future = Future()
+            future.set_result(None)
+            return future
+
+        logger.info(f"PDFMonkey document {document_id} created ({filename})")
+        return self.track(document_id)
+
+    def track(self, document_id: str, timeout: Optional[float] = None) -> Future:
+        """Future for an existing document; resolves to PDF bytes, or None on failure/timeout."""
+        now = time.time()
+        first_poll = self.poll_max if self.webhook_enabled else self.poll_initial
+
+        with self._wakeup:
+            tracked = self._pending.get(document_id)
+            if tracked is None:
+                tracked = _Tracked(
+                    future=Future(),
+                    deadline=now + (timeout or self.timeout),
+                    next_poll=now + first_poll,
+                    interval=first_poll,
+                )
+                self._pending[document_id] = tracked
+            self._ensure_thread()
+            self._wakeup.notify()
+        return tracked.future
+
+    # =========================================================================
+    # WEBHOOK
+    # =========================================================================
+
+    def record_webhook(self, event: Dict[str, Any]) -> Optional[str]:
+        """
+        Note a PDFMonkey webhook (any process may receive it) so the document is
+        checked on the API now. Only the document ID is used; its download_url
+        is never stored or fetched. Returns the document ID, or None if the
+        event has no document.
+        """
+        document = event.get("document") or event.get("data", {}).get("document") or {}
+        document_id = document.get("id")
+        if not document_id or not isinstance(document_id, str):
+            return None
+
+        self._record(document_id, "notified", None, None, "webhook")
+        with self._wakeup:
+            self._wakeup.notify()
+        return document_id
+
+    def _record(self, document_id: str, status: str, download_url: Optional[str],
+                failure_cause: Optional[str], source: str) -> None:
+        try:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO pdfmonkey_documents "
+                "(id, status, download_url, failure_cause, source, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (document_id, status, download_url, failure_cause, source, time.time())
+            )
+        except sqlite3.Error as e:
+            logger.error(f"PDFMonkey status write failed: {e}")
+
+    # =========================================================================
+    # TRACKER THREAD
+    # =========================================================================
+
+    def _ensure_thread(self) -> None:
+        """Start the tracker thread if needed. Caller holds _wakeup."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name="pdfmonkey-tracker", daemon=True)
+            self._thread.start()
+
+    def _loop(self) -> None:
+        last_prune = 0.0
+        while True:
+            with self._wakeup:
+                # Webhook statuses are picked up from the table every check_interval
+                self._wakeup.wait(self.check_interval if self._pending else 30)
+                idle = [doc_id for doc_id, t in self._pending.items() if not t.busy]
+
+            try:
+                self._tick(idle)
+                if time.time() - last_prune > 3600:
+                    self._connect().execute(
+                        "DELETE FROM pdfmonkey_documents WHERE updated_at < ?",
+                        (time.time() - self.retention_seconds,)
+                    )
+                    last_prune = time.time()
+            except sqlite3.Error as e:
+                logger.error(f"PDFMonkey tracker check failed: {e}")
+
+    def _tick(self, idle: list) -> None:
+        """Resolve recorded statuses, start due API polls and expire old documents."""
+        if not idle:
+            return
+
+        placeholders = ",".join("?" * len(idle))
+        recorded, notified = {}, {}
+        for row in self._connect().execute(
+            f"SELECT id, status, download_url, failure_cause, source, updated_at FROM pdfmonkey_documents "
+            f"WHERE id IN ({placeholders})",
+            idle
+        ):
+            if row[4] == "webhook":
+                notified[row[0]] = row[5]
+            elif row[1] in FINAL_STATUSES:
+                recorded[row[0]] = row[1:4]  # From an API check
+
+        now = time.time()
+        with self._wakeup:
+            for document_id in idle:
+                tracked = self._pending.get(document_id)
+                if tracked is None or tracked.busy:
+                    continue
+
+                if document_id in recorded:
+                    tracked.busy = True
+                    self._io.submit(self._guarded, self._finish, document_id, *recorded[document_id])
+                elif notified.get(document_id, 0) > tracked.woken_at:
+                    # Webhook received: check the document on the API now
+                    tracked.woken_at = notified[document_id]
+                    tracked.via_webhook = True
+                    tracked.busy = True
+                    self._io.submit(self._guarded, self._poll, document_id)
+                elif now >= tracked.deadline:
+                    del self._pending[document_id]
+                    self._counts["timed_out"] += 1
+                    logger.error(f"PDFMonkey timeout waiting for document {document_id}")
+                    tracked.future.set_result(None)
+                elif now >= tracked.next_poll:
+                    tracked.busy = True
+                    self._io.submit(self._guarded, self._poll, document_id)
+
+    def _guarded(self, step: Callable[..., None], document_id: str, *args) -> None:
+        """Run _poll or _finish on the I/O pool. An unexpected error fails the document;
+        busy is always reset, so a document still pending is checked again."""
+        try:
+            step(document_id, *args)
+        except Exception as e:
+            logger.error(f"PDFMonkey check of document {document_id} failed: {e}", exc_info=True)
+            with self._wakeup:
+                tracked = self._pending.pop(document_id, None)
+                if tracked is not None:
+                    self._counts["failed"] += 1
+            if tracked is not None and not tracked.future.done():
+                tracked.future.set_result(None)
+        finally:
+            with self._wakeup:
+                tracked = self._pending.get(document_id)
+                if tracked is not None and tracked.busy:
+                    tracked.busy = False
+                    self._wakeup.notify()
+
+    def _poll(self, document_id: str) -> None:
+        """One API status check; reschedules with backoff while rendering."""
+        status, download_url, failure_cause = None, None, None
+        try:
+            response = self.http.get(f"{self.api_url}/{document_id}", headers=self._headers(), timeout=30)
+            if response.status_code == 200:
+                document = response.json().get("document", {})
+                status = document.get("status")
+                download_url = document.get("download_url")
+                failure_cause = document.get("failure_cause")
+        except (requests.RequestException, ValueError) as e:
+            logger.error(f"PDFMonkey status check error: {e}")
+
+        with self._wakeup:
+            self._counts["api_polls"] += 1
+            tracked = self._pending.get(document_id)
+            if tracked is None:
+                return
+            tracked.polls += 1
+
+        if status in FINAL_STATUSES:
+            if tracked.via_webhook:
+                with self._wakeup:
+                    self._counts["via_webhook"] += 1
+            self._record(document_id, status, download_url, failure_cause, "poll")
+            self._finish(document_id, status, download_url, failure_cause)
+            return
+
+        with self._wakeup:
+            tracked.via_webhook = False
+            tracked.interval = min(self.poll_max, tracked.interval * self.poll_factor)
+            tracked.next_poll = time.time() + tracked.interval
+            tracked.busy = False
+            self._wakeup.notify()
+
+    def _finish(self, document_id: str, status: str, download_url: Optional[str],
+                failure_cause: Optional[str]) -> None:
+        """Download a finished document and resolve its future."""
+        pdf_bytes = None
+        if status == "success" and download_url:
+            try:
+                response = self.http.get(download_url, timeout=60)
+                if response.status_code == 200:
+                    pdf_bytes = response.content
+                else:
+                    logger.error(f"PDFMonkey download failed: {response.status_code}")
+            except requests.RequestException as e:
+                logger.error(f"PDFMonkey download error: {e}")
+        elif status == "failure":
+            logger.error(f"PDFMonkey generation failed: {failure_cause}")
+
+        with self._wakeup:
+            tracked = self._pending.pop(document_id, None)
+            self._counts["completed" if pdf_bytes else "failed"] += 1
+
+        if tracked is not None:
+            logger.info(
+                f"PDFMonkey document {document_id} {status} after {time.time() - tracked.started:.1f}s "
+                f"({tracked.polls} API polls)"
+            )
+            tracked.future.set_result(pdf_bytes)
+
+    def stats(self) -> Dict[str, Any]:
+        """Waiting documents and completion counters (this process)."""
+        with self._wakeup:
+            return {
+                "waiting": len(self._pending),
+                "webhook_enabled": self.webhook_enabled,
+                **self._counts,
+            }
+
+
+# Singleton
+_pdfmonkey_tracker = None
+
+
+def get_pdfmonkey_tracker() -> PDFMonkeyTracker:
+    """Get singleton PDFMonkey tracker configured from config."""
+    global _pdfmonkey_tracker
+    if _pdfmonkey_tracker is None:
+        from ..config import (
+            PDFMONKEY_API_KEY, PDFMONKEY_API_URL, PDFMONKEY_TRACKER_PATH,
+            PDFMONKEY_WEBHOOK_ENABLED, PDFMONKEY_TIMEOUT
+        )
+        _pdfmonkey_tracker = PDFMonkeyTracker(
+            PDFMONKEY_TRACKER_PATH,
+            PDFMONKEY_API_KEY,
+            api_url=PDFMONKEY_API_URL,
+            webhook_enabled=PDFMONKEY_WEBHOOK_ENABLED,
+            timeout=PDFMONKEY_TIMEOUT
+        )
+    return _pdfmonkey_tracker
@@ -0,0 +1,177 @@
+"""
+Bulk person lookups for outgoing email (nurture runs, PDF delivery).
+
+Deal listings already embed the linked person (person_id as {value, name,
+email, phone}), so a nurture run should not make one GET /persons/{id} per
+email. PersonResolver.resolve takes the person_id values of a batch of
+deals and returns every person in as few requests as possible:
+
+1. embedded person data is used as is (and cached)
+2. remaining IDs are answered from a TTL cache
+3. whatever is still missing is fetched in one bulk request per 100 IDs,
+   falling back to concurrent single GETs when the bulk request fails
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import requests
+
+from ..utils import get_logger
+from .pipedrive import PipedriveService, PipedriveError
+
+logger = get_logger("person_resolver")
+
+FALLBACK_WORKERS = 4
+
+
+def primary_email(person: Optional[Dict]) -> Optional[str]:
+    """Primary (else first) email address of a person, in either Pipedrive shape."""
+    emails = (person or {}).get('email') or []
+    if isinstance(emails, str):
+        return emails or None
+    for entry in emails:
+        if isinstance(entry, dict) and entry.get('primary') and entry.get('value'):
+            return entry['value']
+    first = emails[0] if emails else None
+    return (first.get('value') if isinstance(first, dict) else first) or None
+
+
+def first_name(person: Optional[Dict], default: str = 'daar') -> str:
+    """first_name when Pipedrive has it (person records), else the first word of the name."""
+    person = person or {}
+    name = person.get('first_name') or (person.get('name') or '').strip()
+    return name.split()[0] if name else default
+
+
+class PersonResolver:
+    """Resolves person IDs to person data with embedded data, a TTL cache and bulk fetches."""
+
+    def __init__(self, pipedrive: PipedriveService = None, ttl: float = 900.0, max_entries: int = 5000):
+        self.pipedrive = pipedrive or PipedriveService()
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._cache: "OrderedDict[int, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = {"embedded": 0, "cache_hits": 0, "fetched": 0, "bulk_requests": 0, "not_found": 0}
+
+    # =========================================================================
+    # CACHE
+    # =========================================================================
+
+    def _put(self, person_id: int, person: Dict) -> None:
+        """Caller holds _lock."""
+        self._cache[person_id] = (time.time() + self.ttl, person)
+        self._cache.move_to_end(person_id)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def _get(self, person_id: int) -> Optional[Dict]:
+        """Caller holds _lock."""
+        entry = self._cache.get(person_id)
+        if not entry:
+            return None
+        expires, person = entry
+        if expires < time.time():
+            del self._cache[person_id]
+            return None
+        self._cache.move_to_end(person_id)
+        return person
+
+    def invalidate(self, person_id: int) -> None:
+        """Forget a person, e.g. after changing their email address."""
+        with self._lock:
+            self._cache.pop(person_id, None)
+
+    # =========================================================================
+    # RESOLVE
+    # =========================================================================
+
+    def resolve(self, people: Iterable[Union[int, Dict, None]]) -> Dict[int, Dict]:
+        """
+        Map person IDs to person data. people are deal person_id values: embedded
+        person dicts or plain IDs. Persons that cannot be found are left out.
+        """
+        resolved: Dict[int, Dict] = {}
+        wanted: List[int] = []
+        with self._lock:
+            for person in people:
+                if isinstance(person, dict):
+                    person_id = person.get('value') or person.get('id')
+                    if person_id and (person.get('email') or person.get('name')):
+                        person = {'id': person_id, **{k: v for k, v in person.items() if k != 'value'}}
+                        resolved[person_id] = person
+                        self._put(person_id, person)
+                        self._counts["embedded"] += 1
+                        continue
+                else:
+                    person_id = person
+                if not person_id or person_id in resolved:
+                    continue
+                cached = self._get(person_id)
+                if cached is not None:
+                    resolved[person_id] = cached
+                    self._counts["cache_hits"] += 1
+                else:
+                    wanted.append(person_id)
+
+        missing = [person_id for person_id in dict.fromkeys(wanted) if person_id not in resolved]
+        if missing:
+            fetched = self._fetch(missing)
+            with self._lock:
+                for person_id, person in fetched.items():
+                    self._put(person_id, person)
+                self._counts["fetched"] += len(fetched)
+                self._counts["not_found"] += len(missing) - len(fetched)
+            resolved.update(fetched)
+        return resolved
+
+    def resolve_one(self, person: Union[int, Dict, None]) -> Optional[Dict]:
+        person_id = (person.get('value') or person.get('id')) if isinstance(person, dict) else person
+        return self.resolve([person]).get(person_id)
+
+    def _fetch(self, person_ids: List[int]) -> Dict[int, Dict]:
+        try:
+            persons = self.pipedrive.get_persons(person_ids)
+            with self._lock:
+                self._counts["bulk_requests"] += 1
+            return {person['id']: person for person in persons if person.get('id')}
+        except PipedriveError as e:
+            logger.warning(f"Bulk person lookup failed ({e}) - fetching {len(person_ids)} persons one by one")
+
+        def get(person_id: int) -> Optional[Dict]:
+            try:
+                return self.pipedrive.get_person(person_id)
+            except requests.RequestException as e:
+                logger.error(f"Person {person_id} lookup failed: {e}")
+                return None
+
+        with ThreadPoolExecutor(min(FALLBACK_WORKERS, len(person_ids)), thread_name_prefix="person-fetch") as executor:
+            return {
+                person_id: person
+                for person_id, person in zip(person_ids, executor.map(get, person_ids))
+                if person
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache size and lookup counters (this process), for health endpoints."""
+        with self._lock:
+            return {"cached": len(self._cache), **self._counts}
+
+
+# Singleton
+_person_resolver = None
+_person_resolver_lock = threading.Lock()
+
+
+def get_person_resolver() -> PersonResolver:
+    """Get singleton person resolver configured from config."""
+    global _person_resolver
+    with _person_resolver_lock:
+        if _person_resolver is None:
+            from ..config import PERSON_CACHE_TTL, PERSON_CACHE_MAX_ENTRIES
+            _person_resolver = PersonResolver(ttl=PERSON_CACHE_TTL, max_entries=PERSON_CACHE_MAX_ENTRIES)
+    return _person_resolver
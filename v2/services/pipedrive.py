@@ -2,20 +2,38 @@
 Pipedrive CRM Service - Organizations, Persons, Deals, Notes.
 """
 
+import re
+import html
 import requests
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterator, Tuple
+from itertools import islice
+from urllib.parse import urlencode
 from datetime import datetime
 from dataclasses import dataclass
 from ..config import (
-    PIPEDRIVE_API_TOKEN, PIPEDRIVE_BASE_URL,
+    PIPEDRIVE_API_TOKEN, PIPEDRIVE_BASE_URL, PIPEDRIVE_API_V2_URL,
     PIPELINE_ID, STAGE_ID, OWNER_ID,
     FIELD_RAPPORT_VERZONDEN, FIELD_EMAIL_SEQUENCE_STATUS, FIELD_LAATSTE_EMAIL,
     CUSTOM_FIELD_SCORE, CUSTOM_FIELD_ANALYSIS_DATE
 )
-from ..utils import get_logger, retry_with_backoff
+from ..utils import get_logger, retry_with_backoff, get_http_client
+from .crm_index import CRMIndex, get_crm_index, ORG_NAME, DOMAIN, EMAIL
 
 logger = get_logger("pipedrive")
 
+# Markers before the vacancy text in lead notes (v2, webhook_v6 and legacy V5 formats)
+VACANCY_NOTE_MARKERS = ("📝 VACATURETEKST", "📝 ORIGINELE VACATURETEKST")
+NOTE_RULE = re.compile(r"^\s*━+\s*$", re.MULTILINE)
+HTML_BREAK = re.compile(r"<br\s*/?>|</p>|</div>", re.IGNORECASE)
+HTML_TAG = re.compile(r"<[^>]+>")
+MIN_VACANCY_CHARS = 100
+MAX_PAGE_SIZE = 500  # Pipedrive's maximum limit per request
+MAX_IDS_PER_REQUEST = 100  # API v2 ids filter
+
+
+class PipedriveError(Exception):
+    """A Pipedrive listing could not be completed."""
+
 
 @dataclass
 class PipedriveResult:
@@ -23,18 +41,28 @@ class PipedriveResult:
     success: bool
     data: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
+    additional_data: Optional[Dict[str, Any]] = None  # e.g. pagination
 
 
 class PipedriveService:
     """Service for Pipedrive CRM operations."""
 
-    def __init__(self, api_token: str = None):
+    def __init__(self, api_token: str = None, crm_index: CRMIndex = None):
         self.api_token = api_token or PIPEDRIVE_API_TOKEN
         self.base_url = PIPEDRIVE_BASE_URL
+        self._crm_index = crm_index
+
+    @property
+    def crm_index(self) -> CRMIndex:
+        """De-duplication index for organizations and persons (shared by default)."""
+        if self._crm_index is None:
+            self._crm_index = get_crm_index()
+        return self._crm_index
 
     def _get_url(self, endpoint: str) -> str:
         """Build API URL with token."""
-        return f"{self.base_url}/{endpoint}?api_token={self.api_token}"
+        separator = "&" if "?" in endpoint else "?"
+        return f"{self.base_url}/{endpoint}{separator}api_token={self.api_token}"
 
     @retry_with_backoff(max_attempts=3, initial_delay=1.0, exceptions=(requests.RequestException,))
     def _request(self, method: str, endpoint: str, data: Dict = None) -> PipedriveResult:
@@ -45,19 +73,19 @@ class PipedriveService:
         url = self._get_url(endpoint)
 
         try:
-            if method == "POST":
-                response = requests.post(url, json=data, timeout=30)
-            elif method == "PUT":
-                response = requests.put(url, json=data, timeout=30)
+            if method in ("POST", "PUT"):
+                response = get_http_client().request(method, url, json=data, timeout=30)
             elif method == "GET":
-                response = requests.get(url, timeout=30)
+                response = get_http_client().get(url, timeout=30)
             else:
                 return PipedriveResult(success=False, error=f"Unknown method: {method}")
 
             result = response.json()
 
             if result.get('success'):
-                return PipedriveResult(success=True, data=result.get('data'))
+                return PipedriveResult(
+                    success=True, data=result.get('data'), additional_data=result.get('additional_data')
+                )
             else:
                 error = result.get('error', 'Unknown error')
                 logger.error(f"Pipedrive error: {error}")
@@ -67,10 +95,75 @@ class PipedriveService:
             logger.error(f"Pipedrive request failed: {e}")
             raise  # Let retry handle it
 
+    def _paginate(self, endpoint: str, params: Dict[str, Any] = None, page_size: int = MAX_PAGE_SIZE) -> Iterator[Dict]:
+        """
+        Yield the items of a list endpoint page by page (start/limit pagination).
+        Only one page is held at a time; stopping early skips the remaining requests.
+        """
+        params = {k: v for k, v in (params or {}).items() if v is not None}
+        page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+        start = 0
+
+        while True:
+            result = self._request("GET", f"{endpoint}?{urlencode({**params, 'start': start, 'limit': page_size})}")
+            if not result.success:
+                raise PipedriveError(f"Listing {endpoint} failed at start={start}: {result.error}")
+
+            yield from result.data or []
+
+            pagination = (result.additional_data or {}).get('pagination') or {}
+            if not pagination.get('more_items_in_collection'):
+                return
+            next_start = pagination.get('next_start')
+            if next_start is None or next_start <= start:
+                next_start = start + len(result.data or [])
+            if next_start <= start:
+                return
+            start = next_start
+
+    def iter_deals(self, stage_id: int = None, status: str = None, page_size: int = MAX_PAGE_SIZE) -> Iterator[Dict]:
+        """Iterate over deals (optionally of one stage / status), fetching pages lazily."""
+        return self._paginate("deals", {"stage_id": stage_id, "status": status}, page_size)
+
+    def iter_persons(self, page_size: int = MAX_PAGE_SIZE) -> Iterator[Dict]:
+        """Iterate over all persons, fetching pages lazily."""
+        return self._paginate("persons", {}, page_size)
+
+    def iter_notes(self, deal_id: int = None, page_size: int = MAX_PAGE_SIZE) -> Iterator[Dict]:
+        """Iterate over notes (of one deal if given), oldest first, fetching pages lazily."""
+        return self._paginate("notes", {"deal_id": deal_id, "sort": "add_time ASC"}, page_size)
+
     # =========================================================================
     # ORGANIZATIONS
     # =========================================================================
 
+    def _search(self, item_type: str, term: str, field: str) -> Optional[int]:
+        """ID of the first exact match of a search, None if nothing (or the search failed)."""
+        query = urlencode({"term": term, "fields": field, "exact_match": "true", "limit": 1})
+        try:
+            result = self._request("GET", f"{item_type}/search?{query}")
+        except requests.RequestException:
+            return None
+        items = (result.data or {}).get('items') or [] if result.success else []
+        return items[0].get('item', {}).get('id') if items else None
+
+    def search_organization(self, name: str) -> Optional[int]:
+        """Existing organization with exactly this name."""
+        return self._search("organizations", name, "name")
+
+    def find_or_create_organization(self, name: str, email: str = "") -> Tuple[Optional[int], bool]:
+        """
+        Existing organization for this company name or company email domain,
+        else a new one. Returns (org_id, created).
+        """
+        if not name or name == 'Onbekend':
+            return None, False
+        return self.crm_index.find_or_create(
+            CRMIndex.org_keys(name, email),
+            lambda: self.search_organization(name),
+            lambda: self.create_organization(name)
+        )
+
     def create_organization(self, name: str) -> Optional[int]:
         """Create organization, return ID or None."""
         if not name or name == 'Onbekend':
@@ -121,6 +214,52 @@ class PipedriveService:
 
         return None
 
+    def search_person(self, email: str) -> Optional[int]:
+        """Existing person with exactly this email address."""
+        return self._search("persons", email, "email") if email else None
+
+    def find_or_create_person(
+        self,
+        name: str,
+        email: str,
+        phone: str = "",
+        org_id: int = None
+    ) -> Tuple[Optional[int], bool]:
+        """Existing person with this email address, else a new one. Returns (person_id, created)."""
+        return self.crm_index.find_or_create(
+            CRMIndex.person_keys(email),
+            lambda: self.search_person(email),
+            lambda: self.create_person(name, email, phone, org_id)
+        )
+
+    def get_person(self, person_id: int) -> Optional[Dict]:
+        """Get person by ID."""
+        result = self._request("GET", f"persons/{person_id}")
+        return result.data if result.success else None
+
+    def get_persons(self, person_ids: List[int]) -> List[Dict]:
+        """
+        Get persons by ID, up to MAX_IDS_PER_REQUEST per request (API v2 ids filter).
+        Returned in the v1 shape (email / phone lists). Raises PipedriveError.
+        """
+        if not self.api_token:
+            raise PipedriveError("API token not configured")
+
+        persons = []
+        for i in range(0, len(person_ids), MAX_IDS_PER_REQUEST):
+            chunk = person_ids[i:i + MAX_IDS_PER_REQUEST]
+            query = urlencode({"ids": ",".join(map(str, chunk)), "limit": len(chunk), "api_token": self.api_token})
+            try:
+                body = get_http_client().get(f"{PIPEDRIVE_API_V2_URL}/persons?{query}", timeout=30).json()
+            except (requests.RequestException, ValueError) as e:
+                raise PipedriveError(f"Getting {len(chunk)} persons failed: {e}")
+            if not body.get('success'):
+                raise PipedriveError(f"Getting {len(chunk)} persons failed: {body.get('error', 'Unknown error')}")
+
+            for person in body.get('data') or []:
+                persons.append({**person, 'email': person.get('emails') or [], 'phone': person.get('phones') or []})
+        return persons
+
     # =========================================================================
     # DEALS
     # =========================================================================
@@ -196,13 +335,14 @@ class PipedriveService:
         result = self._request("GET", f"deals/{deal_id}")
         return result.data if result.success else None
 
-    def get_deals_in_stage(self, stage_id: int = STAGE_ID, limit: int = 100) -> List[Dict]:
-        """Get all deals in a specific stage."""
-        # Note: This is a simplified version - production should handle pagination
-        result = self._request("GET", f"deals?stage_id={stage_id}&limit={limit}")
-        if result.success and result.data:
-            return result.data
-        return []
+    def get_deals_in_stage(self, stage_id: int = STAGE_ID, limit: int = None) -> List[Dict]:
+        """Get all open deals in a stage (at most limit). Prefer iter_deals for large stages."""
+        try:
+            deals = self.iter_deals(stage_id, status="open", page_size=min(limit or MAX_PAGE_SIZE, MAX_PAGE_SIZE))
+            return list(islice(deals, limit))
+        except (PipedriveError, requests.RequestException) as e:
+            logger.error(f"Could not list deals in stage {stage_id}: {e}")
+            return []
 
     # =========================================================================
     # NOTES
@@ -220,6 +360,50 @@ class PipedriveService:
             logger.info(f"Added note to deal {deal_id}")
         return result.success
 
+    def get_deal_notes(self, deal_id: int, limit: int = None) -> List[Dict]:
+        """Get notes attached to a deal, oldest first (at most limit)."""
+        try:
+            return list(islice(self.iter_notes(deal_id), limit))
+        except (PipedriveError, requests.RequestException) as e:
+            logger.error(f"Could not list notes of deal {deal_id}: {e}")
+            return []
+
+    @staticmethod
+    def extract_vacancy_text(note_content: str) -> Optional[str]:
+        """
+        Extract the original vacancy text from a lead note.
+
+        Pipedrive may return notes as HTML. The text follows a vacancy marker
+        and sits between ━━━ rules; the longest block after the marker is it.
+        """
+        if not note_content:
+            return None
+
+        content = html.unescape(HTML_TAG.sub("", HTML_BREAK.sub("\n", note_content)))
+        positions = [content.find(marker) for marker in VACANCY_NOTE_MARKERS if marker in content]
+        if not positions:
+            return None
+
+        after_marker = content[min(positions):].split("\n", 1)
+        if len(after_marker) < 2:
+            return None
+
+        blocks = [block.strip() for block in NOTE_RULE.split(after_marker[1])]
+        text = max(blocks, key=len, default="")
+        return text if len(text) >= MIN_VACANCY_CHARS else None
+
+    def get_vacancy_text(self, deal_id: int) -> Optional[str]:
+        """Find the vacancy text stored with a deal's intake note."""
+        try:
+            # The intake note is one of the first, so usually only one page is fetched
+            for note in self.iter_notes(deal_id, page_size=50):
+                text = self.extract_vacancy_text(note.get('content', ''))
+                if text:
+                    return text
+        except (PipedriveError, requests.RequestException) as e:
+            logger.error(f"Could not read notes of deal {deal_id}: {e}")
+        return None
+
     # =========================================================================
     # ACTIVITIES (Tasks)
     # =========================================================================
@@ -271,11 +455,11 @@ class PipedriveService:
 
         Returns dict with org_id, person_id, deal_id
         """
-        # 1. Create organization
-        org_id = self.create_organization(company_name)
+        # 1. Organization (existing one for repeat leads)
+        org_id, org_created = self.find_or_create_organization(company_name, email)
 
-        # 2. Create person
-        person_id = self.create_person(contact_name, email, phone, org_id)
+        # 2. Person (existing one for repeat leads)
+        person_id, person_created = self.find_or_create_person(contact_name, email, phone, org_id)
 
         # 3. Create deal
         deal_title = f"Vacature Analyse - {company_name}"
@@ -283,6 +467,16 @@ class PipedriveService:
             deal_title = f"Vacature Analyse - {vacancy_title} - {company_name}"
 
         deal_id = self.create_deal(deal_title, person_id, org_id)
+        if not deal_id and ((org_id and not org_created) or (person_id and not person_created)):
+            # A reused record may have been deleted or merged in Pipedrive
+            logger.warning(f"Deal creation failed with reused org {org_id} / person {person_id} - recreating them")
+            if org_id and not org_created:
+                self.crm_index.forget((ORG_NAME, DOMAIN), org_id)
+                org_id, _ = self.find_or_create_organization(company_name, email)
+            if person_id and not person_created:
+                self.crm_index.forget((EMAIL,), person_id)
+                person_id, _ = self.find_or_create_person(contact_name, email, phone, org_id)
+            deal_id = self.create_deal(deal_title, person_id, org_id)
 
         # 4. Add vacancy note
         if deal_id and vacancy_text:
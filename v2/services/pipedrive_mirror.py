@@ -0,0 +1,451 @@
+"""
+Local SQLite mirror of the pipeline's deals and their persons.
+
+Nurture runs and manual endpoints read deals from here instead of listing
+them from the Pipedrive API on every call. The mirror is kept current by:
+
+- a full sync (all deals of the pipeline, persons from the deals' embedded
+  person data) when it is empty or older than full_sync_hours
+- delta syncs through /recents?since_timestamp=..., which returns only the
+  deals and persons changed since the previous sync
+- Pipedrive webhook events (POST /webhook/pipedrive), applied as they come
+- local patches after our own writes (patch_deal)
+
+Every write compares update_time, so a late webhook or an overlapping delta
+never overwrites newer data. Custom fields used for nurture are also stored
+as columns, so eligibility is a single indexed query.
+"""
+
+import json
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+
+from ..config import FIELD_RAPPORT_VERZONDEN, FIELD_EMAIL_SEQUENCE_STATUS
+from ..utils import get_logger
+from ..utils.sqlite_store import SQLiteStore
+from .pipedrive import PipedriveService, PipedriveError
+
+logger = get_logger("pipedrive_mirror")
+
+PIPEDRIVE_TIME = "%Y-%m-%d %H:%M:%S"  # UTC, as in update_time and since_timestamp
+SYNC_OVERLAP_SECONDS = 120  # Delta windows overlap to absorb clock skew
+BATCH_SIZE = 500
+STALE_FACTOR = 2  # A mirror older than STALE_FACTOR * max_age is not read (failed syncs)
+
+
+def utc_now() -> str:
+    return datetime.now(timezone.utc).strftime(PIPEDRIVE_TIME)
+
+
+def _person_id(value: Any) -> Optional[int]:
+    """person_id is an object in list responses and a plain ID in webhooks."""
+    if isinstance(value, dict):
+        return value.get('value')
+    return value or None
+
+
+def _sequence_number(value: Any) -> int:
+    try:
+        return int(value) if value else 0
+    except (TypeError, ValueError):
+        return 0
+
+
+class PipedriveMirror(SQLiteStore):
+    """Deals and persons of one pipeline, synced incrementally from Pipedrive."""
+
+    SCHEMA = """
+CREATE TABLE IF NOT EXISTS mirror_deals (
+    id INTEGER PRIMARY KEY,
+    pipeline_id INTEGER,
+    stage_id INTEGER,
+    status TEXT,
+    person_id INTEGER,
+    rapport_verzonden TEXT,
+    sequence_num INTEGER NOT NULL DEFAULT 0,
+    update_time TEXT NOT NULL,
+    data TEXT NOT NULL,
+    synced_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS mirror_deals_stage ON mirror_deals (stage_id, status, sequence_num);
+CREATE TABLE IF NOT EXISTS mirror_persons (
+    id INTEGER PRIMARY KEY,
+    update_time TEXT NOT NULL,
+    data TEXT NOT NULL,
+    synced_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS mirror_state (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+    def __init__(
+        self,
+        path: str,
+        pipeline_id: int,
+        pipedrive: PipedriveService = None,
+        max_age: float = 300.0,
+        full_sync_hours: float = 24.0,
+        sync_lease: float = 300.0,
+    ):
+        super().__init__(path)
+        self.pipeline_id = pipeline_id
+        self.pipedrive = pipedrive or PipedriveService()
+        self.max_age = max_age
+        self.full_sync_hours = full_sync_hours
+        self.sync_lease = sync_lease
+        self._counts = {"full_syncs": 0, "delta_syncs": 0, "webhook_events": 0, "sync_errors": 0}
+
+    # =========================================================================
+    # STATE
+    # =========================================================================
+
+    def _get_state(self, name: str) -> Optional[str]:
+        row = self._connect().execute("SELECT value FROM mirror_state WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, conn: sqlite3.Connection, name: str, value: Any) -> None:
+        conn.execute("INSERT OR REPLACE INTO mirror_state (name, value) VALUES (?, ?)", (name, str(value)))
+
+    def _claim_sync(self) -> bool:
+        """Only one process syncs at a time; the lease expires if it dies."""
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value FROM mirror_state WHERE name = 'sync_lease'").fetchone()
+            if row and float(row[0]) > now:
+                conn.execute("COMMIT")
+                return False
+            self._set_state(conn, "sync_lease", now + self.sync_lease)
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _release_sync(self) -> None:
+        self._set_state(self._connect(), "sync_lease", 0)
+
+    # =========================================================================
+    # WRITES
+    # =========================================================================
+
+    def _upsert_deals(self, conn: sqlite3.Connection, deals: Iterable[Dict]) -> int:
+        """Insert or update deals unless the stored copy is newer. Deals of other pipelines are removed."""
+        now, count = time.time(), 0
+        for deal in deals:
+            if not deal or not deal.get('id'):
+                continue
+            if deal.get('pipeline_id') not in (None, self.pipeline_id) or deal.get('status') == 'deleted':
+                conn.execute("DELETE FROM mirror_deals WHERE id = ?", (deal['id'],))
+                continue
+
+            person = deal.get('person_id')
+            if isinstance(person, dict):
+                # List responses embed name/email/phone; keep them as the person record
+                self._upsert_persons(conn, [{
+                    'id': person.get('value'),
+                    'name': person.get('name'),
+                    'email': person.get('email', []),
+                    'phone': person.get('phone', []),
+                    'update_time': '',  # Never newer than a real person record
+                }])
+
+            conn.execute(
+                """INSERT INTO mirror_deals
+                       (id, pipeline_id, stage_id, status, person_id, rapport_verzonden, sequence_num,
+                        update_time, data, synced_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(id) DO UPDATE SET
+                       pipeline_id = excluded.pipeline_id, stage_id = excluded.stage_id,
+                       status = excluded.status, person_id = excluded.person_id,
+                       rapport_verzonden = excluded.rapport_verzonden, sequence_num = excluded.sequence_num,
+                       update_time = excluded.update_time, data = excluded.data, synced_at = excluded.synced_at
+                   WHERE excluded.update_time >= mirror_deals.update_time""",
+                (
+                    deal['id'], deal.get('pipeline_id'), deal.get('stage_id'), deal.get('status'),
+                    _person_id(person), deal.get(FIELD_RAPPORT_VERZONDEN),
+                    _sequence_number(deal.get(FIELD_EMAIL_SEQUENCE_STATUS)),
+                    deal.get('update_time') or '', json.dumps(deal), now
+                )
+            )
+            count += 1
+        return count
+
+    def _upsert_persons(self, conn: sqlite3.Connection, persons: Iterable[Dict]) -> int:
+        now, count = time.time(), 0
+        for person in persons:
+            if not person or not person.get('id'):
+                continue
+            conn.execute(
+                """INSERT INTO mirror_persons (id, update_time, data, synced_at) VALUES (?, ?, ?, ?)
+                   ON CONFLICT(id) DO UPDATE SET
+                       update_time = excluded.update_time, data = excluded.data, synced_at = excluded.synced_at
+                   WHERE excluded.update_time >= mirror_persons.update_time""",
+                (person['id'], person.get('update_time') or '', json.dumps(person), now)
+            )
+            count += 1
+        return count
+
+    def _write_batches(self, items: Iterable[Dict], write) -> int:
+        """Write items in transactions of BATCH_SIZE (bounded memory for long listings)."""
+        conn = self._connect()
+        batch, total = [], 0
+        for item in items:
+            batch.append(item)
+            if len(batch) >= BATCH_SIZE:
+                total += self._write(conn, write, batch)
+                batch = []
+        if batch:
+            total += self._write(conn, write, batch)
+        return total
+
+    @staticmethod
+    def _write(conn: sqlite3.Connection, write, batch: List[Dict]) -> int:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            count = write(conn, batch)
+            conn.execute("COMMIT")
+            return count
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def patch_deal(self, deal_id: int, fields: Dict[str, Any]) -> None:
+        """Apply our own successful Pipedrive update locally, so reads see it before the next sync."""
+        row = self._connect().execute("SELECT data FROM mirror_deals WHERE id = ?", (deal_id,)).fetchone()
+        if not row:
+            return
+        deal = {**json.loads(row[0]), **fields, 'update_time': utc_now()}
+        self._write(self._connect(), self._upsert_deals, [deal])
+
+    # =========================================================================
+    # SYNC
+    # =========================================================================
+
+    def sync(self, full: bool = False) -> bool:
+        """Delta sync (full when empty, stale or forced). False if another process is syncing or it failed."""
+        if not self._claim_sync():
+            return False
+        try:
+            cursor = self._get_state("cursor")
+            last_full = float(self._get_state("last_full_sync") or 0)
+            if full or not cursor or time.time() - last_full > self.full_sync_hours * 3600:
+                self._full_sync()
+            else:
+                self._delta_sync(cursor)
+            return True
+        except (PipedriveError, requests.RequestException, sqlite3.Error) as e:
+            self._counts["sync_errors"] += 1
+            logger.error(f"Pipedrive mirror sync failed: {e}")
+            return False
+        finally:
+            self._release_sync()
+
+    def _window_start(self) -> str:
+        """Cursor for the next delta: this sync's start minus the overlap."""
+        return (datetime.now(timezone.utc) - timedelta(seconds=SYNC_OVERLAP_SECONDS)).strftime(PIPEDRIVE_TIME)
+
+    def _full_sync(self) -> None:
+        started, cursor = time.time(), self._window_start()
+        deals = self._write_batches(
+            (deal for deal in self.pipedrive.iter_deals() if deal.get('pipeline_id') == self.pipeline_id),
+            self._upsert_deals
+        )
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        # Deals not seen in the listing were deleted or moved out of the pipeline
+        conn.execute("DELETE FROM mirror_deals WHERE synced_at < ?", (started,))
+        conn.execute(
+            "DELETE FROM mirror_persons WHERE id NOT IN (SELECT person_id FROM mirror_deals WHERE person_id IS NOT NULL)"
+        )
+        self._set_state(conn, "cursor", cursor)
+        self._set_state(conn, "last_full_sync", started)
+        self._set_state(conn, "last_sync", time.time())
+        conn.execute("COMMIT")
+
+        self._counts["full_syncs"] += 1
+        logger.info(f"Pipedrive mirror full sync: {deals} deals in {time.time() - started:.1f}s")
+
+    def _recents(self, item: str, since: str) -> Iterator[Dict]:
+        """Changed objects of one type since a timestamp; deleted ones as {'id', 'status': 'deleted'}."""
+        for recent in self.pipedrive._paginate("recents", {"since_timestamp": since, "items": item}):
+            data = recent.get('data')
+            if data and not data.get('deleted') and data.get('active_flag', True):
+                yield data
+            elif recent.get('id'):
+                yield {'id': recent['id'], 'status': 'deleted', 'update_time': utc_now()}
+
+    def _delta_sync(self, since: str) -> None:
+        cursor = self._window_start()
+        deals = self._write_batches(self._recents("deal", since), self._upsert_deals)
+        persons = self._write_batches(
+            (p for p in self._recents("person", since) if p.get('status') != 'deleted'), self._upsert_persons
+        )
+
+        conn = self._connect()
+        self._set_state(conn, "cursor", cursor)
+        self._set_state(conn, "last_sync", time.time())
+        self._counts["delta_syncs"] += 1
+        if deals or persons:
+            logger.info(f"Pipedrive mirror delta since {since}: {deals} deals, {persons} persons")
+
+    def ensure_fresh(self, max_age: float = None) -> bool:
+        """
+        Delta sync if the last sync is older than max_age. True if the mirror can
+        be read: it synced within STALE_FACTOR * max_age. When syncs keep failing
+        (and no webhooks arrive) callers fall back to the Pipedrive API instead of
+        acting on deals that may have moved stage or been paused since.
+        """
+        max_age = self.max_age if max_age is None else max_age
+        last_sync = float(self._get_state("last_sync") or 0)
+        if time.time() - last_sync > max_age:
+            self.sync()
+            last_sync = float(self._get_state("last_sync") or 0)
+        if not last_sync:
+            return False
+        age = time.time() - last_sync
+        if age > STALE_FACTOR * max_age:
+            logger.warning(f"Pipedrive mirror last synced {age:.0f}s ago - too stale to read")
+            return False
+        return True
+
+    # =========================================================================
+    # WEBHOOK
+    # =========================================================================
+
+    def apply_webhook(self, event: Dict[str, Any]) -> Optional[str]:
+        """
+        Apply a Pipedrive webhook event (v1: meta.object/current, v2: meta.entity/data).
+        Returns "<object>.<action>", or None if the event is not about a deal or person.
+        """
+        meta = event.get('meta') or {}
+        obj = meta.get('object') or meta.get('entity')
+        action = meta.get('action') or ''
+        current = event.get('current') if 'current' in event else event.get('data')
+        object_id = meta.get('id') or meta.get('entity_id') or (current or {}).get('id') \
+            or (event.get('previous') or {}).get('id')
+        if obj not in ('deal', 'person') or not object_id:
+            return None
+
+        if action in ('deleted', 'delete') or not current:
+            current = {'id': object_id, 'status': 'deleted', 'update_time': utc_now()}
+
+        conn = self._connect()
+        if obj == 'deal':
+            self._write(conn, self._upsert_deals, [current])
+        elif current.get('status') == 'deleted':
+            self._write(conn, lambda c, _: c.execute("DELETE FROM mirror_persons WHERE id = ?", (object_id,)).rowcount, [])
+        else:
+            self._write(conn, self._upsert_persons, [current])
+
+        self._counts["webhook_events"] += 1
+        return f"{obj}.{action}"
+
+    # =========================================================================
+    # READS (local only)
+    # =========================================================================
+
+    def _hydrate(self, data: str, person_data: Optional[str]) -> Dict:
+        """Deal as returned by the list endpoint: person_id as {value, name, email, phone}."""
+        deal = json.loads(data)
+        if person_data:
+            person = json.loads(person_data)
+            deal['person_id'] = {
+                'value': person.get('id'),
+                'name': person.get('name'),
+                'email': person.get('email') or [],
+                'phone': person.get('phone') or [],
+            }
+        return deal
+
+    def get_deal(self, deal_id: int) -> Optional[Dict]:
+        row = self._connect().execute(
+            "SELECT d.data, p.data FROM mirror_deals d LEFT JOIN mirror_persons p ON p.id = d.person_id "
+            "WHERE d.id = ?", (deal_id,)
+        ).fetchone()
+        return self._hydrate(*row) if row else None
+
+    def get_person(self, person_id: int) -> Optional[Dict]:
+        row = self._connect().execute("SELECT data FROM mirror_persons WHERE id = ?", (person_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def iter_deals(self) -> Iterator[Dict]:
+        """All mirrored deals."""
+        for row in self._connect().execute(
+            "SELECT d.data, p.data FROM mirror_deals d LEFT JOIN mirror_persons p ON p.id = d.person_id ORDER BY d.id"
+        ):
+            yield self._hydrate(*row)
+
+    def deals_in_stage(self, stage_id: int, status: str = None) -> Iterator[Dict]:
+        """All mirrored deals in a stage (optionally with one status)."""
+        query = ("SELECT d.data, p.data FROM mirror_deals d LEFT JOIN mirror_persons p ON p.id = d.person_id "
+                 "WHERE d.stage_id = ?")
+        params: List[Any] = [stage_id]
+        if status:
+            query += " AND d.status = ?"
+            params.append(status)
+        for row in self._connect().execute(query + " ORDER BY d.id", params):
+            yield self._hydrate(*row)
+
+    def nurture_candidates(self, stage_id: int, sequence_length: int) -> Iterator[Dict]:
+        """Open deals in the stage with a rapport date and an unfinished sequence (timing is checked by the caller)."""
+        for row in self._connect().execute(
+            "SELECT d.data, p.data FROM mirror_deals d LEFT JOIN mirror_persons p ON p.id = d.person_id "
+            "WHERE d.stage_id = ? AND d.status = 'open' "
+            "AND d.rapport_verzonden IS NOT NULL AND d.rapport_verzonden != '' "
+            "AND d.sequence_num < ? ORDER BY d.id",
+            (stage_id, sequence_length)
+        ):
+            yield self._hydrate(*row)
+
+    def nurture_columns(self, stage_id: int, sequence_length: int) -> List[Tuple[int, int, str, int]]:
+        """(id, stage_id, rapport_verzonden, sequence_num) of the nurture candidates, without loading deal JSON."""
+        return self._connect().execute(
+            "SELECT id, stage_id, rapport_verzonden, sequence_num FROM mirror_deals "
+            "WHERE stage_id = ? AND status = 'open' "
+            "AND rapport_verzonden IS NOT NULL AND rapport_verzonden != '' "
+            "AND sequence_num < ? ORDER BY id",
+            (stage_id, sequence_length)
+        ).fetchall()
+
+    def get_deals(self, deal_ids: List[int]) -> Iterator[Dict]:
+        """Hydrated deals for deal_ids (missing IDs are skipped), in ID order."""
+        for start in range(0, len(deal_ids), 500):
+            chunk = sorted(deal_ids[start:start + 500])
+            yield from (self._hydrate(*row) for row in self._connect().execute(
+                "SELECT d.data, p.data FROM mirror_deals d LEFT JOIN mirror_persons p ON p.id = d.person_id "
+                f"WHERE d.id IN ({','.join('?' * len(chunk))}) ORDER BY d.id", chunk
+            ))
+
+    def stats(self) -> Dict[str, Any]:
+        """Mirror size and sync age, for health endpoints."""
+        conn = self._connect()
+        last_sync = float(self._get_state("last_sync") or 0)
+        return {
+            "deals": conn.execute("SELECT COUNT(*) FROM mirror_deals").fetchone()[0],
+            "persons": conn.execute("SELECT COUNT(*) FROM mirror_persons").fetchone()[0],
+            "cursor": self._get_state("cursor"),
+            "sync_age_seconds": round(time.time() - last_sync, 1) if last_sync else None,
+            **self._counts,
+        }
+
+
+# Singleton
+_pipedrive_mirror = None
+
+
+def get_pipedrive_mirror() -> PipedriveMirror:
+    """Get singleton Pipedrive mirror configured from config."""
+    global _pipedrive_mirror
+    if _pipedrive_mirror is None:
+        from ..config import PIPELINE_ID, PIPEDRIVE_MIRROR_PATH, PIPEDRIVE_MIRROR_MAX_AGE
+        _pipedrive_mirror = PipedriveMirror(PIPEDRIVE_MIRROR_PATH, PIPELINE_ID, max_age=PIPEDRIVE_MIRROR_MAX_AGE)
+    return _pipedrive_mirror
@@ -0,0 +1,275 @@
+"""
+Pooled SMTP connections for outgoing email.
+
+Opening an SMTP connection costs several round-trips before the first
+message: TCP, TLS (STARTTLS or implicit), EHLO twice and AUTH. Instead of
+paying that per email, authenticated connections are kept and reused:
+
+- at most `size` connections per process; extra senders wait for one
+- a connection idle for longer than idle_timeout is closed (by the reaper
+  thread, or when it is checked out), before the server drops it itself
+- a connection idle for longer than check_after gets a NOOP before reuse
+- after max_messages a connection is replaced (Gmail limits per session)
+- when a reused connection turns out to be dead, the message is sent once
+  more on a fresh connection. Errors on a fresh connection are raised.
+
+The pool is recreated after a fork, so gunicorn workers never share sockets.
+"""
+
+import os
+import smtplib
+import ssl
+import threading
+import time
+from dataclasses import dataclass, field
+from email.message import Message
+from typing import Any, Dict, List, Optional
+
+from ..utils import get_logger
+
+logger = get_logger("smtp_pool")
+
+# The connection is unusable after these; anything else (e.g. a refused
+# recipient) leaves it in a known state and it goes back to the pool.
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, OSError)
+SERVICE_CLOSING = 421
+
+
+@dataclass
+class _Connection:
+    smtp: smtplib.SMTP
+    created: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.time)
+    messages: int = 0
+
+
+class SMTPPool:
+    """Bounded pool of logged-in SMTP connections, health-checked on reuse."""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: str,
+        password: str,
+        use_ssl: bool = False,
+        size: int = 2,
+        idle_timeout: float = 60.0,
+        check_after: float = 5.0,
+        max_messages: int = 100,
+        timeout: float = 30.0,
+        ssl_context: Optional[ssl.SSLContext] = None,
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        # App passwords are often pasted with spaces
+        self.password = (password or "").replace(" ", "")
+        self.use_ssl = use_ssl
+        self.size = max(1, size)
+        self.idle_timeout = idle_timeout
+        self.check_after = check_after
+        self.max_messages = max(1, max_messages)
+        self.timeout = timeout
+        self.ssl_context = ssl_context
+
+        self._pid: Optional[int] = None
+        self._idle: List[_Connection] = []
+        self._slots: Optional[threading.BoundedSemaphore] = None
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+        self._counts = {"connections_opened": 0, "messages_sent": 0, "reconnects": 0, "failed_checks": 0}
+
+    # =========================================================================
+    # CONNECTIONS
+    # =========================================================================
+
+    def _connect(self) -> _Connection:
+        """Open, secure and log in a new connection."""
+        context = self.ssl_context or ssl.create_default_context()
+        if self.use_ssl:
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout, context=context)
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if not self.use_ssl:
+                smtp.starttls(context=context)
+            smtp.login(self.user, self.password)
+        except Exception:
+            self._close(smtp)
+            raise
+
+        with self._lock:
+            self._counts["connections_opened"] += 1
+        return _Connection(smtp)
+
+    @staticmethod
+    def _close(smtp: smtplib.SMTP) -> None:
+        try:
+            smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            smtp.close()
+
+    def _reset_after_fork(self) -> None:
+        """Caller holds _lock. Drops (without QUIT) connections inherited from the parent."""
+        pid = os.getpid()
+        if self._pid != pid:
+            self._idle = []
+            self._slots = threading.BoundedSemaphore(self.size)
+            self._reaper = None
+            self._pid = pid
+
+    def _checkout(self) -> Optional[_Connection]:
+        """Take a healthy idle connection; None means the caller opens a new one."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                conn = self._idle.pop()  # Most recently used first
+
+            idle = time.time() - conn.last_used
+            if idle > self.idle_timeout:
+                self._close(conn.smtp)
+                continue
+            if idle > self.check_after:
+                try:
+                    code, _ = conn.smtp.noop()
+                except CONNECTION_ERRORS:
+                    code = None
+                if code != 250:
+                    with self._lock:
+                        self._counts["failed_checks"] += 1
+                    conn.smtp.close()
+                    continue
+            return conn
+
+    def _checkin(self, conn: _Connection) -> None:
+        conn.last_used = time.time()
+        conn.messages += 1
+        if conn.messages >= self.max_messages:
+            self._close(conn.smtp)
+            return
+        with self._lock:
+            self._idle.append(conn)
+            self._ensure_reaper()
+
+    # =========================================================================
+    # SENDING
+    # =========================================================================
+
+    def send(self, msg: Message, to_addrs: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Send a message over a pooled connection.
+        Returns smtplib's refused-recipients dict; raises smtplib.SMTPException / OSError.
+        """
+        with self._lock:
+            self._reset_after_fork()
+            slots = self._slots
+
+        with slots:
+            conn = self._checkout()
+            reused = conn is not None
+            while True:
+                if conn is None:
+                    conn = self._connect()
+                try:
+                    refused = conn.smtp.send_message(msg, to_addrs=to_addrs)
+                except CONNECTION_ERRORS as e:
+                    conn.smtp.close()
+                    if reused:
+                        # Stale pooled connection - one more try on a fresh one
+                        conn, reused = None, False
+                        self._count_reconnect(e)
+                        continue
+                    raise
+                except smtplib.SMTPResponseException as e:
+                    if e.smtp_code != SERVICE_CLOSING:
+                        self._checkin(conn)  # smtplib already sent RSET
+                        raise
+                    conn.smtp.close()
+                    if reused:
+                        conn, reused = None, False
+                        self._count_reconnect(e)
+                        continue
+                    raise
+                except smtplib.SMTPException:
+                    self._checkin(conn)  # Refused recipients; the session is still fine
+                    raise
+                except Exception:
+                    conn.smtp.close()
+                    raise
+
+                self._checkin(conn)
+                with self._lock:
+                    self._counts["messages_sent"] += 1
+                return refused
+
+    def _count_reconnect(self, error: Exception) -> None:
+        logger.warning(f"SMTP connection to {self.host} lost ({error}) - reconnecting")
+        with self._lock:
+            self._counts["reconnects"] += 1
+
+    # =========================================================================
+    # IDLE REAPER
+    # =========================================================================
+
+    def _ensure_reaper(self) -> None:
+        """Start the idle reaper if needed. Caller holds _lock."""
+        if self._reaper is None or not self._reaper.is_alive():
+            self._reaper = threading.Thread(target=self._reap_loop, name="smtp-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap_loop(self) -> None:
+        while True:
+            time.sleep(max(1.0, self.idle_timeout / 2))
+            if not self.close_idle(self.idle_timeout):
+                with self._lock:
+                    if not self._idle:
+                        self._reaper = None
+                        return
+
+    def close_idle(self, older_than: float = 0.0) -> int:
+        """Close idle connections unused for older_than seconds; returns how many."""
+        now = time.time()
+        with self._lock:
+            expired = [conn for conn in self._idle if now - conn.last_used >= older_than]
+            self._idle = [conn for conn in self._idle if conn not in expired]
+        for conn in expired:
+            self._close(conn.smtp)
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool size and connection counters (this process), for health endpoints."""
+        with self._lock:
+            return {
+                "size": self.size,
+                "idle": len(self._idle) if self._pid == os.getpid() else 0,
+                **self._counts,
+            }
+
+
+# Singleton
+_smtp_pool = None
+_smtp_pool_lock = threading.Lock()
+
+
+def get_smtp_pool() -> SMTPPool:
+    """Get singleton SMTP pool configured from config."""
+    global _smtp_pool
+    with _smtp_pool_lock:
+        if _smtp_pool is None:
+            from ..config import (
+                GMAIL_USER, GMAIL_APP_PASSWORD, SMTP_HOST, SMTP_PORT, SMTP_USE_SSL,
+                SMTP_POOL_SIZE, SMTP_IDLE_TIMEOUT, SMTP_MAX_MESSAGES
+            )
+            _smtp_pool = SMTPPool(
+                SMTP_HOST,
+                SMTP_PORT,
+                GMAIL_USER,
+                GMAIL_APP_PASSWORD,
+                use_ssl=SMTP_USE_SSL,
+                size=SMTP_POOL_SIZE,
+                idle_timeout=SMTP_IDLE_TIMEOUT,
+                max_messages=SMTP_MAX_MESSAGES
+            )
+    return _smtp_pool
@@ -2,4 +2,13 @@
 
 from .logging_config import get_logger
 from .retry import retry_with_backoff
+from .http_client import HTTPClient, get_http_client
 from .file_extractor import extract_text_from_file
+from .job_queue import JobQueue, get_job_queue, get_intake_queue
+from .analysis_cache import AnalysisCache, get_analysis_cache
+from .idempotency import IdempotencyStore, get_idempotency_store, idempotent
+from .metrics import StageMetrics, get_metrics, stage_timer
+from .leader_lease import LeaderLease, get_leader_lease
+from .claude_usage import ClaudeUsageTracker, get_usage_tracker
+from .rate_limiter import ClaudeRateLimiter, get_rate_limiter
+from .render_pool import RenderPool, get_render_pool
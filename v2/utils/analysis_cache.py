@@ -0,0 +1,138 @@
+"""
+Content-addressed cache for Claude vacancy analyses.
+
+Keyed on a normalized hash of the analysis inputs, so a double Typeform
+submit or a re-test via /api/analyze returns the stored result instead of
+paying for another completion. Entries expire after a TTL and the store is
+trimmed to a maximum size, least recently used first.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Optional
+
+from .logging_config import get_logger
+from .sqlite_store import SQLiteStore
+
+logger = get_logger("analysis_cache")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize(value: str, casefold: bool = False) -> str:
+    """NFKC-normalize, collapse whitespace and strip."""
+    value = unicodedata.normalize("NFKC", value or "")
+    value = _WHITESPACE.sub(" ", value).strip()
+    return value.casefold() if casefold else value
+
+
+class AnalysisCache(SQLiteStore):
+    """Persistent TTL + size-bounded analysis cache."""
+
+    SCHEMA = """
+CREATE TABLE IF NOT EXISTS analysis_cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_analysis_cache_access ON analysis_cache (last_access);
+"""
+
+    def __init__(self, path: str, ttl_seconds: float = 30 * 24 * 3600, max_entries: int = 5000):
+        super().__init__(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._counter_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(
+        vacancy_text: str,
+        company: str,
+        title: str,
+        prompt_version: str,
+        model: str,
+        sector: str = ""
+    ) -> str:
+        """Build the cache key from normalized analysis inputs."""
+        parts = [
+            _normalize(vacancy_text),
+            _normalize(company, casefold=True),
+            _normalize(title, casefold=True),
+            _normalize(sector, casefold=True),
+            prompt_version,
+            model,
+        ]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return cached value or None if missing/expired. Store errors count as a miss."""
+        now = time.time()
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, created_at FROM analysis_cache WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is not None and now - row[1] <= self.ttl_seconds:
+                conn.execute("UPDATE analysis_cache SET last_access = ? WHERE key = ?", (now, key))
+                with self._counter_lock:
+                    self.hits += 1
+                logger.info(f"Analysis cache hit: {key[:12]}")
+                return json.loads(row[0])
+
+            if row is not None:
+                conn.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            logger.error(f"Analysis cache read failed: {e}")
+
+        with self._counter_lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        """Store value and evict expired / least recently used entries."""
+        now = time.time()
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO analysis_cache (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now)
+            )
+            conn.execute("DELETE FROM analysis_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+            conn.execute(
+                "DELETE FROM analysis_cache WHERE key IN ("
+                "SELECT key FROM analysis_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Analysis cache write failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters (this process) and entry count."""
+        entries = self._connect().execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+        return {"entries": entries, "hits": self.hits, "misses": self.misses}
+
+
+# Singleton
+_analysis_cache = None
+
+
+def get_analysis_cache() -> AnalysisCache:
+    """Get singleton analysis cache configured from config."""
+    global _analysis_cache
+    if _analysis_cache is None:
+        from ..config import ANALYSIS_CACHE_PATH, ANALYSIS_CACHE_TTL_DAYS, ANALYSIS_CACHE_MAX_ENTRIES
+        _analysis_cache = AnalysisCache(
+            ANALYSIS_CACHE_PATH,
+            ttl_seconds=ANALYSIS_CACHE_TTL_DAYS * 24 * 3600,
+            max_entries=ANALYSIS_CACHE_MAX_ENTRIES
+        )
+    return _analysis_cache
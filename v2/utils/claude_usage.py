@@ -0,0 +1,96 @@
+"""
+Claude token accounting - cached vs uncached input tokens per request.
+
+With prompt caching, input is billed in three buckets: regular input tokens,
+tokens written to the cache (first request with a given prefix) and tokens
+read from the cache (every later request within the cache TTL). Recording
+them per request lets us measure what the cacheable prefix saves.
+"""
+
+import threading
+from typing import Any, Dict
+
+from .logging_config import get_logger
+
+logger = get_logger("claude_usage")
+
+USAGE_FIELDS = (
+    "input_tokens",
+    "cache_creation_input_tokens",
+    "cache_read_input_tokens",
+    "output_tokens",
+)
+
+
+def usage_to_dict(usage: Any) -> Dict[str, int]:
+    """Normalize SDK usage objects and raw API usage dicts."""
+    if usage is None:
+        return {field: 0 for field in USAGE_FIELDS}
+    if isinstance(usage, dict):
+        return {field: int(usage.get(field) or 0) for field in USAGE_FIELDS}
+    return {field: int(getattr(usage, field, 0) or 0) for field in USAGE_FIELDS}
+
+
+class ClaudeUsageTracker:
+    """Thread-safe running totals of Claude token usage for this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {field: 0 for field in USAGE_FIELDS}
+        self._requests = 0
+        self._cache_hits = 0
+        self._latency_total = 0.0
+
+    def record(self, usage: Any, latency: float = 0.0, label: str = "") -> Dict[str, Any]:
+        """Record one request's usage; returns the per-request breakdown."""
+        request_usage = usage_to_dict(usage)
+        request_usage["latency_seconds"] = round(latency, 2)
+
+        with self._lock:
+            self._requests += 1
+            self._latency_total += latency
+            if request_usage["cache_read_input_tokens"]:
+                self._cache_hits += 1
+            for field in USAGE_FIELDS:
+                self._totals[field] += request_usage[field]
+
+        logger.info(
+            f"Claude usage{f' ({label})' if label else ''}: "
+            f"input={request_usage['input_tokens']} "
+            f"cache_write={request_usage['cache_creation_input_tokens']} "
+            f"cache_read={request_usage['cache_read_input_tokens']} "
+            f"output={request_usage['output_tokens']} "
+            f"latency={latency:.1f}s"
+        )
+        return request_usage
+
+    def stats(self) -> Dict[str, Any]:
+        """Totals plus the share of prompt tokens served from the cache."""
+        with self._lock:
+            totals = dict(self._totals)
+            requests = self._requests
+            cache_hits = self._cache_hits
+            latency_total = self._latency_total
+
+        prompt_tokens = (
+            totals["input_tokens"] + totals["cache_creation_input_tokens"] + totals["cache_read_input_tokens"]
+        )
+        return {
+            "requests": requests,
+            "prefix_cache_hits": cache_hits,
+            **totals,
+            "cached_input_ratio": round(totals["cache_read_input_tokens"] / prompt_tokens, 3) if prompt_tokens else 0,
+            "avg_latency_seconds": round(latency_total / requests, 2) if requests else 0,
+        }
+
+
+# Singleton
+_usage_tracker = None
+
+
+def get_usage_tracker() -> ClaudeUsageTracker:
+    """Get singleton usage tracker."""
+    global _usage_tracker
+    if _usage_tracker is None:
+        _usage_tracker = ClaudeUsageTracker()
+    return _usage_tracker
@@ -6,6 +6,7 @@ import io
 import requests
 from typing import Optional
 from .logging_config import get_logger
+from .http_client import get_http_client
 from .retry import retry_with_backoff
 from ..config import TYPEFORM_API_TOKEN
 
@@ -37,7 +38,7 @@ def download_file(file_url: str) -> bytes:
         headers['Authorization'] = f'Bearer {TYPEFORM_API_TOKEN}'
         logger.info("Using Typeform API authentication")
 
-    response = requests.get(file_url, headers=headers, timeout=30)
+    response = get_http_client().get(file_url, headers=headers, timeout=30)
     response.raise_for_status()
 
     logger.info(f"Downloaded file: {len(response.content)} bytes, type={response.headers.get('content-type', 'unknown')}")
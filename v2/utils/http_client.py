@@ -0,0 +1,135 @@
+"""
+Shared HTTP client with pooled keep-alive connections.
+
+A bare requests.get/post opens a new TCP connection (and TLS handshake) for
+every call and closes it afterwards. All outbound API calls - Pipedrive,
+PDFMonkey, Claude, Typeform file downloads - instead go through one
+requests.Session per process, which keeps a connection pool per host:
+
+- pool_hosts: number of hosts whose pools are kept (LRU)
+- pool_size: idle connections kept per host. Size it to the number of
+  threads per gunicorn worker that call the same host at once (job queue
+  workers x concurrent attachments, plus the PDFMonkey I/O pool).
+  Extra concurrent calls still succeed, their connections just aren't kept.
+
+Timeouts are split: a short connect timeout fails fast on an unreachable
+host, the read timeout per call covers slow responses (Claude, PDF
+downloads). The session is recreated after a fork, so gunicorn workers
+never share sockets. Cookies are not stored; every call is stateless.
+"""
+
+import os
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from typing import Any, Dict, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .logging_config import get_logger
+
+logger = get_logger("http_client")
+
+Timeout = Union[None, float, Tuple[float, float]]
+
+
+class HTTPClient:
+    """Per-process requests.Session with keep-alive connection pools per host."""
+
+    def __init__(
+        self,
+        pool_hosts: int = 10,
+        pool_size: int = 10,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+    ):
+        self.pool_hosts = max(1, pool_hosts)
+        self.pool_size = max(1, pool_size)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._session: Optional[requests.Session] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _new_session(self) -> requests.Session:
+        session = requests.Session()
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        # Retries stay with the callers (retry_with_backoff); the adapter only pools
+        adapter = HTTPAdapter(pool_connections=self.pool_hosts, pool_maxsize=self.pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        logger.info(f"HTTP session created for process {os.getpid()} ({self.pool_size} connections per host)")
+        return session
+
+    @property
+    def session(self) -> requests.Session:
+        """The pooled session of this process (a forked worker gets its own)."""
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    self._session = self._new_session()
+                    self._pid = pid
+        return self._session
+
+    def timeout(self, timeout: Timeout = None) -> Tuple[float, float]:
+        """(connect, read) timeout; a single number is the read timeout."""
+        if isinstance(timeout, tuple):
+            return timeout
+        return (self.connect_timeout, self.read_timeout if timeout is None else timeout)
+
+    def request(self, method: str, url: str, timeout: Timeout = None, **kwargs) -> requests.Response:
+        """Send a request over a pooled connection. Same arguments as requests.request."""
+        return self.session.request(method, url, timeout=self.timeout(timeout), **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        """Connections opened vs. requests sent per host (this process), for health endpoints."""
+        hosts = {}
+        session = self._session if self._pid == os.getpid() else None
+        if session is not None:
+            for adapter in set(session.adapters.values()):
+                for key in list(adapter.poolmanager.pools.keys()):
+                    pool = adapter.poolmanager.pools.get(key)
+                    if pool is None:
+                        continue
+                    hosts[f"{key.key_scheme}://{key.key_host}"] = {
+                        "connections": pool.num_connections,
+                        "requests": pool.num_requests,
+                        # The pool queue is pre-filled with None placeholders
+                        "idle": sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0,
+                    }
+        return {
+            "pool_hosts": self.pool_hosts,
+            "pool_size": self.pool_size,
+            "connect_timeout": self.connect_timeout,
+            "hosts": hosts,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+            self._pid = None
+
+
+# Singleton
+_http_client = None
+
+
+def get_http_client() -> HTTPClient:
+    """Get singleton HTTP client configured from config."""
+    global _http_client
+    if _http_client is None:
+        from ..config import HTTP_POOL_HOSTS, HTTP_POOL_SIZE, HTTP_CONNECT_TIMEOUT
+        _http_client = HTTPClient(HTTP_POOL_HOSTS, HTTP_POOL_SIZE, connect_timeout=HTTP_CONNECT_TIMEOUT)
+    return _http_client
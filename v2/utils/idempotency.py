@@ -0,0 +1,221 @@
+"""
+Idempotency keys for incoming webhooks.
+
+Typeform and Meta redeliver a webhook when our response is slow or fails.
+Without a guard every redelivery creates another organization, person and
+deal and queues another Claude analysis. Each delivery is keyed on the
+sender's own ID (Typeform form_response.token / event_id, Meta leadgen_id):
+
+- first delivery: claimed as pending, processed, and its response stored
+- redelivery after completion: the stored response is returned, no work
+- redelivery while the first is still running: 409, so the sender retries
+  later and then gets the stored response
+- 5xx responses and exceptions are not stored; the claim is released so a
+  retry processes the webhook again
+
+A pending claim older than lease_seconds (worker killed mid-request) counts
+as free. Entries expire after a TTL and the store is trimmed to max_entries.
+"""
+
+import functools
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from flask import jsonify, request
+
+from .logging_config import get_logger
+from .sqlite_store import SQLiteStore
+
+logger = get_logger("idempotency")
+
+NEW, DONE, IN_PROGRESS = "new", "done", "in_progress"
+PRUNE_EVERY = 100  # Completed requests between expiry / size trims
+
+
+class IdempotencyStore(SQLiteStore):
+    """Claims and stored responses per idempotency key, shared by all workers."""
+
+    SCHEMA = """
+CREATE TABLE IF NOT EXISTS idempotency (
+    key TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    response TEXT,
+    status_code INTEGER,
+    claimed_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_idempotency_expires ON idempotency (expires_at);
+"""
+
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: float = 48 * 3600,
+        max_entries: int = 20000,
+        lease_seconds: float = 300.0,
+    ):
+        super().__init__(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.lease_seconds = lease_seconds
+        self._counter_lock = threading.Lock()
+        self._counts = {"processed": 0, "replayed": 0, "in_progress": 0}
+        self._completed = 0
+
+    def begin(self, key: str) -> Tuple[str, Optional[Tuple[Any, int]]]:
+        """
+        Claim key. Returns (NEW, None) when the caller should process the request,
+        (DONE, (body, status_code)) for a stored response, or (IN_PROGRESS, None).
+        """
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT status, response, status_code, claimed_at, expires_at FROM idempotency WHERE key = ?", (key,)
+            ).fetchone()
+            if row and row[4] > now:
+                status, response, status_code, claimed_at, _ = row
+                if status == DONE:
+                    conn.execute("COMMIT")
+                    self._count("replayed")
+                    return DONE, (json.loads(response), status_code)
+                if now - claimed_at < self.lease_seconds:
+                    conn.execute("COMMIT")
+                    self._count("in_progress")
+                    return IN_PROGRESS, None
+
+            conn.execute(
+                "INSERT OR REPLACE INTO idempotency (key, status, response, status_code, claimed_at, expires_at) "
+                "VALUES (?, 'pending', NULL, NULL, ?, ?)",
+                (key, now, now + self.ttl_seconds)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._count("processed")
+        return NEW, None
+
+    def complete(self, key: str, body: Any, status_code: int) -> None:
+        """Store the response for key, for replay to redeliveries."""
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "UPDATE idempotency SET status = ?, response = ?, status_code = ?, expires_at = ? WHERE key = ?",
+            (DONE, json.dumps(body), status_code, now + self.ttl_seconds, key)
+        )
+        with self._counter_lock:
+            self._completed += 1
+            prune = self._completed % PRUNE_EVERY == 1
+        if prune:
+            conn.execute("DELETE FROM idempotency WHERE expires_at < ?", (now,))
+            conn.execute(
+                "DELETE FROM idempotency WHERE key IN ("
+                "SELECT key FROM idempotency ORDER BY claimed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def release(self, key: str) -> None:
+        """Drop a pending claim so the next delivery processes the request."""
+        self._connect().execute("DELETE FROM idempotency WHERE key = ? AND status = 'pending'", (key,))
+
+    def _count(self, name: str) -> None:
+        with self._counter_lock:
+            self._counts[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Stored keys and delivery counters (this process), for health endpoints."""
+        entries = self._connect().execute("SELECT COUNT(*) FROM idempotency").fetchone()[0]
+        with self._counter_lock:
+            return {"entries": entries, **self._counts}
+
+
+def typeform_delivery_key(data: Dict) -> Optional[str]:
+    """Typeform: the response token (same for every delivery of a submission), else event_id."""
+    key = (data.get('form_response') or {}).get('token') or data.get('event_id')
+    return f"typeform:{key}" if key else None
+
+
+def meta_delivery_key(data: Dict) -> Optional[str]:
+    """Meta Lead Ads: leadgen_id (direct webhook) or lead_id (Zapier)."""
+    key = data.get('leadgen_id') or data.get('lead_id')
+    try:
+        key = key or data['entry'][0]['changes'][0]['value'].get('leadgen_id')
+    except (KeyError, IndexError, TypeError, AttributeError):
+        pass
+    return f"meta:{key}" if key else None
+
+
+def idempotent(
+    key_func: Callable[[Dict], Optional[str]],
+    store: Union[IdempotencyStore, Callable[[], IdempotencyStore]],
+):
+    """
+    Decorator for Flask webhook handlers. key_func maps the JSON body to an
+    idempotency key (None = no key, always processed). Only POSTs are guarded.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            if request.method != "POST":
+                return handler(*args, **kwargs)
+
+            key = key_func(request.get_json(force=True, silent=True) or {})
+            if not key:
+                return handler(*args, **kwargs)
+
+            idempotency = store if isinstance(store, IdempotencyStore) else store()
+            try:
+                state, stored = idempotency.begin(key)
+            except sqlite3.Error as e:
+                logger.error(f"Idempotency store unavailable ({e}) - processing {key} unguarded")
+                return handler(*args, **kwargs)
+
+            if state == DONE:
+                body, status_code = stored
+                logger.info(f"Duplicate delivery {key}: replaying stored response")
+                response = jsonify(body)
+                response.headers["Idempotent-Replayed"] = "true"
+                return response, status_code
+            if state == IN_PROGRESS:
+                logger.info(f"Duplicate delivery {key} while the first is still processing")
+                response = jsonify({"error": "Duplicate delivery, still processing", "idempotency_key": key})
+                response.headers["Retry-After"] = "30"
+                return response, 409
+
+            try:
+                result = handler(*args, **kwargs)
+            except Exception:
+                idempotency.release(key)
+                raise
+
+            response, status_code = result if isinstance(result, tuple) else (result, result.status_code)
+            body = response.get_json(silent=True) if hasattr(response, "get_json") else None
+            if status_code < 500 and body is not None:
+                idempotency.complete(key, body, status_code)
+            else:
+                idempotency.release(key)
+            return result
+        return wrapper
+    return decorator
+
+
+# Singleton
+_idempotency_store = None
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    """Get singleton idempotency store configured from config."""
+    global _idempotency_store
+    if _idempotency_store is None:
+        from ..config import IDEMPOTENCY_PATH, IDEMPOTENCY_TTL_HOURS, IDEMPOTENCY_MAX_ENTRIES
+        _idempotency_store = IdempotencyStore(
+            IDEMPOTENCY_PATH,
+            ttl_seconds=IDEMPOTENCY_TTL_HOURS * 3600,
+            max_entries=IDEMPOTENCY_MAX_ENTRIES
+        )
+    return _idempotency_store
@@ -0,0 +1,358 @@
+"""
+Durable job queue - SQLite-backed with a bounded worker pool.
+
+Jobs are persisted before the webhook responds, so a gunicorn worker restart
+never loses an analysis. Delivery is at-least-once: a running job holds a
+lease that is extended by a heartbeat while the handler runs. If the process
+dies, the lease expires and another worker (in any process on this host)
+claims the job again.
+"""
+
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from .logging_config import get_logger
+from .sqlite_store import SQLiteStore
+
+logger = get_logger("job_queue")
+
+
+@dataclass
+class Job:
+    """A claimed job."""
+    id: int
+    kind: str
+    payload: Dict[str, Any]
+    attempts: int
+
+
+class JobQueue(SQLiteStore):
+    """Persistent job queue with a fixed-size pool of worker threads."""
+
+    SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_until REAL,
+    worker TEXT,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_available ON jobs (status, available_at);
+"""
+
+    def __init__(
+        self,
+        path: str,
+        workers: int = 2,
+        lease_seconds: float = 120.0,
+        max_attempts: int = 3,
+        retry_delay: float = 30.0,
+        poll_interval: float = 2.0,
+        done_retention_seconds: float = 7 * 24 * 3600,
+    ):
+        super().__init__(path)
+        self.workers = max(1, workers)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        self.done_retention_seconds = done_retention_seconds
+
+        self._handlers: Dict[str, Callable[..., Any]] = {}
+        self._failure_handlers: Dict[str, Callable[..., Any]] = {}
+        self._threads: List[threading.Thread] = []
+        self._running_ids: set = set()
+        self._running_lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._stop = threading.Event()
+        self._worker_name = f"{socket.gethostname()}:{os.getpid()}"
+
+    # =========================================================================
+    # PRODUCER API
+    # =========================================================================
+
+    def register(
+        self, kind: str, handler: Callable[..., Any], on_failure: Callable[..., Any] = None
+    ) -> None:
+        """
+        Register the handler for a job kind. Handler is called with **payload and
+        must raise on failure, so the job is retried. on_failure(error, **payload)
+        runs once when the job has failed permanently.
+        """
+        self._handlers[kind] = handler
+        if on_failure:
+            self._failure_handlers[kind] = on_failure
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], delay: float = 0.0) -> int:
+        """Persist a job and wake a local worker (starting the pool if needed). Returns the job ID."""
+        if not self._stop.is_set():
+            self.start()
+
+        now = time.time()
+        conn = self._connect()
+        cursor = conn.execute(
+            "INSERT INTO jobs (kind, payload, status, available_at, created_at, updated_at) "
+            "VALUES (?, ?, 'pending', ?, ?, ?)",
+            (kind, json.dumps(payload), now + delay, now, now)
+        )
+        job_id = cursor.lastrowid
+        logger.info(f"Enqueued job {job_id} ({kind})")
+
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def stats(self) -> Dict[str, Any]:
+        """Backlog overview for health endpoints."""
+        now = time.time()
+        conn = self._connect()
+        counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        oldest = conn.execute(
+            "SELECT MIN(created_at) FROM jobs WHERE status IN ('pending', 'running')"
+        ).fetchone()[0]
+
+        return {
+            "pending": counts.get("pending", 0),
+            "running": counts.get("running", 0),
+            "failed": counts.get("failed", 0),
+            "done": counts.get("done", 0),
+            "oldest_backlog_seconds": round(now - oldest, 1) if oldest else 0,
+            "workers": len([t for t in self._threads if t.is_alive() and t.name.startswith("job-worker")]),
+        }
+
+    def failed_jobs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent failed jobs, for inspection."""
+        rows = self._connect().execute(
+            "SELECT id, kind, attempts, last_error, updated_at FROM jobs "
+            "WHERE status = 'failed' ORDER BY updated_at DESC LIMIT ?",
+            (limit,)
+        ).fetchall()
+        return [
+            {"id": r[0], "kind": r[1], "attempts": r[2], "error": r[3], "updated_at": r[4]}
+            for r in rows
+        ]
+
+    # =========================================================================
+    # CONSUMER SIDE
+    # =========================================================================
+
+    def _claim(self) -> Optional[Job]:
+        """Atomically claim the next available job for a registered kind."""
+        if not self._handlers:
+            return None
+
+        now = time.time()
+        kinds = list(self._handlers)
+        placeholders = ",".join("?" * len(kinds))
+        conn = self._connect()
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                f"SELECT id, kind, payload, attempts FROM jobs "
+                f"WHERE kind IN ({placeholders}) AND ("
+                f"(status = 'pending' AND available_at <= ?) OR "
+                f"(status = 'running' AND lease_until < ?)"
+                f") ORDER BY available_at, id LIMIT 1",
+                (*kinds, now, now)
+            ).fetchone()
+
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            job_id, kind, payload, attempts = row
+
+            if attempts >= self.max_attempts:
+                # Lease expired on the final attempt - the worker died mid-job
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', last_error = ?, updated_at = ? WHERE id = ?",
+                    ("lease expired after final attempt", now, job_id)
+                )
+                conn.execute("COMMIT")
+                logger.error(f"Job {job_id} ({kind}) failed: lease expired after {attempts} attempts")
+                self._failed(kind, json.loads(payload), "lease expired after final attempt")
+                return None
+
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, "
+                "lease_until = ?, worker = ?, updated_at = ? WHERE id = ?",
+                (now + self.lease_seconds, self._worker_name, now, job_id)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        return Job(id=job_id, kind=kind, payload=json.loads(payload), attempts=attempts + 1)
+
+    def _complete(self, job: Job) -> None:
+        self._connect().execute(
+            "UPDATE jobs SET status = 'done', lease_until = NULL, updated_at = ? WHERE id = ?",
+            (time.time(), job.id)
+        )
+
+    def _fail(self, job: Job, error: str) -> None:
+        now = time.time()
+        conn = self._connect()
+
+        if job.attempts >= self.max_attempts:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', lease_until = NULL, last_error = ?, updated_at = ? WHERE id = ?",
+                (error[:1000], now, job.id)
+            )
+            logger.error(f"Job {job.id} ({job.kind}) failed permanently after {job.attempts} attempts: {error}")
+            self._failed(job.kind, job.payload, error)
+        else:
+            delay = self.retry_delay * (2 ** (job.attempts - 1))
+            conn.execute(
+                "UPDATE jobs SET status = 'pending', lease_until = NULL, available_at = ?, "
+                "last_error = ?, updated_at = ? WHERE id = ?",
+                (now + delay, error[:1000], now, job.id)
+            )
+            logger.warning(f"Job {job.id} ({job.kind}) attempt {job.attempts} failed, retry in {delay:.0f}s: {error}")
+
+    def _failed(self, kind: str, payload: Dict[str, Any], error: str) -> None:
+        """Run the kind's on_failure handler (errors are logged, never raised)."""
+        on_failure = self._failure_handlers.get(kind)
+        if on_failure is None:
+            return
+        try:
+            on_failure(error, **payload)
+        except Exception as e:
+            logger.error(f"on_failure handler for {kind} raised: {e}", exc_info=True)
+
+    def _run(self, job: Job) -> None:
+        handler = self._handlers[job.kind]
+        started = time.time()
+
+        with self._running_lock:
+            self._running_ids.add(job.id)
+        try:
+            logger.info(f"Running job {job.id} ({job.kind}) attempt {job.attempts}")
+            handler(**job.payload)
+            self._complete(job)
+            logger.info(f"Job {job.id} ({job.kind}) done in {time.time() - started:.1f}s")
+        except Exception as e:
+            logger.error(f"Job {job.id} ({job.kind}) raised: {e}", exc_info=True)
+            self._fail(job, str(e))
+        finally:
+            with self._running_lock:
+                self._running_ids.discard(job.id)
+
+    def _worker_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = self._claim()
+            except sqlite3.Error as e:
+                logger.error(f"Job claim failed: {e}")
+                job = None
+
+            if job is not None:
+                self._run(job)
+                continue
+
+            with self._wakeup:
+                self._wakeup.wait(self.poll_interval)
+
+    def _heartbeat_loop(self) -> None:
+        """Extend leases of jobs running in this process; prune old done jobs."""
+        interval = max(1.0, self.lease_seconds / 3)
+        while not self._stop.wait(interval):
+            try:
+                now = time.time()
+                with self._running_lock:
+                    running = list(self._running_ids)
+                conn = self._connect()
+                for job_id in running:
+                    conn.execute(
+                        "UPDATE jobs SET lease_until = ? WHERE id = ? AND status = 'running'",
+                        (now + self.lease_seconds, job_id)
+                    )
+                conn.execute(
+                    "DELETE FROM jobs WHERE status = 'done' AND updated_at < ?",
+                    (now - self.done_retention_seconds,)
+                )
+            except sqlite3.Error as e:
+                logger.error(f"Job heartbeat failed: {e}")
+
+    def start(self) -> None:
+        """Start the worker pool (idempotent per process)."""
+        if any(t.is_alive() for t in self._threads):
+            return
+        if multiprocessing.parent_process() is not None:
+            # Spawned helper processes (e.g. the render pool) import the app but never run jobs
+            return
+
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        self._threads.append(
+            threading.Thread(target=self._heartbeat_loop, name="job-heartbeat", daemon=True)
+        )
+        for thread in self._threads:
+            thread.start()
+
+        logger.info(f"Job queue started: {self.workers} workers, db={self.path}")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Signal workers to stop after their current job."""
+        self._stop.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+
+
+# Singleton
+_job_queue = None
+
+
+def get_job_queue() -> JobQueue:
+    """Get singleton job queue instance configured from config."""
+    global _job_queue
+    if _job_queue is None:
+        from ..config import (
+            JOB_QUEUE_PATH, JOB_QUEUE_WORKERS, JOB_QUEUE_LEASE_SECONDS, JOB_QUEUE_MAX_ATTEMPTS
+        )
+        _job_queue = JobQueue(
+            JOB_QUEUE_PATH,
+            workers=JOB_QUEUE_WORKERS,
+            lease_seconds=JOB_QUEUE_LEASE_SECONDS,
+            max_attempts=JOB_QUEUE_MAX_ATTEMPTS
+        )
+    return _job_queue
+
+
+_intake_queue = None
+
+
+def get_intake_queue() -> JobQueue:
+    """Get singleton queue for the Typeform intake stages, separate from the analysis jobs."""
+    global _intake_queue
+    if _intake_queue is None:
+        from ..config import (
+            INTAKE_QUEUE_PATH, INTAKE_QUEUE_WORKERS, JOB_QUEUE_LEASE_SECONDS, JOB_QUEUE_MAX_ATTEMPTS
+        )
+        _intake_queue = JobQueue(
+            INTAKE_QUEUE_PATH,
+            workers=INTAKE_QUEUE_WORKERS,
+            lease_seconds=JOB_QUEUE_LEASE_SECONDS,
+            max_attempts=JOB_QUEUE_MAX_ATTEMPTS
+        )
+    return _intake_queue
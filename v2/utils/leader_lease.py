@@ -0,0 +1,180 @@
+"""
+Cross-process leader lease.
+
+gunicorn runs several workers, and each one imports the app and starts the
+same background threads. Work that must run exactly once per host (nurture
+scheduling and sending) is guarded by a named lease in a shared SQLite file:
+
+- acquire() takes the lease when it is free, expired or already ours
+- while held, a heartbeat thread renews it every ttl / 3 seconds
+- a holder that dies stops renewing, and another process takes over once
+  the lease expires (at most ttl seconds later)
+- a holder that fails to renew (lost the lease, database error) stops
+  reporting is_leader() before its lease can have expired
+
+The holder ID is host:pid:token, so a forked worker never inherits its
+parent's lease.
+"""
+
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from .logging_config import get_logger
+from .sqlite_store import SQLiteStore
+
+logger = get_logger("leader_lease")
+
+
+class LeaderLease(SQLiteStore):
+    """One named lease, held by at most one process at a time."""
+
+    SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    acquired_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+    def __init__(self, path: str, name: str, ttl: float = 30.0):
+        super().__init__(path)
+        self.name = name
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._pid = None
+        self._holder = None
+        self._valid_until = 0.0
+        self._heartbeat: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._counts = {"acquired": 0, "lost": 0}
+
+    @property
+    def holder(self) -> str:
+        """This process's holder ID (new after a fork)."""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._holder = f"{socket.gethostname()}:{self._pid}:{uuid.uuid4().hex[:8]}"
+            self._valid_until = 0.0
+            self._heartbeat = None
+        return self._holder
+
+    # =========================================================================
+    # LEASE
+    # =========================================================================
+
+    def _claim(self) -> bool:
+        """Take or renew the lease if it is free, expired or ours."""
+        holder, now = self.holder, time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT holder, acquired_at, expires_at FROM leases WHERE name = ?",
+                               (self.name,)).fetchone()
+            if row and row[0] != holder and row[2] > now:
+                conn.execute("COMMIT")
+                return False
+            acquired_at = row[1] if row and row[0] == holder else now
+            conn.execute(
+                "INSERT OR REPLACE INTO leases (name, holder, acquired_at, expires_at) VALUES (?, ?, ?, ?)",
+                (self.name, holder, acquired_at, now + self.ttl)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        # Stop trusting the lease a little before others may take it over
+        self._valid_until = now + self.ttl * 2 / 3
+        return True
+
+    def acquire(self) -> bool:
+        """Try to become (or stay) leader. Starts the heartbeat while held."""
+        with self._lock:
+            was_leader = self.is_leader()
+            try:
+                held = self._claim()
+            except Exception as e:
+                logger.error(f"Lease {self.name} unavailable: {e}")
+                return False
+            if held and not was_leader:
+                self._counts["acquired"] += 1
+                logger.info(f"Lease {self.name} acquired by {self.holder}")
+            if held and (self._heartbeat is None or not self._heartbeat.is_alive() or self._stop.is_set()):
+                self._stop = threading.Event()
+                self._heartbeat = threading.Thread(
+                    target=self._heartbeat_loop, args=(self._stop,), name=f"lease-{self.name}", daemon=True
+                )
+                self._heartbeat.start()
+            return held
+
+    def release(self) -> None:
+        """Give up the lease so another process can take over immediately."""
+        with self._lock:
+            self._stop.set()
+            self._valid_until = 0.0
+            try:
+                self._connect().execute("DELETE FROM leases WHERE name = ? AND holder = ?", (self.name, self.holder))
+            except Exception as e:
+                logger.error(f"Lease {self.name} release failed: {e}")
+
+    def is_leader(self) -> bool:
+        return self._pid == os.getpid() and time.time() < self._valid_until
+
+    def _heartbeat_loop(self, stop: threading.Event) -> None:
+        while not stop.wait(self.ttl / 3):
+            with self._lock:
+                if stop.is_set():
+                    return
+                try:
+                    if self._claim():
+                        continue
+                    self._valid_until = 0.0  # Another process holds it
+                except Exception as e:
+                    # Keep trying: a database hiccup shorter than the ttl keeps the lease
+                    logger.error(f"Lease {self.name} heartbeat failed: {e}")
+                if not self.is_leader():
+                    self._counts["lost"] += 1
+                    logger.warning(f"Lease {self.name} lost by {self.holder}")
+                    return
+
+    @contextmanager
+    def hold(self) -> Iterator[bool]:
+        """Hold the lease for one run: yields whether it was acquired, releases afterwards."""
+        acquired = self.acquire()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Current holder and this process's role, for health endpoints."""
+        row = self._connect().execute("SELECT holder, acquired_at, expires_at FROM leases WHERE name = ?",
+                                      (self.name,)).fetchone()
+        now = time.time()
+        current = row if row and row[2] > now else None
+        return {
+            "holder": current[0] if current else None,
+            "held_for_s": round(now - current[1]) if current else None,
+            "leader": self.is_leader(),
+            **self._counts,
+        }
+
+
+# Singletons per lease name
+_leases: Dict[str, LeaderLease] = {}
+_leases_lock = threading.Lock()
+
+
+def get_leader_lease(name: str) -> LeaderLease:
+    """Get the process-wide lease for name, configured from config."""
+    with _leases_lock:
+        if name not in _leases:
+            from ..config import LEADER_LEASE_PATH, LEADER_LEASE_TTL
+            _leases[name] = LeaderLease(LEADER_LEASE_PATH, name, ttl=LEADER_LEASE_TTL)
+    return _leases[name]
@@ -0,0 +1,77 @@
+"""
+Per-stage latency metrics.
+
+Webhook flows run as named stages (typeform.extract, typeform.crm, ...).
+Each stage is timed with stage_timer() and the last `window` durations are
+kept per stage, so /health/detailed shows count, errors and p50 / p95 / max
+latency without an external metrics system. Counters are per process.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator
+
+
+class StageMetrics:
+    """Rolling latency window and counters per stage name."""
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._durations: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float, ok: bool = True) -> None:
+        with self._lock:
+            if stage not in self._durations:
+                self._durations[stage] = deque(maxlen=self.window)
+                self._counts[stage] = {"count": 0, "errors": 0}
+            self._durations[stage].append(seconds)
+            self._counts[stage]["count"] += 1
+            if not ok:
+                self._counts[stage]["errors"] += 1
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """Time the block; an exception counts as an error and is re-raised."""
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.record(stage, time.perf_counter() - started, ok=False)
+            raise
+        self.record(stage, time.perf_counter() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        """Per stage: count, errors and latency percentiles (ms) over the window."""
+        with self._lock:
+            snapshot = {stage: (sorted(durations), dict(self._counts[stage]))
+                        for stage, durations in self._durations.items()}
+
+        result = {}
+        for stage, (durations, counts) in sorted(snapshot.items()):
+            def percentile(p: float) -> float:
+                return round(durations[min(len(durations) - 1, int(len(durations) * p))] * 1000, 1)
+            result[stage] = {
+                **counts,
+                "p50_ms": percentile(0.50),
+                "p95_ms": percentile(0.95),
+                "max_ms": round(durations[-1] * 1000, 1),
+            }
+        return result
+
+
+# Singleton
+_metrics = StageMetrics()
+
+
+def get_metrics() -> StageMetrics:
+    """Process-wide stage metrics."""
+    return _metrics
+
+
+def stage_timer(stage: str):
+    """Time a block as `stage` in the process-wide metrics."""
+    return _metrics.timer(stage)
@@ -0,0 +1,295 @@
+"""
+Host-wide rate limiter for Claude calls.
+
+All gunicorn workers (and both apps, when they share KT_DATA_DIR) draw from
+the same budgets, coordinated through a SQLite file:
+
+- a concurrency cap on in-flight requests
+- token buckets for requests, input tokens and output tokens per minute,
+  mirroring Anthropic's RPM / ITPM / OTPM limits
+
+acquire() blocks until a permit is available instead of failing, so a
+burst of leads is queued rather than turned into 429s. Token reservations
+are estimates (prompt size, max_tokens) and are settled against the actual
+usage afterwards. A 429 pauses every caller until retry-after has passed.
+"""
+
+import os
+import socket
+import sqlite3
+import threading
+import time
+import random
+import uuid
+from typing import Any, Dict, Optional
+
+from .logging_config import get_logger
+from .sqlite_store import SQLiteStore
+
+logger = get_logger("rate_limiter")
+
+BUCKETS = ("requests", "input_tokens", "output_tokens")
+CHARS_PER_TOKEN = 3.0  # Conservative for Dutch text
+
+
+def estimate_tokens(text_length: int) -> int:
+    """Rough input token estimate from a character count."""
+    return int(text_length / CHARS_PER_TOKEN) + 1
+
+
+class RateLimitPermit:
+    """A granted slot; settle() reconciles the token reservation with real usage."""
+
+    def __init__(self, limiter: "ClaudeRateLimiter", slot_id: str, input_tokens: int, output_tokens: int):
+        self.limiter = limiter
+        self.slot_id = slot_id
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self._settled = False
+
+    def settle(self, usage: Any) -> None:
+        """Refund (or charge) the difference between reserved and actual tokens."""
+        if self._settled or usage is None:
+            return
+        get = usage.get if isinstance(usage, dict) else lambda field: getattr(usage, field, 0)
+        # Cache reads don't count towards the input token rate limit
+        actual_input = (get("input_tokens") or 0) + (get("cache_creation_input_tokens") or 0)
+        actual_output = get("output_tokens") or 0
+        self.limiter._refund({
+            "input_tokens": self.input_tokens - actual_input,
+            "output_tokens": self.output_tokens - actual_output,
+        })
+        self._settled = True
+
+    def rate_limited(self, retry_after: Optional[float] = None) -> None:
+        """Report a 429: pause all callers on this host."""
+        self.limiter.pause(retry_after or self.limiter.default_pause)
+
+    def release(self) -> None:
+        self.limiter._release(self.slot_id)
+
+    def __enter__(self) -> "RateLimitPermit":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class ClaudeRateLimiter(SQLiteStore):
+    """Cross-process concurrency cap + per-minute token buckets."""
+
+    SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_buckets (
+    name TEXT PRIMARY KEY,
+    level REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rate_slots (
+    id TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rate_pause (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    until REAL NOT NULL
+);
+"""
+
+    def __init__(
+        self,
+        path: str,
+        max_concurrent: int = 4,
+        requests_per_minute: int = 50,
+        input_tokens_per_minute: int = 30000,
+        output_tokens_per_minute: int = 8000,
+        slot_ttl: float = 600.0,
+        default_pause: float = 30.0,
+    ):
+        super().__init__(path)
+        self.max_concurrent = max(1, max_concurrent)
+        self.capacity = {
+            "requests": float(requests_per_minute),
+            "input_tokens": float(input_tokens_per_minute),
+            "output_tokens": float(output_tokens_per_minute),
+        }
+        self.slot_ttl = slot_ttl
+        self.default_pause = default_pause
+        self._holder = f"{socket.gethostname()}:{os.getpid()}"
+        self._waiting = 0
+        self._waiting_lock = threading.Lock()
+
+    def _refill(self, conn: sqlite3.Connection, now: float) -> Dict[str, float]:
+        """Return current bucket levels after refilling for elapsed time."""
+        rows = dict(
+            (name, (level, updated_at))
+            for name, level, updated_at in conn.execute("SELECT name, level, updated_at FROM rate_buckets")
+        )
+        levels = {}
+        for name in BUCKETS:
+            capacity = self.capacity[name]
+            level, updated_at = rows.get(name, (capacity, now))
+            levels[name] = min(capacity, level + (now - updated_at) * capacity / 60.0)
+        return levels
+
+    def _store(self, conn: sqlite3.Connection, levels: Dict[str, float], now: float) -> None:
+        conn.executemany(
+            "INSERT OR REPLACE INTO rate_buckets (name, level, updated_at) VALUES (?, ?, ?)",
+            [(name, level, now) for name, level in levels.items()]
+        )
+
+    def _try_acquire(self, need: Dict[str, float]) -> Any:
+        """One attempt. Returns a slot ID, or the number of seconds to wait."""
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT until FROM rate_pause WHERE id = 1").fetchone()
+            if row and row[0] > now:
+                conn.execute("COMMIT")
+                return row[0] - now
+
+            conn.execute("DELETE FROM rate_slots WHERE expires_at < ?", (now,))
+            in_flight = conn.execute("SELECT COUNT(*) FROM rate_slots").fetchone()[0]
+            if in_flight >= self.max_concurrent:
+                conn.execute("COMMIT")
+                return 0.25
+
+            levels = self._refill(conn, now)
+            wait = max(
+                (need[name] - levels[name]) * 60.0 / self.capacity[name]
+                for name in BUCKETS
+            )
+            if wait > 0:
+                conn.execute("COMMIT")
+                return wait
+
+            for name in BUCKETS:
+                levels[name] -= need[name]
+            self._store(conn, levels, now)
+
+            slot_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO rate_slots (id, holder, expires_at) VALUES (?, ?, ?)",
+                (slot_id, self._holder, now + self.slot_ttl)
+            )
+            conn.execute("COMMIT")
+            return slot_id
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def acquire(self, prompt_chars: int = 0, max_tokens: int = 0) -> RateLimitPermit:
+        """
+        Block until a request may be sent.
+
+        Args:
+            prompt_chars: Length of system + user prompt, used to reserve input tokens
+            max_tokens: Requested max_tokens, reserved as output tokens until settled
+        """
+        input_tokens = estimate_tokens(prompt_chars) if prompt_chars else 0
+        # A reservation larger than the bucket could never be granted
+        need = {
+            "requests": 1.0,
+            "input_tokens": min(float(input_tokens), self.capacity["input_tokens"]),
+            "output_tokens": min(float(max_tokens), self.capacity["output_tokens"]),
+        }
+
+        started = time.time()
+        with self._waiting_lock:
+            self._waiting += 1
+        try:
+            while True:
+                try:
+                    result = self._try_acquire(need)
+                except sqlite3.Error as e:
+                    logger.error(f"Rate limiter unavailable, continuing without limit: {e}")
+                    return RateLimitPermit(self, "", 0, 0)
+
+                if isinstance(result, str):
+                    waited = time.time() - started
+                    if waited > 1:
+                        logger.info(f"Claude permit granted after {waited:.1f}s")
+                    return RateLimitPermit(self, result, int(need["input_tokens"]), int(need["output_tokens"]))
+
+                # Jitter so waiting workers don't retry in lockstep
+                time.sleep(min(result, 1.0) + random.uniform(0, 0.1))
+        finally:
+            with self._waiting_lock:
+                self._waiting -= 1
+
+    def _release(self, slot_id: str) -> None:
+        if not slot_id:
+            return
+        try:
+            self._connect().execute("DELETE FROM rate_slots WHERE id = ?", (slot_id,))
+        except sqlite3.Error as e:
+            logger.error(f"Rate limiter release failed: {e}")
+
+    def _refund(self, deltas: Dict[str, float]) -> None:
+        """Add unused reservation back to the buckets (negative deltas charge extra)."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            levels = self._refill(conn, now)
+            for name, delta in deltas.items():
+                levels[name] = min(self.capacity[name], levels[name] + delta)
+            self._store(conn, levels, now)
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.error(f"Rate limiter refund failed: {e}")
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+
+    def pause(self, seconds: float) -> None:
+        """Stop granting permits on this host for the given number of seconds."""
+        until = time.time() + seconds
+        logger.warning(f"Claude rate limited - pausing all calls for {seconds:.0f}s")
+        try:
+            self._connect().execute(
+                "INSERT INTO rate_pause (id, until) VALUES (1, ?) "
+                "ON CONFLICT(id) DO UPDATE SET until = MAX(until, excluded.until)",
+                (until,)
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Rate limiter pause failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Current budgets for health endpoints."""
+        now = time.time()
+        conn = self._connect()
+        levels = self._refill(conn, now)
+        in_flight = conn.execute(
+            "SELECT COUNT(*) FROM rate_slots WHERE expires_at >= ?", (now,)
+        ).fetchone()[0]
+        row = conn.execute("SELECT until FROM rate_pause WHERE id = 1").fetchone()
+
+        return {
+            "in_flight": in_flight,
+            "max_concurrent": self.max_concurrent,
+            "waiting_here": self._waiting,
+            "paused_seconds": round(max(0.0, row[0] - now), 1) if row else 0,
+            **{f"{name}_available": int(level) for name, level in levels.items()},
+        }
+
+
+# Singleton
+_rate_limiter = None
+
+
+def get_rate_limiter() -> ClaudeRateLimiter:
+    """Get singleton Claude rate limiter configured from config."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        from ..config import (
+            CLAUDE_RATE_LIMIT_PATH, CLAUDE_MAX_CONCURRENT, CLAUDE_REQUESTS_PER_MINUTE,
+            CLAUDE_INPUT_TOKENS_PER_MINUTE, CLAUDE_OUTPUT_TOKENS_PER_MINUTE
+        )
+        _rate_limiter = ClaudeRateLimiter(
+            CLAUDE_RATE_LIMIT_PATH,
+            max_concurrent=CLAUDE_MAX_CONCURRENT,
+            requests_per_minute=CLAUDE_REQUESTS_PER_MINUTE,
+            input_tokens_per_minute=CLAUDE_INPUT_TOKENS_PER_MINUTE,
+            output_tokens_per_minute=CLAUDE_OUTPUT_TOKENS_PER_MINUTE
+        )
+    return _rate_limiter
@@ -0,0 +1,214 @@
+"""
+Warm process pool for ReportLab rendering.
+
+ReportLab builds documents in pure Python and holds the GIL for the whole
+render, which stalls webhook handling in the same process. Render jobs are
+instead sent over the executor's call queue to worker processes that are
+started up front and warmed: ReportLab imported, the sample stylesheet and
+brand colours built and the standard font metrics loaded. Workers are
+spawned, not forked, so they never inherit the parent's SQLite connections
+or job queue threads.
+"""
+
+import importlib
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from .logging_config import get_logger
+
+logger = get_logger("render_pool")
+
+STANDARD_FONTS = ("Helvetica", "Helvetica-Bold", "Helvetica-Oblique", "Helvetica-BoldOblique")
+
+
+@lru_cache(maxsize=1)
+def get_stylesheet():
+    """Per-process ReportLab sample stylesheet. Shared - use styles as parents, don't modify."""
+    from reportlab.lib.styles import getSampleStyleSheet
+    return getSampleStyleSheet()
+
+
+@lru_cache(maxsize=1)
+def get_brand_colors() -> Dict[str, Any]:
+    """Per-process ReportLab colours for config.BRAND_COLORS."""
+    from reportlab.lib import colors
+    from ..config import BRAND_COLORS
+    return {name: colors.HexColor(value) for name, value in BRAND_COLORS.items()}
+
+
+def _warm_worker(preload: Iterable[str]) -> None:
+    """Worker initializer: import renderers and load everything a first render would."""
+    started = time.time()
+    for module in preload:
+        if module != "__main__":  # A spawned worker already runs the main module as __mp_main__
+            importlib.import_module(module)
+
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    get_stylesheet()
+    get_brand_colors()
+    for font in STANDARD_FONTS:
+        stringWidth("Kandidatentekort", font, 10)  # Loads the AFM metrics
+
+    logger.info(f"Render worker {os.getpid()} warm in {time.time() - started:.2f}s")
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _timed_render(func: Callable[..., Any], args: tuple, kwargs: dict):
+    """Runs in the worker: the render result plus its duration and worker PID."""
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started, os.getpid()
+
+
+class RenderPool:
+    """Pre-started pool of warm render worker processes."""
+
+    def __init__(self, workers: int = 2, preload: Iterable[str] = (), history: int = 50):
+        self.workers = max(1, workers)
+        self.preload = tuple(preload)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._renders = 0
+        self._failures = 0
+        self._in_flight = 0
+        self._render_total = 0.0
+        self._wait_total = 0.0
+        self._recent = deque(maxlen=history)
+
+    def _start(self) -> ProcessPoolExecutor:
+        """Spawn all workers and wait until they are warm. Caller holds _lock."""
+        started = time.time()
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker,
+            initargs=(self.preload,)
+        )
+        # Workers are spawned on demand - one ping per worker brings them all up now
+        pings = [executor.submit(_ping) for _ in range(self.workers)]
+        for ping in pings:
+            ping.result()
+
+        logger.info(f"Render pool started: {self.workers} workers in {time.time() - started:.1f}s")
+        return executor
+
+    def start(self, wait: bool = True) -> None:
+        """
+        Start the workers now instead of on the first render (idempotent).
+        With wait=False the workers are spawned and warmed in the background.
+        """
+        if self._executor is not None or multiprocessing.parent_process() is not None:
+            return  # Already running, or this is a render worker that imported the app
+        if not wait:
+            threading.Thread(target=self.start, name="render-pool-start", daemon=True).start()
+            return
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._start()
+
+    def submit(self, func: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        Queue a render. func must be importable by name (module-level function)
+        and its arguments picklable. The future resolves to func's return value.
+        """
+        name = getattr(func, "__name__", repr(func))
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._start()
+            try:
+                inner = self._executor.submit(_timed_render, func, args, kwargs)
+            except BrokenProcessPool:
+                logger.error("Render pool broken - restarting workers")
+                self._executor = self._start()
+                inner = self._executor.submit(_timed_render, func, args, kwargs)
+
+        with self._stats_lock:
+            self._in_flight += 1
+
+        future = Future()
+        submitted = time.perf_counter()
+
+        def done(inner_future: Future) -> None:
+            total = time.perf_counter() - submitted
+            with self._stats_lock:
+                self._in_flight -= 1
+
+            if inner_future.cancelled():
+                future.cancel()
+                return
+            error = inner_future.exception()
+            if error is not None:
+                with self._stats_lock:
+                    self._failures += 1
+                logger.error(f"Render {name} failed after {total:.2f}s: {error}")
+                future.set_exception(error)
+                return
+
+            result, render_seconds, pid = inner_future.result()
+            queued = max(0.0, total - render_seconds)
+            with self._stats_lock:
+                self._renders += 1
+                self._render_total += render_seconds
+                self._wait_total += queued
+                self._recent.append({
+                    "name": name,
+                    "render_seconds": round(render_seconds, 3),
+                    "queued_seconds": round(queued, 3),
+                    "worker": pid,
+                })
+            logger.info(f"Rendered {name} in {render_seconds:.2f}s (queued {queued:.2f}s, worker {pid})")
+            future.set_result(result)
+
+        inner.add_done_callback(done)
+        return future
+
+    def render(self, func: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Render and wait for the result; raises TimeoutError after timeout seconds."""
+        return self.submit(func, *args, **kwargs).result(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool size and per-render timings, for health endpoints."""
+        with self._stats_lock:
+            renders = self._renders
+            return {
+                "workers": self.workers,
+                "started": self._executor is not None,
+                "in_flight": self._in_flight,
+                "renders": renders,
+                "failures": self._failures,
+                "avg_render_seconds": round(self._render_total / renders, 3) if renders else 0,
+                "avg_queued_seconds": round(self._wait_total / renders, 3) if renders else 0,
+                "recent": list(self._recent)[-10:],
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+
+
+# Singleton
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+
+def get_render_pool() -> RenderPool:
+    """Get singleton render pool configured from config."""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            from ..config import PDF_RENDER_WORKERS
+            _render_pool = RenderPool(PDF_RENDER_WORKERS, preload=("v2.services.pdf_generator",))
+    return _render_pool
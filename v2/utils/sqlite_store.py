@@ -0,0 +1,38 @@
+"""
+Base class for small local SQLite stores (job queue, caches, indexes).
+"""
+
+import os
+import sqlite3
+import threading
+
+
+class SQLiteStore:
+    """
+    Shares one SQLite file between threads and gunicorn workers.
+
+    Each thread gets its own connection in autocommit mode with WAL enabled,
+    so readers never block the single writer. Subclasses set SCHEMA.
+    """
+
+    SCHEMA = ""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        if self.SCHEMA:
+            self._connect().executescript(self.SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection (one per thread, reused)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
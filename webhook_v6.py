@@ -17,11 +17,17 @@ Features:
 import os
 import io
 import json
+import time
+import hashlib
+import hmac
 import logging
-import smtplib
-import requests
+import re
+import tempfile
 import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from datetime import datetime
+from typing import Dict, List, TypedDict
+from urllib.parse import urlencode
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
@@ -40,6 +46,17 @@ from reportlab.graphics.charts.barcharts import HorizontalBarChart
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 
+from v2.utils.job_queue import JobQueue
+from v2.utils.analysis_cache import AnalysisCache
+from v2.utils.idempotency import IdempotencyStore, idempotent, typeform_delivery_key
+from v2.utils.claude_usage import ClaudeUsageTracker
+from v2.utils.rate_limiter import ClaudeRateLimiter
+from v2.utils.render_pool import RenderPool
+from v2.utils.http_client import HTTPClient
+from v2.services.pdfmonkey_tracker import PDFMonkeyTracker
+from v2.services.smtp_pool import SMTPPool
+from v2.services.crm_index import CRMIndex, ORG_NAME, DOMAIN, EMAIL
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -85,103 +102,149 @@ CUSTOM_FIELD_ANALYSIS_DATE = os.getenv('PD_FIELD_ANALYSIS_DATE', '')
 PDFMONKEY_API_KEY = os.getenv('PDFMONKEY_API_KEY', '')
 PDFMONKEY_TEMPLATE_ANALYSE = os.getenv('PDFMONKEY_TEMPLATE_ANALYSE', '')  # Bijlage 1 template ID
 PDFMONKEY_TEMPLATE_VACATURE = os.getenv('PDFMONKEY_TEMPLATE_VACATURE', '')  # Bijlage 2 template ID
-PDFMONKEY_API_URL = "https://api.pdfmonkey.io/api/v1/documents"
+PDFMONKEY_API_URL = os.getenv('PDFMONKEY_API_URL', 'https://api.pdfmonkey.io/api/v1/documents')
+PDFMONKEY_WEBHOOK_SECRET = os.getenv('PDFMONKEY_WEBHOOK_SECRET', '')  # ?token= on /webhook/pdfmonkey
+PDFMONKEY_WEBHOOK_ENABLED = os.getenv('PDFMONKEY_WEBHOOK_ENABLED', 'false').lower() == 'true'
 
 # Feature flag - use PDFMonkey if configured, else fallback to ReportLab
 USE_PDFMONKEY = bool(PDFMONKEY_API_KEY and PDFMONKEY_TEMPLATE_ANALYSE)
 
+# Attachment rendering: PDFMonkey completes via webhook/polling, ReportLab on warm worker processes
+PDF_RENDER_WORKERS = int(os.getenv('PDF_RENDER_WORKERS', '2'))  # Per gunicorn worker
+PDF_ATTACHMENT_TIMEOUT = float(os.getenv('PDF_ATTACHMENT_TIMEOUT', '90'))  # PDFMonkey, per attachment
+PDF_RENDER_TIMEOUT = float(os.getenv('PDF_RENDER_TIMEOUT', '60'))  # ReportLab, per attachment
+
+# Durable job queue for async analyses (survives gunicorn worker restarts)
+DATA_DIR = os.getenv('KT_DATA_DIR', os.path.join(tempfile.gettempdir(), 'kandidatentekort'))
+JOB_QUEUE_PATH = os.getenv('JOB_QUEUE_PATH', os.path.join(DATA_DIR, 'jobs.sqlite3'))
+JOB_QUEUE_WORKERS = int(os.getenv('JOB_QUEUE_WORKERS', '2'))  # Per gunicorn worker
+ANALYSIS_JOB = "v6_analysis"
+
+# Claude analysis settings + content-addressed cache for repeat submissions
+CLAUDE_MODEL = "claude-sonnet-4-20250514"
+ANALYSIS_CACHE_PATH = os.getenv('ANALYSIS_CACHE_PATH', os.path.join(DATA_DIR, 'analysis_cache.sqlite3'))
+ANALYSIS_CACHE_TTL_DAYS = int(os.getenv('ANALYSIS_CACHE_TTL_DAYS', '30'))
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv('ANALYSIS_CACHE_MAX_ENTRIES', '5000'))
+
+# Host-wide Claude limits, shared by all gunicorn workers via DATA_DIR
+CLAUDE_RATE_LIMIT_PATH = os.getenv('CLAUDE_RATE_LIMIT_PATH', os.path.join(DATA_DIR, 'claude_rate_limit.sqlite3'))
+CLAUDE_MAX_CONCURRENT = int(os.getenv('CLAUDE_MAX_CONCURRENT', '4'))
+CLAUDE_REQUESTS_PER_MINUTE = int(os.getenv('CLAUDE_REQUESTS_PER_MINUTE', '50'))
+CLAUDE_INPUT_TOKENS_PER_MINUTE = int(os.getenv('CLAUDE_INPUT_TOKENS_PER_MINUTE', '30000'))
+CLAUDE_OUTPUT_TOKENS_PER_MINUTE = int(os.getenv('CLAUDE_OUTPUT_TOKENS_PER_MINUTE', '8000'))
+CLAUDE_RETRIES = 5  # 429s wait for the host-wide pause; 5xx/529 and connection errors back off
+CLAUDE_RETRY_DELAY = 2.0  # Seconds before the first retry after a 5xx or connection error, doubled per attempt
+
+# PDFMonkey statuses from /webhook/pdfmonkey, shared by all gunicorn workers
+PDFMONKEY_TRACKER_PATH = os.getenv('PDFMONKEY_TRACKER_PATH', os.path.join(DATA_DIR, 'pdfmonkey.sqlite3'))
+
+# Keep-alive connection pools for Pipedrive, PDFMonkey and Claude (per gunicorn worker)
+HTTP_POOL_HOSTS = int(os.getenv('HTTP_POOL_HOSTS', '10'))
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '10'))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))
+CLAUDE_READ_TIMEOUT = 600  # Streaming V8 analyses with max_tokens=8000
+
+# Logged-in Gmail connections, reused across emails (per gunicorn worker)
+SMTP_POOL_SIZE = int(os.getenv('SMTP_POOL_SIZE', '2'))
+SMTP_IDLE_TIMEOUT = int(os.getenv('SMTP_IDLE_TIMEOUT', '60'))
+SMTP_MAX_MESSAGES = int(os.getenv('SMTP_MAX_MESSAGES', '100'))
+
+# Redelivered Typeform webhooks are answered from the stored response (see v2/utils/idempotency.py)
+IDEMPOTENCY_PATH = os.getenv('IDEMPOTENCY_PATH', os.path.join(DATA_DIR, 'idempotency.sqlite3'))
+IDEMPOTENCY_TTL_HOURS = int(os.getenv('IDEMPOTENCY_TTL_HOURS', '48'))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv('IDEMPOTENCY_MAX_ENTRIES', '20000'))
+
+# Organization/person de-duplication for repeat leads (see v2/services/crm_index.py)
+CRM_INDEX_PATH = os.getenv('CRM_INDEX_PATH', os.path.join(DATA_DIR, 'crm_index.sqlite3'))
+
+claude_usage = ClaudeUsageTracker()
+claude_limiter = ClaudeRateLimiter(
+    CLAUDE_RATE_LIMIT_PATH,
+    max_concurrent=CLAUDE_MAX_CONCURRENT,
+    requests_per_minute=CLAUDE_REQUESTS_PER_MINUTE,
+    input_tokens_per_minute=CLAUDE_INPUT_TOKENS_PER_MINUTE,
+    output_tokens_per_minute=CLAUDE_OUTPUT_TOKENS_PER_MINUTE
+)
+analysis_cache = AnalysisCache(
+    ANALYSIS_CACHE_PATH,
+    ttl_seconds=ANALYSIS_CACHE_TTL_DAYS * 24 * 3600,
+    max_entries=ANALYSIS_CACHE_MAX_ENTRIES
+)
+http_client = HTTPClient(HTTP_POOL_HOSTS, HTTP_POOL_SIZE, connect_timeout=HTTP_CONNECT_TIMEOUT)
+pdfmonkey_tracker = PDFMonkeyTracker(
+    PDFMONKEY_TRACKER_PATH,
+    PDFMONKEY_API_KEY,
+    api_url=PDFMONKEY_API_URL,
+    webhook_enabled=PDFMONKEY_WEBHOOK_ENABLED,
+    timeout=PDF_ATTACHMENT_TIMEOUT,
+    http_client=http_client
+)
+smtp_pool = SMTPPool(
+    'smtp.gmail.com', 465, GMAIL_USER, GMAIL_APP_PASSWORD,
+    use_ssl=True,
+    size=SMTP_POOL_SIZE,
+    idle_timeout=SMTP_IDLE_TIMEOUT,
+    max_messages=SMTP_MAX_MESSAGES
+)
+crm_index = CRMIndex(CRM_INDEX_PATH)
+idempotency = IdempotencyStore(
+    IDEMPOTENCY_PATH,
+    ttl_seconds=IDEMPOTENCY_TTL_HOURS * 3600,
+    max_entries=IDEMPOTENCY_MAX_ENTRIES
+)
+_claude_client = None
+_claude_client_lock = threading.Lock()
+
+
+def get_claude_client():
+    """Anthropic client of this process; its connection pool is reused across analyses."""
+    global _claude_client
+    import anthropic
+    with _claude_client_lock:
+        if _claude_client is None or _claude_client[0] != os.getpid():
+            # Retries (429 via claude_limiter, 5xx and connection errors with backoff) are
+            # done in analyze_vacancy_with_claude instead of by the SDK
+            client = anthropic.Anthropic(
+                api_key=CLAUDE_API_KEY,
+                max_retries=0,
+                timeout=anthropic.Timeout(CLAUDE_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+            )
+            _claude_client = (os.getpid(), client)
+        return _claude_client[1]
+
 
-def generate_pdf_with_pdfmonkey(template_id, payload, filename="document.pdf"):
+def start_pdfmonkey_document(template_id, payload, filename="document.pdf"):
     """
-    Generate professional PDF using PDFMonkey API.
-    Returns PDF bytes on success, None on failure.
+    Create a PDFMonkey document without waiting for it.
+    Returns a future resolving to PDF bytes, or None on failure.
     """
     if not PDFMONKEY_API_KEY or not template_id:
         logger.warning("PDFMonkey not configured, falling back to ReportLab")
-        return None
-
-    headers = {
-        "Authorization": f"Bearer {PDFMONKEY_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
-    data = {
-        "document": {
-            "document_template_id": template_id,
-            "status": "pending",
-            "payload": payload,
-            "meta": {
-                "_filename": filename
-            }
-        }
-    }
-
-    try:
-        # Create document
-        response = requests.post(PDFMONKEY_API_URL, headers=headers, json=data, timeout=30)
-
-        if response.status_code == 201:
-            doc_data = response.json()
-            document_id = doc_data.get('document', {}).get('id')
+        future = Future()
+        future.set_result(None)
+        return future
 
-            if document_id:
-                # Wait for generation and download PDF
-                pdf_bytes = wait_for_pdfmonkey_document(document_id)
-                if pdf_bytes:
-                    logger.info(f"PDFMonkey: Successfully generated {filename}")
-                    return pdf_bytes
+    return pdfmonkey_tracker.generate(template_id, payload, filename)
 
-        logger.error(f"PDFMonkey creation failed: {response.status_code} - {response.text}")
-        return None
 
-    except Exception as e:
-        logger.error(f"PDFMonkey error: {e}")
-        return None
+def generate_pdf_with_pdfmonkey(template_id, payload, filename="document.pdf"):
+    """
+    Generate professional PDF using PDFMonkey API.
+    Returns PDF bytes on success, None on failure.
+    """
+    pdf_bytes = start_pdfmonkey_document(template_id, payload, filename).result()
+    if pdf_bytes:
+        logger.info(f"PDFMonkey: Successfully generated {filename}")
+    return pdf_bytes
 
 
-def wait_for_pdfmonkey_document(document_id, max_attempts=30, delay=2):
+def wait_for_pdfmonkey_document(document_id):
     """
     Wait for PDFMonkey document to be generated and download it.
+    Completion comes from /webhook/pdfmonkey or backoff polling (see pdfmonkey_tracker).
     Returns PDF bytes or None.
     """
-    import time
-
-    headers = {
-        "Authorization": f"Bearer {PDFMONKEY_API_KEY}"
-    }
-
-    for attempt in range(max_attempts):
-        try:
-            response = requests.get(
-                f"{PDFMONKEY_API_URL}/{document_id}",
-                headers=headers,
-                timeout=30
-            )
-
-            if response.status_code == 200:
-                doc = response.json().get('document', {})
-                status = doc.get('status')
-
-                if status == 'success':
-                    download_url = doc.get('download_url')
-                    if download_url:
-                        pdf_response = requests.get(download_url, timeout=60)
-                        if pdf_response.status_code == 200:
-                            return pdf_response.content
-
-                elif status == 'failure':
-                    logger.error(f"PDFMonkey generation failed: {doc.get('failure_cause')}")
-                    return None
-
-                # Still processing, wait
-                time.sleep(delay)
-
-        except Exception as e:
-            logger.error(f"PDFMonkey wait error: {e}")
-            time.sleep(delay)
-
-    logger.error("PDFMonkey timeout waiting for document")
-    return None
+    return pdfmonkey_tracker.track(document_id).result()
 
 
 def prepare_pdfmonkey_analyse_payload(company_name, contact_name, vacancy_title, analysis_result, score=None):
@@ -190,8 +253,8 @@ def prepare_pdfmonkey_analyse_payload(company_name, contact_name, vacancy_title,
     """
     from datetime import datetime
 
-    # Parse the analysis for structured data
-    sections = parse_analysis_sections(analysis_result)
+    # Structured data (parsed once per AnalysisDocument)
+    sections = AnalysisDocument.of(analysis_result).sections
 
     # Extract individual scores
     scores_list = []
@@ -282,7 +345,7 @@ def prepare_pdfmonkey_vacature_payload(company_name, vacancy_title, analysis_res
     """
     from datetime import datetime
 
-    sections = parse_analysis_sections(analysis_result)
+    sections = AnalysisDocument.of(analysis_result).sections
     overall = sections.get('overall_score', 8)
 
     # Try to extract structured vacancy data
@@ -327,14 +390,13 @@ def prepare_pdfmonkey_vacature_payload(company_name, vacancy_title, analysis_res
 
 def pipedrive_request(method, endpoint, data=None):
     """Make Pipedrive API request."""
-    url = f"{PIPEDRIVE_BASE}/{endpoint}?api_token={PIPEDRIVE_API_TOKEN}"
+    separator = "&" if "?" in endpoint else "?"
+    url = f"{PIPEDRIVE_BASE}/{endpoint}{separator}api_token={PIPEDRIVE_API_TOKEN}"
     try:
-        if method == "POST":
-            response = requests.post(url, json=data, timeout=30)
-        elif method == "PUT":
-            response = requests.put(url, json=data, timeout=30)
+        if method in ("POST", "PUT"):
+            response = http_client.request(method, url, json=data, timeout=30)
         else:
-            response = requests.get(url, timeout=30)
+            response = http_client.get(url, timeout=30)
 
         result = response.json()
         if result.get('success'):
@@ -370,29 +432,57 @@ def update_deal_custom_fields(deal_id, score=None, analysis_date=None):
     return None
 
 
+def pipedrive_search(item_type, term, field):
+    """ID of the first exact match of a Pipedrive search (organizations/persons), or None."""
+    query = urlencode({"term": term, "fields": field, "exact_match": "true", "limit": 1})
+    result = pipedrive_request("GET", f"{item_type}/search?{query}")
+    items = (result or {}).get('items') or []
+    return items[0].get('item', {}).get('id') if items else None
+
+
+def find_or_create_organization(company_name, email=""):
+    """Existing organization for this company name / email domain, else a new one. Returns (id, created)."""
+    def create():
+        org = pipedrive_request("POST", "organizations", {"name": company_name, "owner_id": OWNER_ID})
+        logger.info(f"Organization created: {org.get('id') if org else None}")
+        return org.get('id') if org else None
+
+    return crm_index.find_or_create(
+        CRMIndex.org_keys(company_name, email),
+        lambda: pipedrive_search("organizations", company_name, "name") if company_name else None,
+        create
+    )
+
+
+def find_or_create_person(contact_name, email, phone="", org_id=None):
+    """Existing person with this email address, else a new one. Returns (id, created)."""
+    def create():
+        person = pipedrive_request("POST", "persons", {
+            "name": contact_name,
+            "email": [email] if email else [],
+            "phone": [phone] if phone else [],
+            "org_id": org_id,
+            "owner_id": OWNER_ID
+        })
+        logger.info(f"Person created: {person.get('id') if person else None}")
+        return person.get('id') if person else None
+
+    return crm_index.find_or_create(
+        CRMIndex.person_keys(email),
+        lambda: pipedrive_search("persons", email, "email") if email else None,
+        create
+    )
+
+
 def create_pipedrive_deal(company_name, contact_name, email, phone="", vacancy_title="", vacancy_text=""):
     """Create organization, person, and deal in Pipedrive with enhanced data."""
     if not PIPEDRIVE_API_TOKEN:
         logger.error("PIPEDRIVE_API_TOKEN not set")
         return None
 
-    # 1. Create Organization
-    org_data = {"name": company_name, "owner_id": OWNER_ID}
-    org = pipedrive_request("POST", "organizations", org_data)
-    org_id = org.get('id') if org else None
-    logger.info(f"Organization created: {org_id}")
-
-    # 2. Create Person
-    person_data = {
-        "name": contact_name,
-        "email": [email] if email else [],
-        "phone": [phone] if phone else [],
-        "org_id": org_id,
-        "owner_id": OWNER_ID
-    }
-    person = pipedrive_request("POST", "persons", person_data)
-    person_id = person.get('id') if person else None
-    logger.info(f"Person created: {person_id}")
+    # 1. Organization, 2. Person (existing ones for repeat leads)
+    org_id, org_created = find_or_create_organization(company_name, email)
+    person_id, person_created = find_or_create_person(contact_name, email, phone, org_id)
 
     # 3. Create Deal
     deal_title = f"Vacature Analyse - {company_name}"
@@ -409,6 +499,16 @@ def create_pipedrive_deal(company_name, contact_name, email, phone="", vacancy_t
         "status": "open"
     }
     deal = pipedrive_request("POST", "deals", deal_data)
+    if not deal and ((org_id and not org_created) or (person_id and not person_created)):
+        # A reused record may have been deleted or merged in Pipedrive
+        logger.warning(f"Deal creation failed with reused org {org_id} / person {person_id} - recreating them")
+        if org_id and not org_created:
+            crm_index.forget((ORG_NAME, DOMAIN), org_id)
+            org_id, _ = find_or_create_organization(company_name, email)
+        if person_id and not person_created:
+            crm_index.forget((EMAIL,), person_id)
+            person_id, _ = find_or_create_person(contact_name, email, phone, org_id)
+        deal = pipedrive_request("POST", "deals", {**deal_data, "org_id": org_id, "person_id": person_id})
     deal_id = deal.get('id') if deal else None
     logger.info(f"Deal created: {deal_id}")
 
@@ -429,7 +529,7 @@ Ingediend: {datetime.now().strftime('%d-%m-%Y %H:%M')}
     return deal_id
 
 
-def add_analysis_to_pipedrive(deal_id, analysis_result, score=None):
+def add_analysis_to_pipedrive(deal_id, analysis_result, score=None, update_fields=True):
     """Add the Claude analysis result as a note and update custom fields."""
     if not deal_id:
         return
@@ -445,125 +545,393 @@ Score: {score}/100 punten
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━"""
     add_pipedrive_note(deal_id, note_content, pinned=True)
 
-    # Update custom fields
-    update_deal_custom_fields(deal_id, score=score, analysis_date=datetime.now().strftime('%Y-%m-%d'))
+    # Update custom fields (skipped when already set from the streamed score)
+    if update_fields:
+        update_deal_custom_fields(deal_id, score=score, analysis_date=datetime.now().strftime('%Y-%m-%d'))
     logger.info(f"Analysis added to deal {deal_id}")
 
 
-def parse_analysis_sections(analysis_result):
+# V8 analysis section parser. Each section is located with a few bounded
+# str.find calls and only its own region is split into lines, instead of
+# re-splitting the full analysis per section and per score name. A per-line
+# Python state machine or one regex alternation scan costs more than these
+# C-level finds (see v2/benchmarks/analysis_parser.py).
+SCORE_NAMES = (
+    ('Openingszin', 'openingszin'),
+    ('Bedrijf Aantrekkingskracht', 'bedrijf'),
+    ('Rolklarheid', 'rolklarheid'),
+    ('Vereisten Realisme', 'vereisten'),
+    ('Groei-narratief', 'groei'),
+    ('Inclusie', 'inclusie'),
+    ('Cialdini', 'cialdini'),
+    ('Salarisbenchmark', 'salaris'),
+    ('CTA', 'cta'),
+    ('Competitieve Delta', 'competitief'),
+    ('Confidence', 'confidence'),
+    ('Implementatie', 'implementatie')
+)
+
+SCORE_KEYS = dict(SCORE_NAMES)
+SCORE_NAME_RE = re.compile('|'.join(re.escape(name) for name, _ in SCORE_NAMES))
+SEPARATOR = '━━━'
+IMPROVED_TEXT_END_MARKERS = ('BONUS', 'CIALDINI', 'POWER-UP')
+LIST_ITEM_PREFIXES = ('-', '•')
+LIST_ITEM_STRIP = '0123456789.-•) '
+
+
+class AnalysisSections(TypedDict):
+    """Structured sections of a V8 analysis (see parse_analysis_sections)."""
+    executive_summary: str
+    scores: Dict[str, int]
+    quick_wins: List[str]
+    improved_text: str
+    cialdini_tips: List[str]
+
+
+def _segment_end(text, marker, start, limit=None):
+    """
+    End of the section starting at start: the next occurrence of marker
+    (as in text.split(marker)[1]), or limit / the end of text if sooner.
+    """
+    limit = len(text) if limit is None else min(limit, len(text))
+    end = text.find(marker, start, limit + len(marker) - 1)
+    return end if end != -1 else limit
+
+
+def _find_in_segment(text, sub, start, marker):
+    """
+    text.find(sub, start, _segment_end(text, marker, start)) without scanning
+    for the segment end beyond the match.
+    """
+    pos = text.find(sub, start)
+    if pos == -1 or text.find(marker, start, pos + len(sub) + len(marker) - 1) != -1:
+        return -1
+    return pos
+
+
+def _find_first(text, markers, start, end):
+    """Position of the earliest of several markers in text[start:end], or -1."""
+    first = -1
+    for marker in markers:
+        pos = text.find(marker, start, end)
+        if pos != -1:
+            first = pos
+            end = pos  # The markers never overlap, so an earlier one ends before pos
+    return first
+
+
+def _iter_lines(text, start, end):
+    """Lines of text[start:end], split on '\\n' lazily (list items stop after 3)."""
+    while start <= end:
+        newline = text.find('\n', start, end)
+        if newline == -1:
+            yield text[start:end]
+            return
+        yield text[start:newline]
+        start = newline + 1
+
+
+def _list_items(lines, min_length, allow_quotes=False):
+    """Up to 3 numbered / bulleted items longer than min_length."""
+    items = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line[0].isdigit() or line.startswith(LIST_ITEM_PREFIXES) or (allow_quotes and line[0] == '"'):
+            clean_line = line.lstrip(LIST_ITEM_STRIP).strip()
+            if allow_quotes:
+                clean_line = clean_line.strip('"')
+            if clean_line and len(clean_line) > min_length:
+                items.append(clean_line)
+                if len(items) >= 3:
+                    break
+    return items
+
+
+def _parse_scores(text):
+    """First line per score name that contains '/10' -> score (1-2 digits before '/10')."""
+    scores = {}
+    seen = set()
+    pos = text.find('/10')
+
+    while pos != -1 and len(seen) < len(SCORE_NAMES):
+        line_start = text.rfind('\n', 0, pos) + 1
+        line_end = text.find('\n', pos)
+        if line_end == -1:
+            line_end = len(text)
+
+        names = [name for name in SCORE_NAME_RE.findall(text, line_start, line_end) if name not in seen]
+        if names:
+            digits = ''.join(filter(str.isdigit, text[max(line_start, pos - 3):pos]))
+            for name in names:
+                seen.add(name)
+                if digits:
+                    scores[SCORE_KEYS[name]] = int(digits)
+
+        pos = text.find('/10', line_end)
+
+    return scores
+
+
+def _parse_improved_text(text, start, end):
+    """
+    Content lines of the improved vacancy text in text[start:end].
+
+    Leading blank and separator lines are skipped. The section ends at the
+    first later line with a separator or a following section header; blank
+    lines inside the text are dropped.
+    """
+    line_start = start
+    while line_start <= end:
+        line_end = text.find('\n', line_start, end)
+        if line_end == -1:
+            line_end = end
+        line = text[line_start:line_end]
+
+        if SEPARATOR in line or line.strip() == '':
+            line_start = line_end + 1
+            continue
+        if any(marker in line for marker in IMPROVED_TEXT_END_MARKERS):
+            return ''
+        break
+    else:
+        return ''
+
+    # First content line found at line_start; stop at the first line with a separator or header
+    stop = _find_first(text, (SEPARATOR,) + IMPROVED_TEXT_END_MARKERS, line_start, end)
+    if stop != -1:
+        end = text.rfind('\n', line_start, stop)
+        if end == -1:
+            end = line_start
+
+    lines = text[line_start:end].split('\n')
+    return '\n'.join(line for line in lines if line.strip()).strip()
+
+
+def parse_analysis_sections(analysis_result) -> AnalysisSections:
     """Parse the V8 Enhanced analysis into structured sections."""
-    sections = {
-        'executive_summary': '',
-        'scores': {},
-        'quick_wins': [],
-        'improved_text': '',
-        'cialdini_tips': []
-    }
+    sections = AnalysisSections(
+        executive_summary='',
+        scores={},
+        quick_wins=[],
+        improved_text='',
+        cialdini_tips=[]
+    )
 
     if not analysis_result:
         return sections
 
-    # Extract Executive Summary
-    if 'EXECUTIVE SUMMARY' in analysis_result:
-        try:
-            summary_part = analysis_result.split('EXECUTIVE SUMMARY')[1]
-            summary_end = summary_part.find('━━━')
+    text = analysis_result
+
+    # Executive Summary: up to the first separator, else the scores header
+    marker = 'EXECUTIVE SUMMARY'
+    first = text.find(marker)
+    if first != -1:
+        start = first + len(marker)
+        summary_end = _find_in_segment(text, SEPARATOR, start, marker)
+        if summary_end == -1:
+            end = _segment_end(text, marker, start)
+            summary_end = text.find('SCORES PER CRITERIUM', start, end)
             if summary_end == -1:
-                summary_end = summary_part.find('SCORES PER CRITERIUM')
-            sections['executive_summary'] = summary_part[:summary_end].strip().strip('━').strip()
-        except:
-            pass
+                summary_end = max(start, end - 1)
+        sections['executive_summary'] = text[start:summary_end].strip().strip('━').strip()
+
+    sections['scores'] = _parse_scores(text)
+
+    # Quick Wins: up to the first separator, else the improved text header
+    marker = 'QUICK WINS'
+    first = text.find(marker)
+    if first != -1:
+        start = first + len(marker)
+        qw_end = _find_in_segment(text, SEPARATOR, start, marker)
+        if qw_end == -1:
+            qw_end = _find_in_segment(text, 'VERBETERDE', start, marker)
+        qw_stop = qw_end if qw_end > start else _segment_end(text, marker, start, start + 500)
+        sections['quick_wins'] = _list_items(text[start:qw_stop].split('\n'), 10)
+
+    marker = 'VERBETERDE VACATURETEKST'
+    first = text.find(marker)
+    if first != -1:
+        start = first + len(marker)
+        sections['improved_text'] = _parse_improved_text(text, start, _segment_end(text, marker, start))
+
+    # Cialdini Tips: items after the POWER-UP header
+    first = text.find('CIALDINI')
+    if first != -1 and 'POWER-UP' in text:
+        start = first + len('CIALDINI')
+        end = _segment_end(text, 'CIALDINI', start)
+        power_up = text.find('POWER-UP', start, end)
+        if power_up != -1:
+            start = power_up + len('POWER-UP')
+            end = _segment_end(text, 'POWER-UP', start, end)
+        sections['cialdini_tips'] = _list_items(_iter_lines(text, start, end), 15, allow_quotes=True)
 
-    # Extract individual scores
-    score_names = [
-        ('Openingszin', 'openingszin'),
-        ('Bedrijf Aantrekkingskracht', 'bedrijf'),
-        ('Rolklarheid', 'rolklarheid'),
-        ('Vereisten Realisme', 'vereisten'),
-        ('Groei-narratief', 'groei'),
-        ('Inclusie', 'inclusie'),
-        ('Cialdini', 'cialdini'),
-        ('Salarisbenchmark', 'salaris'),
-        ('CTA', 'cta'),
-        ('Competitieve Delta', 'competitief'),
-        ('Confidence', 'confidence'),
-        ('Implementatie', 'implementatie')
-    ]
+    return sections
 
-    for search_term, key in score_names:
-        try:
-            for line in analysis_result.split('\n'):
-                if search_term in line and '/10' in line:
-                    score_part = line.split('/10')[0]
-                    digits = ''.join(filter(str.isdigit, score_part[-3:]))
-                    if digits:
-                        sections['scores'][key] = int(digits)
-                    break
-        except:
-            continue
 
-    # Extract Quick Wins
-    if 'QUICK WINS' in analysis_result:
-        try:
-            qw_part = analysis_result.split('QUICK WINS')[1]
-            qw_end = qw_part.find('━━━')
-            if qw_end == -1:
-                qw_end = qw_part.find('VERBETERDE')
-            qw_text = qw_part[:qw_end] if qw_end > 0 else qw_part[:500]
-            for line in qw_text.split('\n'):
-                line = line.strip()
-                if line and (line[0].isdigit() or line.startswith('-') or line.startswith('•')):
-                    clean_line = line.lstrip('0123456789.-•) ').strip()
-                    if clean_line and len(clean_line) > 10:
-                        sections['quick_wins'].append(clean_line)
-                        if len(sections['quick_wins']) >= 3:
-                            break
-        except:
-            pass
-
-    # Extract Improved Text
-    if 'VERBETERDE VACATURETEKST' in analysis_result:
-        try:
-            imp_part = analysis_result.split('VERBETERDE VACATURETEKST')[1]
-            # Skip the first separator line (━━━) after header
-            lines = imp_part.split('\n')
-            content_lines = []
-            found_content = False
-            for line in lines:
-                # Skip separator lines
-                if '━━━' in line or line.strip() == '':
-                    if found_content:
-                        # If we already found content and hit a separator, we're done
-                        if '━━━' in line:
-                            break
-                    continue
-                # Skip if this is a new section header
-                if 'BONUS' in line or 'CIALDINI' in line or 'POWER-UP' in line:
-                    break
-                found_content = True
-                content_lines.append(line)
-            sections['improved_text'] = '\n'.join(content_lines).strip()
-        except Exception as e:
-            logger.warning(f"Failed to extract improved text: {e}")
+def parse_overall_score(analysis_result):
+    """The number on the first 'SCORE:' line (XX/45), or None when missing or unparsable."""
+    if "SCORE:" not in analysis_result:
+        return None
+    score_line = analysis_result.split("SCORE:", 1)[1].split("\n", 1)[0]
+    digits = ''.join(filter(str.isdigit, score_line.split("/")[0]))
+    return int(digits) if digits else None
 
-    # Extract Cialdini Tips
-    if 'CIALDINI' in analysis_result and 'POWER-UP' in analysis_result:
-        try:
-            ci_part = analysis_result.split('CIALDINI')[1]
-            if 'POWER-UP' in ci_part:
-                ci_part = ci_part.split('POWER-UP')[1]
-            for line in ci_part.split('\n'):
-                line = line.strip()
-                if line and (line[0].isdigit() or line.startswith('-') or line.startswith('•') or line.startswith('"')):
-                    clean_line = line.lstrip('0123456789.-•) ').strip().strip('"')
-                    if clean_line and len(clean_line) > 15:
-                        sections['cialdini_tips'].append(clean_line)
-                        if len(sections['cialdini_tips']) >= 3:
-                            break
-        except:
-            pass
 
-    return sections
+def extract_overall_score(analysis_result):
+    """Extract the overall V8 score (XX/45) from the 'SCORE:' line."""
+    if "SCORE:" not in analysis_result:
+        return None
+    score = parse_overall_score(analysis_result)
+    return 25 if score is None else score  # Default if parsing fails (V8: 45-point scale)
+
+
+# Section headings of the V8 output (V8_SYSTEM_PROMPT, "OUTPUT STRUCTUUR"), in order
+ANALYSIS_DEEL_SECTIONS = (
+    ('DEEL 1: SAMENVATTING', 'samenvatting'),
+    ('DEEL 2: SCOREKAART', 'scorekaart'),
+    ('DEEL 3: TOP 3 CONVERSIE-KILLERS', 'conversie_killers'),
+    ('DEEL 4: VOOR EN NA', 'voor_en_na'),
+    ('DEEL 5: VERWACHTE RESULTATEN', 'verwachte_resultaten'),
+    ('DEEL 6: IMPLEMENTATIEPLAN', 'implementatieplan'),
+    ('DEEL 7: EXPERT INSIGHTS', 'expert_insights'),
+)
+ANALYSIS_DEEL_HEADINGS = tuple(heading for heading, _ in ANALYSIS_DEEL_SECTIONS)
+
+
+def is_complete_analysis(analysis_result):
+    """
+    True when the score line parses and all DEEL 1-7 headings follow in order,
+    so a truncated (max_tokens) or off-format completion is never cached.
+    """
+    if not analysis_result or parse_overall_score(analysis_result) is None:
+        return False
+    pos = 0
+    for heading in ANALYSIS_DEEL_HEADINGS:
+        pos = analysis_result.find(heading, pos)
+        if pos == -1:
+            return False
+    return True
+
+
+class AnalysisDocument:
+    """
+    A Claude analysis that is parsed at most once.
+
+    The email and both PDF renderers accept either the raw analysis text or
+    an AnalysisDocument. send_analysis_email builds one document per job, so
+    the sections are parsed once and every renderer reads the same views.
+    The views are shared - renderers must treat them as read-only.
+    """
+
+    def __init__(self, text, sections=None):
+        self.text = text or ""
+        self._sections = sections
+
+    @classmethod
+    def of(cls, analysis_result):
+        """Wrap raw analysis text; an existing document is returned as-is."""
+        if isinstance(analysis_result, cls):
+            return analysis_result
+        return cls(analysis_result)
+
+    @property
+    def sections(self) -> AnalysisSections:
+        if self._sections is None:
+            self._sections = parse_analysis_sections(self.text)
+        return self._sections
+
+    @property
+    def executive_summary(self) -> str:
+        return self.sections['executive_summary']
+
+    @property
+    def scores(self) -> Dict[str, int]:
+        return self.sections['scores']
+
+    @property
+    def quick_wins(self) -> List[str]:
+        return self.sections['quick_wins']
+
+    @property
+    def improved_text(self) -> str:
+        return self.sections['improved_text']
+
+    @property
+    def cialdini_tips(self) -> List[str]:
+        return self.sections['cialdini_tips']
+
+    def __str__(self):
+        return self.text
+
+
+class StreamingSectionParser:
+    """
+    Incrementally parse a streamed V8 analysis.
+
+    Feed text deltas as they arrive. The overall score is emitted as 'score'
+    as soon as its line is complete (and parses to a number). Each DEEL
+    section (ANALYSIS_DEEL_SECTIONS) is emitted with its text as soon as the
+    next DEEL heading closes it; the last one when the stream finishes. This
+    lets downstream stages start before the completion ends.
+    """
+
+    def __init__(self, on_section=None):
+        self.on_section = on_section
+        self.text = ""
+        self._line_start = 0
+        self._open = None        # (name, body start) of the DEEL section being streamed
+        self._emitted = set()
+
+    def feed(self, chunk):
+        """Add a text delta; process every line it completes."""
+        self.text += chunk
+        while True:
+            newline = self.text.find('\n', self._line_start)
+            if newline == -1:
+                break
+            self._process_line(self.text[self._line_start:newline])
+            self._line_start = newline + 1
+
+    def _process_line(self, line):
+        if 'score' not in self._emitted and 'SCORE:' in line:
+            # Only a real number; a malformed score line leaves the score to the final result
+            score = parse_overall_score(line)
+            if score is None:
+                self._emitted.add('score')
+            else:
+                self._emit('score', score)
+
+        if 'DEEL ' not in line:
+            return
+        name = next((name for heading, name in ANALYSIS_DEEL_SECTIONS if heading in line), None)
+        if name:
+            self._close_open_section(self._line_start)
+            if name not in self._emitted:
+                self._open = (name, self._line_start + len(line) + 1)
+
+    def _close_open_section(self, end):
+        if self._open:
+            name, start = self._open
+            self._open = None
+            self._emit(name, self.text[start:end].strip())
+
+    def _emit(self, name, value):
+        self._emitted.add(name)
+        if self.on_section and value:
+            try:
+                self.on_section(name, value)
+            except Exception as e:
+                logger.error(f"Stream section callback failed for {name}: {e}")
+
+    def finish(self):
+        """Flush the final line, close the last section and return the full parse."""
+        if self._line_start < len(self.text):
+            self._process_line(self.text[self._line_start:])
+            self._line_start = len(self.text)
+        self._close_open_section(len(self.text))
+        return parse_analysis_sections(self.text)
 
 
 # ═══════════════════════════════════════════════════════════════════════════
@@ -630,6 +998,18 @@ def create_horizontal_bar(score, width=120, height=8):
     return d
 
 
+def start_pdfmonkey_analysis_report(contact_name, company_name, vacancy_title, analysis_result, score=None):
+    """Start Bijlage 1 on PDFMonkey. Returns a future resolving to PDF bytes, or None to fall back to ReportLab."""
+    logger.info(f"Generating Bijlage 1 with PDFMonkey for {company_name}")
+    payload = prepare_pdfmonkey_analyse_payload(
+        company_name, contact_name, vacancy_title, analysis_result, score
+    )
+    safe_company = "".join(c for c in company_name if c.isalnum() or c in (' ', '-', '_')).strip()
+    filename = f"Bijlage1_Analyse_{safe_company[:20]}.pdf"
+
+    return start_pdfmonkey_document(PDFMONKEY_TEMPLATE_ANALYSE, payload, filename)
+
+
 def generate_pdf_analysis_report(contact_name, company_name, vacancy_title, analysis_result, score=None, original_vacancy_text=""):
     """
     BIJLAGE 1: Professioneel Analyse Rapport (2 pagina's)
@@ -639,39 +1019,28 @@ def generate_pdf_analysis_report(contact_name, company_name, vacancy_title, anal
 
     Uses PDFMonkey for professional output, falls back to ReportLab.
     """
-    # ═══════════════════════════════════════════════════════════════
-    # TRY PDFMONKEY FIRST FOR PROFESSIONAL OUTPUT
-    # ═══════════════════════════════════════════════════════════════
     if USE_PDFMONKEY and PDFMONKEY_TEMPLATE_ANALYSE:
         try:
-            logger.info(f"Generating Bijlage 1 with PDFMonkey for {company_name}")
-            payload = prepare_pdfmonkey_analyse_payload(
-                company_name, contact_name, vacancy_title, analysis_result, score
-            )
-            safe_company = "".join(c for c in company_name if c.isalnum() or c in (' ', '-', '_')).strip()
-            filename = f"Bijlage1_Analyse_{safe_company[:20]}.pdf"
-
-            pdf_bytes = generate_pdf_with_pdfmonkey(
-                PDFMONKEY_TEMPLATE_ANALYSE,
-                payload,
-                filename
-            )
-
+            pdf_bytes = start_pdfmonkey_analysis_report(
+                contact_name, company_name, vacancy_title, analysis_result, score
+            ).result()
             if pdf_bytes:
                 logger.info(f"PDFMonkey Bijlage 1 success: {len(pdf_bytes)} bytes")
                 return pdf_bytes
-            else:
-                logger.warning("PDFMonkey returned None, falling back to ReportLab")
-
+            logger.warning("PDFMonkey returned None, falling back to ReportLab")
         except Exception as e:
             logger.error(f"PDFMonkey Bijlage 1 failed: {e}, falling back to ReportLab")
 
-    # ═══════════════════════════════════════════════════════════════
-    # FALLBACK TO REPORTLAB
-    # ═══════════════════════════════════════════════════════════════
+    return render_analysis_report_reportlab(
+        contact_name, company_name, vacancy_title, analysis_result, score, original_vacancy_text
+    )
+
+
+def render_analysis_report_reportlab(contact_name, company_name, vacancy_title, analysis_result, score=None, original_vacancy_text=""):
+    """Bijlage 1 rendered locally with ReportLab (CPU-bound, runs on the render process pool)."""
     from reportlab.platypus import PageBreak
 
-    sections = parse_analysis_sections(analysis_result)
+    sections = AnalysisDocument.of(analysis_result).sections
     buffer = io.BytesIO()
 
     # A4 document met professionele margins
@@ -1087,6 +1456,18 @@ def generate_pdf_analysis_report(contact_name, company_name, vacancy_title, anal
 # BIJLAGE 2: GEOPTIMALISEERDE VACATURETEKST
 # ════════════════════════════════════════════════════════════════════════════
 
+def start_pdfmonkey_vacancy_text(company_name, vacancy_title, analysis_result):
+    """Start Bijlage 2 on PDFMonkey. Returns a future resolving to PDF bytes, or None to fall back to ReportLab."""
+    logger.info(f"Generating Bijlage 2 with PDFMonkey for {company_name}")
+    payload = prepare_pdfmonkey_vacature_payload(
+        company_name, vacancy_title, analysis_result
+    )
+    safe_company = "".join(c for c in company_name if c.isalnum() or c in (' ', '-', '_')).strip()
+    filename = f"Bijlage2_Vacaturetekst_{safe_company[:20]}.pdf"
+
+    return start_pdfmonkey_document(PDFMONKEY_TEMPLATE_VACATURE, payload, filename)
+
+
 def generate_pdf_vacancy_text(company_name, vacancy_title, analysis_result):
     """
     BIJLAGE 2: Professionele Geoptimaliseerde Vacaturetekst
@@ -1096,37 +1477,22 @@ def generate_pdf_vacancy_text(company_name, vacancy_title, analysis_result):
 
     Uses PDFMonkey for professional output, falls back to ReportLab.
     """
-    # ═══════════════════════════════════════════════════════════════
-    # TRY PDFMONKEY FIRST FOR PROFESSIONAL OUTPUT
-    # ═══════════════════════════════════════════════════════════════
     if USE_PDFMONKEY and PDFMONKEY_TEMPLATE_VACATURE:
         try:
-            logger.info(f"Generating Bijlage 2 with PDFMonkey for {company_name}")
-            payload = prepare_pdfmonkey_vacature_payload(
-                company_name, vacancy_title, analysis_result
-            )
-            safe_company = "".join(c for c in company_name if c.isalnum() or c in (' ', '-', '_')).strip()
-            filename = f"Bijlage2_Vacaturetekst_{safe_company[:20]}.pdf"
-
-            pdf_bytes = generate_pdf_with_pdfmonkey(
-                PDFMONKEY_TEMPLATE_VACATURE,
-                payload,
-                filename
-            )
-
+            pdf_bytes = start_pdfmonkey_vacancy_text(company_name, vacancy_title, analysis_result).result()
             if pdf_bytes:
                 logger.info(f"PDFMonkey Bijlage 2 success: {len(pdf_bytes)} bytes")
                 return pdf_bytes
-            else:
-                logger.warning("PDFMonkey Bijlage 2 returned None, falling back to ReportLab")
-
+            logger.warning("PDFMonkey Bijlage 2 returned None, falling back to ReportLab")
         except Exception as e:
             logger.error(f"PDFMonkey Bijlage 2 failed: {e}, falling back to ReportLab")
 
-    # ═══════════════════════════════════════════════════════════════
-    # FALLBACK TO REPORTLAB
-    # ═══════════════════════════════════════════════════════════════
-    sections = parse_analysis_sections(analysis_result)
+    return render_vacancy_text_reportlab(company_name, vacancy_title, analysis_result)
+
+
+def render_vacancy_text_reportlab(company_name, vacancy_title, analysis_result):
+    """Bijlage 2 rendered locally with ReportLab; None when there is no improved text."""
+    sections = AnalysisDocument.of(analysis_result).sections
 
     if not sections['improved_text']:
         return None
@@ -1359,6 +1725,86 @@ def generate_pdf_report(contact_name, company_name, vacancy_title, analysis_resu
     return generate_pdf_analysis_report(contact_name, company_name, vacancy_title, analysis_result, score, "")
 
 
+# ReportLab holds the GIL, so it renders on warm, spawned worker processes
+# that import this module (see v2/utils/render_pool.py)
+pdf_render_pool = RenderPool(PDF_RENDER_WORKERS, preload=(__name__,))
+
+
+def render_analysis_attachments(contact_name, company_name, vacancy_title, analysis_result, score=None, original_vacancy_text=""):
+    """
+    Render Bijlage 1 and Bijlage 2 concurrently.
+
+    PDFMonkey documents are created up front and completed by
+    pdfmonkey_tracker (webhook or backoff polling), so no thread waits on
+    them; ReportLab renders on the process pool. Each attachment has its own
+    deadline, and a PDFMonkey failure or timeout falls back to ReportLab for
+    that attachment only.
+
+    Returns {'analysis': bytes or None, 'vacancy': bytes or None}.
+    """
+    analysis = AnalysisDocument.of(analysis_result)
+    analysis.sections  # Parse once here, not in every worker
+
+    reportlab = {
+        'analysis': (render_analysis_report_reportlab,
+                     (contact_name, company_name, vacancy_title, analysis, score, original_vacancy_text)),
+        'vacancy': (render_vacancy_text_reportlab, (company_name, vacancy_title, analysis)),
+    }
+    pdfmonkey = {}
+    if USE_PDFMONKEY and PDFMONKEY_TEMPLATE_ANALYSE:
+        pdfmonkey['analysis'] = (start_pdfmonkey_analysis_report,
+                                 (contact_name, company_name, vacancy_title, analysis, score))
+    if USE_PDFMONKEY and PDFMONKEY_TEMPLATE_VACATURE:
+        pdfmonkey['vacancy'] = (start_pdfmonkey_vacancy_text, (company_name, vacancy_title, analysis))
+
+    results = dict.fromkeys(reportlab)
+    pending = {}  # future -> (attachment, via_pdfmonkey, deadline)
+
+    def start(name, via_pdfmonkey):
+        try:
+            if via_pdfmonkey:
+                func, args = pdfmonkey[name]
+                future = func(*args)
+                deadline = time.monotonic() + PDF_ATTACHMENT_TIMEOUT
+            else:
+                func, args = reportlab[name]
+                future = pdf_render_pool.submit(func, *args)
+                deadline = time.monotonic() + PDF_RENDER_TIMEOUT
+        except Exception as e:
+            logger.error(f"Could not start {name} PDF: {e}")
+            if via_pdfmonkey:
+                start(name, False)
+            return
+        pending[future] = (name, via_pdfmonkey, deadline)
+
+    for name in reportlab:
+        start(name, name in pdfmonkey)
+
+    while pending:
+        timeout = max(0.0, min(deadline for _, _, deadline in pending.values()) - time.monotonic())
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+        for future in done:
+            name, via_pdfmonkey, _ = pending.pop(future)
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                logger.error(f"{name} PDF render failed: {e}")
+            if not results[name] and via_pdfmonkey:
+                start(name, False)
+
+        now = time.monotonic()
+        for future, (name, via_pdfmonkey, deadline) in list(pending.items()):
+            if deadline <= now:
+                del pending[future]
+                future.cancel()
+                logger.error(f"{name} PDF timed out ({'PDFMonkey' if via_pdfmonkey else 'ReportLab'})")
+                if via_pdfmonkey:
+                    start(name, False)
+
+    return results
+
+
 def generate_score_bar_html(label, score, emoji="📊"):
     """Generate HTML for a visual score bar."""
     if score is None:
@@ -1393,8 +1839,8 @@ def generate_score_bar_html(label, score, emoji="📊"):
 def generate_email_html(contact_name, company_name, vacancy_title, analysis_result, score=None):
     """Generate SHORT & PUNCHY HTML email with score teaser - details in PDF attachments."""
 
-    # Parse the analysis into sections
-    sections = parse_analysis_sections(analysis_result)
+    # Parsed sections (shared with the PDF renderers via AnalysisDocument)
+    sections = AnalysisDocument.of(analysis_result).sections
 
     # Score color based on value
     if score:
@@ -1607,9 +2053,7 @@ def send_confirmation_email(to_email, company_name, contact_name):
 
         msg.attach(MIMEText(html, 'html'))
 
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-            server.login(GMAIL_USER, GMAIL_APP_PASSWORD)
-            server.send_message(msg)
+        smtp_pool.send(msg)
 
         logger.info(f"Confirmation email sent to {to_email}")
         return True
@@ -1623,11 +2067,15 @@ def send_analysis_email(to_email, contact_name, company_name, vacancy_title, ana
     """Send the analysis report email with TWO PDF attachments:
     - Bijlage 1: Analyse Rapport (12 criteria + voor/na vergelijking)
     - Bijlage 2: Geoptimaliseerde Vacaturetekst (copy-paste ready)
+
+    The analysis is parsed once; the HTML body and both PDFs share the result.
     """
     if not GMAIL_APP_PASSWORD:
         logger.error("GMAIL_APP_PASSWORD not set")
         return False
 
+    analysis = AnalysisDocument.of(analysis_result)
+
     try:
         # Use 'mixed' for attachments instead of 'alternative'
         msg = MIMEMultipart('mixed')
@@ -1639,7 +2087,7 @@ def send_analysis_email(to_email, contact_name, company_name, vacancy_title, ana
         msg_alternative = MIMEMultipart('alternative')
 
         # Generate HTML email (short & punchy - details in PDFs)
-        html = generate_email_html(contact_name, company_name, vacancy_title, analysis_result, score)
+        html = generate_email_html(contact_name, company_name, vacancy_title, analysis, score)
         msg_alternative.attach(MIMEText(html, 'html'))
         msg.attach(msg_alternative)
 
@@ -1648,56 +2096,36 @@ def send_analysis_email(to_email, contact_name, company_name, vacancy_title, ana
         safe_company = safe_company.replace(' ', '_')[:30]
         date_str = datetime.now().strftime('%Y%m%d')
 
-        # ═══════════════════════════════════════════════════════════════
-        # BIJLAGE 1: Analyse Rapport (2 pagina's, 12 criteria + voor/na)
-        # ═══════════════════════════════════════════════════════════════
-        try:
-            pdf_analysis = generate_pdf_analysis_report(
-                contact_name, company_name, vacancy_title,
-                analysis_result, score, original_vacancy_text
-            )
-
-            pdf_filename_1 = f"Bijlage1_Analyse_Rapport_{safe_company}_{date_str}.pdf"
-
-            pdf_attachment_1 = MIMEBase('application', 'pdf')
-            pdf_attachment_1.set_payload(pdf_analysis)
-            encoders.encode_base64(pdf_attachment_1)
-            pdf_attachment_1.add_header(
-                'Content-Disposition',
-                f'attachment; filename="{pdf_filename_1}"'
-            )
-            msg.attach(pdf_attachment_1)
-            logger.info(f"PDF Bijlage 1 (Analyse Rapport) added: {pdf_filename_1}")
-
-        except Exception as pdf_error:
-            logger.error(f"PDF Bijlage 1 generation failed: {pdf_error}")
-
-        # ═══════════════════════════════════════════════════════════════
-        # BIJLAGE 2: Geoptimaliseerde Vacaturetekst (copy-paste ready)
-        # ═══════════════════════════════════════════════════════════════
-        try:
-            pdf_vacancy = generate_pdf_vacancy_text(company_name, vacancy_title, analysis_result)
-
-            pdf_filename_2 = f"Bijlage2_Vacaturetekst_{safe_company}_{date_str}.pdf"
+        # Both PDFs are rendered concurrently (see render_analysis_attachments)
+        pdfs = render_analysis_attachments(
+            contact_name, company_name, vacancy_title,
+            analysis, score, original_vacancy_text
+        )
 
-            pdf_attachment_2 = MIMEBase('application', 'pdf')
-            pdf_attachment_2.set_payload(pdf_vacancy)
-            encoders.encode_base64(pdf_attachment_2)
-            pdf_attachment_2.add_header(
+        attachments = [
+            # BIJLAGE 1: Analyse Rapport (2 pagina's, 12 criteria + voor/na)
+            ('analysis', f"Bijlage1_Analyse_Rapport_{safe_company}_{date_str}.pdf", "PDF Bijlage 1 (Analyse Rapport)"),
+            # BIJLAGE 2: Geoptimaliseerde Vacaturetekst (copy-paste ready)
+            ('vacancy', f"Bijlage2_Vacaturetekst_{safe_company}_{date_str}.pdf", "PDF Bijlage 2 (Vacaturetekst)"),
+        ]
+        for key, pdf_filename, label in attachments:
+            if not pdfs.get(key):
+                logger.error(f"{label} generation failed - sent without it")
+                continue
+
+            pdf_attachment = MIMEBase('application', 'pdf')
+            pdf_attachment.set_payload(pdfs[key])
+            encoders.encode_base64(pdf_attachment)
+            pdf_attachment.add_header(
                 'Content-Disposition',
-                f'attachment; filename="{pdf_filename_2}"'
+                f'attachment; filename="{pdf_filename}"'
             )
-            msg.attach(pdf_attachment_2)
-            logger.info(f"PDF Bijlage 2 (Vacaturetekst) added: {pdf_filename_2}")
+            msg.attach(pdf_attachment)
+            logger.info(f"{label} added: {pdf_filename}")
 
-        except Exception as pdf_error:
-            logger.error(f"PDF Bijlage 2 generation failed: {pdf_error}")
+        smtp_pool.send(msg)
 
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-            server.login(GMAIL_USER, GMAIL_APP_PASSWORD)
-            server.send_message(msg)
-
-        logger.info(f"Analysis email with 2 PDFs sent to {to_email}")
+        logger.info(f"Analysis email with {sum(1 for pdf in pdfs.values() if pdf)} PDFs sent to {to_email}")
         return True
 
     except Exception as e:
@@ -1705,18 +2133,10 @@ def send_analysis_email(to_email, contact_name, company_name, vacancy_title, ana
         return False
 
 
-def analyze_vacancy_with_claude(vacancy_text, company_name, vacancy_title=""):
-    """Analyze vacancy using Claude API with V8 Enhanced - 5-expert panel + Human Voice."""
-    if not CLAUDE_API_KEY:
-        logger.warning("CLAUDE_API_KEY not set, using placeholder")
-        return None, None
-
-    try:
-        import anthropic
-        client = anthropic.Anthropic(api_key=CLAUDE_API_KEY)
-
-        # V8 ENHANCED PROMPT - 5-Expert Panel + Human Voice
-        prompt = f"""# VACATURE ANALYSE V8 ENHANCED - SOLLICITANTEN MAGNEET + HUMAN VOICE
+# V8 ENHANCED PROMPT - 5-Expert Panel + Human Voice
+# Static instructions, sent as a cacheable system prompt prefix. Only the
+# vacancy tail (see analyze_vacancy_with_claude) changes per request.
+V8_SYSTEM_PROMPT = """# VACATURE ANALYSE V8 ENHANCED - SOLLICITANTEN MAGNEET + HUMAN VOICE
 
 ## CORE IDENTITY
 
@@ -1733,13 +2153,7 @@ Je bent het Nederlandse Vacature Expertise Panel - vijf senior recruitment profe
 
 ## VACATURE INPUT
 
-Bedrijf: {company_name}
-Functie: {vacancy_title or 'Niet opgegeven'}
-
-ORIGINELE VACATURETEKST:
----
-{vacancy_text}
----
+De te analyseren vacature (bedrijf, functie en originele vacaturetekst) staat in het gebruikersbericht.
 
 ---
 
@@ -2013,24 +2427,100 @@ Voordat je oplevert, controleer:
 
 Schrijf in het Nederlands, direct en concreet, GEEN corporate jargon of emoji's."""
 
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",
+# Part of the analysis cache key - changes whenever the static prompt changes
+CLAUDE_PROMPT_VERSION = "v8-" + hashlib.sha256(V8_SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:12]
+
+
+def analyze_vacancy_with_claude(vacancy_text, company_name, vacancy_title="", use_cache=True, on_section=None):
+    """Analyze vacancy using Claude API with V8 Enhanced - 5-expert panel + Human Voice.
+
+    Repeat submissions of the same vacancy are answered from analysis_cache.
+    With on_section, the completion is streamed and on_section(name, value) is
+    called per section as it arrives (see StreamingSectionParser).
+    """
+    if not CLAUDE_API_KEY:
+        logger.warning("CLAUDE_API_KEY not set, using placeholder")
+        return None, None
+
+    cache_key = AnalysisCache.make_key(
+        vacancy_text, company_name, vacancy_title, CLAUDE_PROMPT_VERSION, CLAUDE_MODEL
+    )
+    if use_cache:
+        cached = analysis_cache.get(cache_key)
+        if cached:
+            logger.info(f"Cached V8 analysis used for {company_name}, score: {cached['score']}/45")
+            if on_section:
+                parser = StreamingSectionParser(on_section)
+                parser.feed(cached['analysis'])
+                parser.finish()
+            return cached['analysis'], cached['score']
+
+    try:
+        import anthropic
+        client = get_claude_client()
+
+        # Vacancy-specific tail; the static V8 instructions are the cached system prefix
+        prompt = f"""## VACATURE INPUT
+
+Bedrijf: {company_name}
+Functie: {vacancy_title or 'Niet opgegeven'}
+
+ORIGINELE VACATURETEKST:
+---
+{vacancy_text}
+---"""
+
+        request_params = dict(
+            model=CLAUDE_MODEL,
             max_tokens=8000,  # V8 Enhanced: 5-expert panel + Human Voice analysis
+            system=[{
+                "type": "text",
+                "text": V8_SYSTEM_PROMPT,
+                "cache_control": {"type": "ephemeral"}
+            }],
             messages=[{"role": "user", "content": prompt}]
         )
 
-        analysis = message.content[0].text
+        for attempt in range(1, CLAUDE_RETRIES + 1):
+            # Blocks until a host-wide permit is available (queues bursts instead of 429s)
+            with claude_limiter.acquire(
+                prompt_chars=len(V8_SYSTEM_PROMPT) + len(prompt),
+                max_tokens=request_params["max_tokens"]
+            ) as permit:
+                try:
+                    started = time.time()
+                    message, analysis = request_claude_analysis(client, request_params, on_section)
+                    permit.settle(message.usage)
+                    break
+                except anthropic.RateLimitError as e:
+                    retry_after = e.response.headers.get("retry-after")
+                    permit.rate_limited(float(retry_after) if retry_after else None)
+                    if attempt == CLAUDE_RETRIES:
+                        raise
+                    logger.warning(f"Claude 429 for {company_name}, attempt {attempt} - waiting for permit")
+                    continue
+                except (anthropic.APIConnectionError, anthropic.APIStatusError) as e:
+                    # Overloaded (529), other 5xx and connection errors: back off, then retry
+                    if isinstance(e, anthropic.APIStatusError) and e.status_code < 500:
+                        raise
+                    permit.settle({})  # No completion: refund the reserved tokens
+                    if attempt == CLAUDE_RETRIES:
+                        raise
+                    delay = CLAUDE_RETRY_DELAY * (2 ** (attempt - 1))
+                    logger.warning(f"Claude {type(e).__name__} for {company_name}, attempt {attempt} - retry in {delay:.0f}s")
+            # Outside the permit, so the wait doesn't hold a concurrency slot
+            time.sleep(delay)
+
+        claude_usage.record(message.usage, time.time() - started, label=company_name)
 
         # Extract score from analysis
-        score = None
-        if "SCORE:" in analysis:
-            try:
-                score_line = analysis.split("SCORE:")[1].split("\n")[0]
-                score = int(''.join(filter(str.isdigit, score_line.split("/")[0])))
-            except:
-                score = 25  # Default if parsing fails (V8: 45-point scale)
+        score = extract_overall_score(analysis)
 
         logger.info(f"V8 Enhanced Analysis completed for {company_name}, score: {score}/45")
+        if is_complete_analysis(analysis):
+            analysis_cache.set(cache_key, {"analysis": analysis, "score": score})
+        else:
+            logger.warning(f"Analysis for {company_name} has no parsable score or misses DEEL sections - not cached")
         return analysis, score
 
     except Exception as e:
@@ -2038,30 +2528,80 @@ Schrijf in het Nederlands, direct en concreet, GEEN corporate jargon of emoji's.
         return None, None
 
 
+def request_claude_analysis(client, request_params, on_section=None):
+    """Send one analysis request; streams through StreamingSectionParser when on_section is set."""
+    if on_section:
+        # Stream: sections are parsed and handed downstream as they complete
+        parser = StreamingSectionParser(on_section)
+        with client.messages.stream(**request_params) as stream:
+            for text in stream.text_stream:
+                parser.feed(text)
+            message = stream.get_final_message()
+        parser.finish()
+        return message, parser.text
+
+    message = client.messages.create(**request_params)
+    return message, message.content[0].text
+
+
 def process_analysis_async(email, contact_name, company_name, vacancy_title, vacancy_text, deal_id):
-    """Process analysis in background thread."""
+    """Process analysis as a background job (see analysis_queue).
+
+    The analysis is streamed: the Pipedrive score field is updated as soon as
+    the score line arrives, and the Pipedrive note is written in parallel
+    with PDF rendering and the email instead of after it.
+    """
     try:
         logger.info(f"Starting async analysis for {company_name}")
-
-        # Perform Claude analysis
-        analysis_result, score = analyze_vacancy_with_claude(vacancy_text, company_name, vacancy_title)
+        stage_futures = []
+
+        # Warm the ReportLab workers while Claude is busy (no-op once running)
+        pdf_render_pool.start(wait=False)
+
+        def on_section(name, value):
+            if name == 'score' and deal_id:
+                logger.info(f"Streamed score {value}/45 for {company_name} - updating Pipedrive early")
+                stage_futures.append(stage_executor.submit(
+                    update_deal_custom_fields, deal_id,
+                    score=value, analysis_date=datetime.now().strftime('%Y-%m-%d')
+                ))
+
+        # Perform Claude analysis (streamed)
+        analysis_result, score = analyze_vacancy_with_claude(
+            vacancy_text, company_name, vacancy_title, on_section=on_section
+        )
 
         if analysis_result:
+            # Add to Pipedrive while the PDFs and email are produced
+            stage_futures.append(stage_executor.submit(
+                add_analysis_to_pipedrive, deal_id, analysis_result, score,
+                update_fields=not stage_futures
+            ))
+
             # Send analysis email with BOTH PDFs (pass original vacancy_text for voor/na comparison)
             send_analysis_email(
                 email, contact_name, company_name, vacancy_title,
-                analysis_result, score, original_vacancy_text=vacancy_text
+                AnalysisDocument(analysis_result), score, original_vacancy_text=vacancy_text
             )
 
-            # Add to Pipedrive
-            add_analysis_to_pipedrive(deal_id, analysis_result, score)
+            for future in stage_futures:
+                future.result()
 
             logger.info(f"Async analysis completed for {company_name}")
         else:
-            logger.warning(f"No analysis result for {company_name}")
+            raise RuntimeError(f"No analysis result for {company_name}")
 
     except Exception as e:
+        # Raised so analysis_queue retries the job
         logger.error(f"Async analysis failed: {e}")
+        raise
+
+
+# Small pool for downstream stages that start while a streamed analysis is running
+stage_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="analysis-stage")
+
+analysis_queue = JobQueue(JOB_QUEUE_PATH, workers=JOB_QUEUE_WORKERS)
+analysis_queue.register(ANALYSIS_JOB, process_analysis_async)
 
 
 @app.route('/health', methods=['GET'])
@@ -2080,11 +2620,22 @@ def health():
         },
         "analysis_criteria": 9,
         "max_score": 45,
+        "job_queue": analysis_queue.stats(),
+        "analysis_cache": analysis_cache.stats(),
+        "claude_usage": claude_usage.stats(),
+        "claude_rate_limit": claude_limiter.stats(),
+        "pdf_render": pdf_render_pool.stats(),
+        "pdfmonkey": pdfmonkey_tracker.stats(),
+        "http": http_client.stats(),
+        "crm_index": crm_index.stats(),
+        "idempotency": idempotency.stats(),
+        "smtp": smtp_pool.stats(),
         "timestamp": datetime.now().isoformat()
     })
 
 
 @app.route('/webhook/typeform', methods=['POST'])
+@idempotent(typeform_delivery_key, idempotency)
 def typeform_webhook():
     """Handle Typeform submissions with async processing."""
     try:
@@ -2154,15 +2705,17 @@ def typeform_webhook():
         if email:
             email_sent = send_confirmation_email(email, company_name, contact_name)
 
-        # 3. Start async analysis (background - slow)
+        # 3. Queue async analysis (durable job - slow part runs in worker pool)
         if email and vacancy_text:
-            thread = threading.Thread(
-                target=process_analysis_async,
-                args=(email, contact_name, company_name, vacancy_title, vacancy_text, deal_id)
-            )
-            thread.daemon = True
-            thread.start()
-            logger.info("Async analysis thread started")
+            job_id = analysis_queue.enqueue(ANALYSIS_JOB, {
+                "email": email,
+                "contact_name": contact_name,
+                "company_name": company_name,
+                "vacancy_title": vacancy_title,
+                "vacancy_text": vacancy_text,
+                "deal_id": deal_id
+            })
+            logger.info(f"Async analysis queued (job {job_id})")
 
         # Return fast response
         return jsonify({
@@ -2186,11 +2739,12 @@ def api_analyze():
         vacancy_text = data.get('vacancy_text', '')
         company_name = data.get('company', 'Test')
         vacancy_title = data.get('title', '')
+        use_cache = not data.get('no_cache', False)
 
         if not vacancy_text:
             return jsonify({"error": "vacancy_text required"}), 400
 
-        analysis, score = analyze_vacancy_with_claude(vacancy_text, company_name, vacancy_title)
+        analysis, score = analyze_vacancy_with_claude(vacancy_text, company_name, vacancy_title, use_cache=use_cache)
 
         return jsonify({
             "status": "success",
@@ -2202,6 +2756,21 @@ def api_analyze():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/webhook/pdfmonkey', methods=['POST'])
+def pdfmonkey_webhook():
+    """PDFMonkey document finished - wakes the waiting render (see pdfmonkey_tracker)."""
+    if not PDFMONKEY_WEBHOOK_SECRET or not hmac.compare_digest(request.args.get('token', ''), PDFMONKEY_WEBHOOK_SECRET):
+        logger.warning("PDFMonkey webhook with invalid token rejected")
+        return jsonify({"error": "Invalid token"}), 403
+
+    document_id = pdfmonkey_tracker.record_webhook(request.get_json(force=True, silent=True) or {})
+    if not document_id:
+        return jsonify({"error": "No document in payload"}), 400
+
+    logger.info(f"PDFMonkey webhook: document {document_id} recorded")
+    return jsonify({"success": True, "document_id": document_id}), 200
+
+
 @app.route('/', methods=['GET'])
 def home():
     """Home endpoint."""
@@ -2220,10 +2789,11 @@ def home():
             "tone-per-doelgroep",
             "pdfmonkey-integration"
         ],
-        "endpoints": ["/health", "/webhook/typeform", "/api/analyze"]
+        "endpoints": ["/health", "/webhook/typeform", "/webhook/pdfmonkey", "/api/analyze"]
     })
 
 
 if __name__ == "__main__":
+    analysis_queue.start()
     port = int(os.getenv('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=True)
@@ -1,5 +1,8 @@
 """WSGI entry point for Render deployment."""
-from webhook_v6 import app
+from webhook_v6 import app, analysis_queue
+
+# Start analysis workers (also drains jobs left over from a restarted worker)
+analysis_queue.start()
 
 # Export for Gunicorn
 application = app